@@ -28,7 +28,7 @@ class CustomUserAdmin(UserAdmin):
 @admin.register(ItemPost)
 class ItemPostAdmin(admin.ModelAdmin):
     list_display = ('title', 'post_type', 'status', 'user', 'city', 'created_at', 'is_urgent')
-    list_filter = ('post_type', 'status', 'city', 'is_urgent', 'created_at')
+    list_filter = ('post_type', 'status', 'category', 'city', 'is_urgent', 'created_at')
     search_fields = ('title', 'description', 'location', 'city', 'user__email', 'user__username')
     readonly_fields = ('created_at', 'updated_at')
     date_hierarchy = 'created_at'
@@ -0,0 +1,174 @@
+"""
+İlan özniteliklerinin (kategori, renk, marka, normalize kelimeler) çıkarımı.
+
+Öznitelikler ilan kaydedilirken bir kez hesaplanıp `ItemPost` üzerindeki
+indeksli alanlara yazılır (bkz. `ItemPost.refresh_attributes`); eşleştirme
+kodu ve şablon etiketleri bu kayıtlı değerleri okur. Mevcut ilanlar için:
+
+    python manage.py backfill_post_attributes
+
+Metin Türkçe kurallarla katlanır (`fold`): "İ" -> "i", "I" -> "ı", küçük harf,
+ardından noktasız "ı" noktalı "i"ye indirilir (büyük "I" hem Türkçe hem İngilizce
+kelimelerde geçer). Böylece "KIRMIZI" ve "kırmızı", "İPHONE" ve "IPHONE" aynı
+anahtar kelimeye eşlenir. Diğer Türkçe harfler korunur ("kuş" "kusura"ya
+eşlenmesin).
+
+Anahtar kelimeler tek bir trie'de tutulur ve metin tek geçişte taranır; her
+konumdan trie üzerinde indeksle yürünür, yani eşleme eski `keyword in text`
+kontrolüyle aynıdır (kelime içinde de geçer: "smartphone" -> "phone",
+"çantası" -> "çanta"). Birden fazla anahtar kelime eşleşirse listedeki sırası
+önce olan kazanır.
+"""
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# Sıra önceliktir: ilk eşleşen kategori seçilir
+CATEGORY_KEYWORDS: Dict[str, List[str]] = {
+    "cocuk": ["kayıp çocuk", "missing child", "bulunan çocuk", "found child", "çocuk"],
+    "hayvan": ["hayvan", "pet", "köpek", "kedi", "kuş", "animal", "dog", "cat", "bird"],
+    "telefon": ["telefon", "phone", "iphone", "android"],
+    "bilgisayar": ["bilgisayar", "laptop", "computer", "macbook", "notebook"],
+    "cüzdan": ["cüzdan", "wallet", "kartlık"],
+    "gözlük": ["gözlük", "glasses", "sunglasses"],
+    "anahtar": ["anahtar", "key", "anahtarlık"],
+    "çanta": ["çanta", "bag", "sırt çantası"],
+    "saat": ["saat", "watch", "kol saati"],
+}
+
+COLORS: List[str] = [
+    'siyah', 'beyaz', 'kırmızı', 'mavi', 'yeşil', 'sarı', 'mor',
+    'pembe', 'turuncu', 'kahverengi', 'gri', 'lacivert', 'bej',
+    'black', 'white', 'red', 'blue', 'green', 'yellow', 'purple',
+    'pink', 'orange', 'brown', 'gray', 'grey',
+]
+
+BRANDS: List[str] = [
+    'apple', 'samsung', 'huawei', 'xiaomi', 'sony', 'lg', 'nike',
+    'adidas', 'ray-ban', 'gucci', 'prada', 'louis vuitton', 'lv',
+]
+
+# Form açıklamaya "Kategori: Hayvan" satırı ekler; anahtar kelimelerden önce gelir
+ANIMAL_MARKER = "kategori: hayvan"
+
+# extract_attributes'in doldurduğu ItemPost alanları
+ATTRIBUTE_FIELDS = ("category", "color", "brand", "title_tokens", "description_tokens")
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def fold(text: str) -> str:
+    """Türkçe büyük/küçük harf katlama; "ı" ve "i" birleştirilir ("KIRMIZI" -> "kirmizi")."""
+    if not text:
+        return ""
+    return text.replace("İ", "i").replace("I", "ı").lower().replace("ı", "i")
+
+
+def tokenize(text: str) -> List[str]:
+    """Katlanmış metnin kelimeleri (tekrarsız, ilk görülme sırasıyla)."""
+    return list(dict.fromkeys(_WORD_RE.findall(fold(text))))
+
+
+class KeywordMatcher:
+    """
+    Çok desenli anahtar kelime eşleyici.
+
+    keywords: (anahtar kelime, değer) çiftleri, öncelik sırasıyla. `find`
+    metinde (herhangi bir konumda) geçen anahtar kelimelerden önceliği en
+    yüksek olanın değerini döndürür. Her konumdan en fazla en uzun anahtar
+    kelime kadar ilerlenir.
+    """
+
+    _END = ""
+
+    def __init__(self, keywords: Iterable[Tuple[str, str]]):
+        self._root: dict = {}
+        for priority, (keyword, value) in enumerate(keywords):
+            node = self._root
+            for char in fold(keyword):
+                node = node.setdefault(char, {})
+            # Aynı anahtar kelime iki kez verilirse ilk (öncelikli) olan kalır
+            node.setdefault(self._END, (priority, value))
+
+    def find(self, text: str, folded: bool = False) -> Optional[str]:
+        if not folded:
+            text = fold(text)
+        best = None
+        root = self._root
+        length = len(text)
+        for start in range(length):
+            node = root
+            index = start
+            while index < length:
+                node = node.get(text[index])
+                if node is None:
+                    break
+                index += 1
+                hit = node.get(self._END)
+                if hit is not None and (best is None or hit[0] < best[0]):
+                    best = hit
+                    if hit[0] == 0:
+                        return hit[1]
+        return best[1] if best else None
+
+
+CATEGORY_MATCHER = KeywordMatcher(
+    (keyword, category) for category, keywords in CATEGORY_KEYWORDS.items() for keyword in keywords
+)
+COLOR_MATCHER = KeywordMatcher((color, color) for color in COLORS)
+BRAND_MATCHER = KeywordMatcher((brand, brand) for brand in BRANDS)
+
+
+def extract_attributes(title: str, description: str, is_missing_child: bool = False) -> dict:
+    """
+    Başlık ve açıklamadan ilan özniteliklerini çıkar.
+
+    Kategori başlık + açıklamadan, renk ve marka yalnızca açıklamadan okunur.
+    Dönen sözlük `ItemPost` alan adlarıyla aynıdır; bulunamayan değerler ''.
+    """
+    title = fold(title or "")
+    description = fold(description or "")
+    text = f"{title} {description}"
+
+    if is_missing_child:
+        category = "cocuk"
+    elif ANIMAL_MARKER in text:
+        category = "hayvan"
+    else:
+        category = CATEGORY_MATCHER.find(text, folded=True) or ""
+
+    return {
+        "category": category,
+        "color": COLOR_MATCHER.find(description, folded=True) or "",
+        "brand": BRAND_MATCHER.find(description, folded=True) or "",
+        "title_tokens": " ".join(dict.fromkeys(_WORD_RE.findall(title))),
+        "description_tokens": " ".join(dict.fromkeys(_WORD_RE.findall(description))),
+    }
+
+
+def backfill_attributes(queryset, batch_size: int = 500) -> int:
+    """
+    Queryset'teki ilanların özniteliklerini hesaplayıp `bulk_update` ile yaz
+    (sinyaller tetiklenmez). 0005 migration'ı kendi sabit kopyasını kullanır.
+    Dönen değer değeri değişen ilan sayısıdır.
+    """
+    fields = list(ATTRIBUTE_FIELDS)
+    model = queryset.model
+    changed = []
+    updated = 0
+    rows = queryset.only("id", "title", "description", "is_missing_child", *fields)
+    for post in rows.iterator(chunk_size=batch_size):
+        attributes = extract_attributes(post.title, post.description, post.is_missing_child)
+        if all(getattr(post, field) == attributes[field] for field in fields):
+            continue
+        for field in fields:
+            setattr(post, field, attributes[field])
+        changed.append(post)
+        if len(changed) >= batch_size:
+            updated += len(changed)
+            model.objects.bulk_update(changed, fields)
+            changed = []
+    if changed:
+        updated += len(changed)
+        model.objects.bulk_update(changed, fields)
+    return updated
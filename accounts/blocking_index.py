@@ -0,0 +1,390 @@
+"""
+Eşleştirme adayları için bloklama indeksi.
+
+`find_matches` her çağrıda şehir / tür / durum sorgusu yapıp kategori, çocuk
+ve hayvan uyuşmazlıklarını Python'da eliyordu. İndeks aktif (görselli)
+ilanları uyumluluk anahtarına göre tutar:
+
+    (şehir anahtarı, ilan türü, kategori, çocuk ilanı mı, hayvan ilanı mı) -> ilan id'leri
+
+Bir ilanın adayları karşıt türdeki aynı anahtarın kümesidir; bu küme
+`CandidateScorer`ın kategori / çocuk / hayvan kapısını geçecek adaylarla
+birebir aynıdır. Adaylar veritabanından sadece birincil anahtarla getirilir.
+
+Arka uçlar (`BLOCKING_INDEX_BACKEND`):
+
+    - local : süreç içi sözlük. İlk kullanımda veritabanından yüklenir, bu süreçteki
+              sinyallerle (kayıt / çözüldü / silme) güncellenir. Başka süreçlerde
+              (gunicorn / celery işçileri) kaydedilen ilanlar her sorgudan önce
+              `updated_at` üzerinden tek indeksli sorguyla alınır; yeni ilan
+              diğer süreçlerde hemen aday olur. Sinyali ve `updated_at`'i atlayan
+              `QuerySet.update`'ler için `BLOCKING_INDEX_TTL` saniyede bir tam
+              yeniden yüklenir. Başka süreçte silinen / kapanan ilanlar indekste
+              kalabilir; `find_matches` adayları getirirken durum / tür koşulunu
+              yine uygular.
+    - redis : `REDIS_URL` üzerinde paylaşılan kümeler; tüm süreçler aynı indeksi görür,
+              sorgu başına veritabanı sorgusu yoktur. Yeniden oluşturma yeni bir
+              sürüme yazılıp tek adımda etkinleştirilir. Redis'e ulaşılamazsa
+              `find_matches` veritabanı sorgusuna döner.
+    - off   : indeks kullanılmaz.
+
+Elle yeniden oluşturmak için: python manage.py rebuild_blocking_index
+"""
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from accounts.attributes import fold
+from accounts.models import ItemPost
+from image_matching.services import city_key
+
+
+BlockKey = Tuple[str, str, str, bool, bool]
+
+OPPOSITE_TYPE = {"lost": "found", "found": "lost"}
+
+# Değişiklik sorgusu son senkronizasyondan bu kadar saniye öncesinden başlar:
+# `updated_at` kayıt anında atanır, işlem daha geç commit edilebilir
+SYNC_OVERLAP_SECONDS = 10
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def block_key(city: Optional[str], post_type: str, category: Optional[str], is_child: bool) -> BlockKey:
+    """Uyumluluk anahtarı; şehir "Adıyaman, Kahta" -> "adiyaman" olarak normalize edilir."""
+    category = category or ""
+    return (fold(city_key(city)), post_type, category, bool(is_child), category == "hayvan")
+
+
+def post_block_key(post: ItemPost) -> Optional[BlockKey]:
+    """İlanın kendi anahtarı; aday olamayan (aktif değil / görselsiz) ilanlar için None."""
+    if post.status != "active" or not post.image:
+        return None
+    return block_key(post.city, post.post_type, post.category, post.is_missing_child)
+
+
+def candidate_block_key(post: ItemPost) -> BlockKey:
+    """İlanın adaylarının anahtarı: aynı şehir / kategori / bayraklar, karşıt tür."""
+    return block_key(post.city, OPPOSITE_TYPE.get(post.post_type, ""), post.category, post.is_missing_child)
+
+
+def _active_rows() -> Iterable[Tuple[int, BlockKey]]:
+    rows = (
+        ItemPost.objects.filter(status="active")
+        .exclude(image__isnull=True).exclude(image="")
+        .values_list("id", "city", "post_type", "category", "is_missing_child")
+    )
+    for post_id, city, post_type, category, is_child in rows.iterator():
+        yield post_id, block_key(city, post_type, category, is_child)
+
+
+def _changed_rows(since) -> Iterable[Tuple[int, Optional[BlockKey]]]:
+    """`since`tan sonra kaydedilen ilanlar; aday olamayanların anahtarı None."""
+    rows = ItemPost.objects.filter(updated_at__gte=since).values_list(
+        "id", "status", "image", "city", "post_type", "category", "is_missing_child"
+    )
+    for post_id, status, image, city, post_type, category, is_child in rows:
+        key = block_key(city, post_type, category, is_child) if status == "active" and image else None
+        yield post_id, key
+
+
+class LocalBlockingIndex:
+    """Süreç içi bloklama indeksi (bkz. modül açıklaması)."""
+
+    def __init__(self, ttl: float = 300.0, sync: bool = True):
+        self.ttl = float(ttl)
+        # Her sorgudan önce başka süreçlerde kaydedilen ilanları veritabanından al
+        self.sync = sync
+        self._lock = threading.RLock()
+        self._blocks: Dict[BlockKey, Set[int]] = {}
+        self._keys: Dict[int, BlockKey] = {}
+        self._loaded_at: Optional[float] = None
+        # Son senkronizasyonun başladığı an (veritabanı saati, `updated_at` ile karşılaştırılır)
+        self._synced_at = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _ensure_loaded(self) -> None:
+        loaded_at = self._loaded_at
+        if loaded_at is None or (self.ttl > 0 and time.monotonic() - loaded_at > self.ttl):
+            self.rebuild()
+        elif self.sync:
+            self.sync_changes()
+
+    def rebuild(self) -> int:
+        """İndeksi veritabanından yeniden yükle; dönen değer indekslenen ilan sayısı."""
+        from django.utils import timezone
+
+        started = timezone.now()
+        blocks: Dict[BlockKey, Set[int]] = {}
+        keys: Dict[int, BlockKey] = {}
+        for post_id, key in _active_rows():
+            blocks.setdefault(key, set()).add(post_id)
+            keys[post_id] = key
+        with self._lock:
+            self._blocks, self._keys = blocks, keys
+            self._loaded_at = time.monotonic()
+            self._synced_at = started
+        return len(keys)
+
+    def sync_changes(self) -> int:
+        """
+        Son senkronizasyondan beri kaydedilen ilanları uygula (başka süreçlerdeki
+        kayıtlar dahil); dönen değer incelenen ilan sayısı. `updated_at` indeksli
+        olduğundan değişiklik yoksa tek boş aralık sorgusudur.
+        """
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        if self._synced_at is None:
+            return 0
+        started = timezone.now()
+        changed = list(_changed_rows(self._synced_at - timedelta(seconds=SYNC_OVERLAP_SECONDS)))
+        with self._lock:
+            for post_id, key in changed:
+                self._apply(post_id, key)
+            self._synced_at = started
+        return len(changed)
+
+    def _apply(self, post_id: int, key: Optional[BlockKey]) -> None:
+        with self._lock:
+            old = self._keys.get(post_id)
+            if old == key:
+                return
+            if old is not None:
+                self._blocks.get(old, set()).discard(post_id)
+                del self._keys[post_id]
+            if key is not None:
+                self._blocks.setdefault(key, set()).add(post_id)
+                self._keys[post_id] = key
+
+    def update(self, post: ItemPost) -> None:
+        """İlan kaydedildi: anahtarı değiştiyse taşı, aday olamıyorsa çıkar."""
+        with self._lock:
+            if self._loaded_at is None:
+                # Henüz yüklenmedi: ilk kullanımda veritabanından zaten güncel okunur
+                return
+            self._apply(post.pk, post_block_key(post))
+
+    def remove(self, post_id: int) -> None:
+        with self._lock:
+            old = self._keys.pop(post_id, None)
+            if old is not None:
+                self._blocks.get(old, set()).discard(post_id)
+
+    def candidate_ids(self, post: ItemPost) -> List[int]:
+        self._ensure_loaded()
+        with self._lock:
+            return list(self._blocks.get(candidate_block_key(post), ()))
+
+
+class RedisBlockingIndex:
+    """
+    Redis kümeleriyle paylaşılan bloklama indeksi.
+
+    Veri sürümlü ön ek altında tutulur: her anahtar bir küme
+    (`<prefix>:v<N>:block:<anahtar>`), ilan -> anahtar eşlemesi `<prefix>:v<N>:keys`
+    hash'inde. `<prefix>:current` etkin sürümü gösterir; yoksa (ilk kullanım,
+    Redis yeniden başlatıldı) indeks veritabanından yeniden oluşturulur.
+
+    Yeniden oluşturma yeni bir sürüme parça parça yazılır ve bitince `current`
+    tek SET ile yeni sürüme çevrilir; okuyucular boş ya da yarım indeks görmez.
+    Aynı anda tek süreç yeniden oluşturur (`<prefix>:rebuild_lock`, SET NX);
+    kilidi alamayan süreç hata alır ve `find_matches` veritabanı sorgusuna döner.
+    """
+
+    # Yeniden oluşturmada pipeline bu kadar komutta bir gönderilir
+    REBUILD_CHUNK = 5000
+    # Kilit, yeniden oluşturan süreç ölürse bu kadar saniye sonra kendiliğinden düşer
+    LOCK_TIMEOUT = 600
+    # Eski sürüm hemen silinmez; sürümü yeni okumuş istekler bu süre boyunca çalışır
+    OLD_VERSION_TTL = 60
+
+    _RELEASE_LOCK = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+    )
+
+    def __init__(self, url: str, prefix: str = "blocking_index"):
+        self.url = url
+        self.prefix = prefix
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(self.url)
+        return self._client
+
+    def _base(self, version) -> str:
+        return f"{self.prefix}:v{version}"
+
+    def _block(self, key: BlockKey, base: str) -> str:
+        city, post_type, category, is_child, is_animal = key
+        return f"{base}:block:{city}|{post_type}|{category}|{int(is_child)}|{int(is_animal)}"
+
+    def _current_base(self) -> Optional[str]:
+        version = self.client.get(f"{self.prefix}:current")
+        return self._base(version.decode()) if version is not None else None
+
+    def __len__(self) -> int:
+        base = self._current_base()
+        return int(self.client.hlen(f"{base}:keys")) if base else 0
+
+    def rebuild(self) -> int:
+        """İndeksi yeni bir sürümde veritabanından oluşturup etkinleştir; dönen değer ilan sayısı."""
+        import uuid
+        from datetime import timedelta
+
+        from django.utils import timezone
+
+        client = self.client
+        lock = f"{self.prefix}:rebuild_lock"
+        token = uuid.uuid4().hex
+        if not client.set(lock, token, nx=True, ex=self.LOCK_TIMEOUT):
+            raise RuntimeError("Bloklama indeksi başka bir süreçte yeniden oluşturuluyor")
+        try:
+            started = timezone.now()
+            version = client.incr(f"{self.prefix}:version")
+            base = self._base(version)
+            pipe = client.pipeline(transaction=False)
+            count = 0
+            for post_id, key in _active_rows():
+                block = self._block(key, base)
+                pipe.sadd(block, post_id)
+                pipe.hset(f"{base}:keys", post_id, block)
+                count += 1
+                if len(pipe) >= self.REBUILD_CHUNK:
+                    pipe.execute()
+            pipe.execute()
+
+            old = self._current_base()
+            client.set(f"{self.prefix}:current", version)
+            # Yükleme sürerken eski sürüme yazılan değişiklikler yeni sürüme de uygulanır
+            for post_id, key in _changed_rows(started - timedelta(seconds=SYNC_OVERLAP_SECONDS)):
+                self._apply(post_id, key, base)
+            if old is not None:
+                self._expire_matching(f"{old}:*")
+            else:
+                # Sürümsüz eski düzen (`<prefix>:block:*`, `<prefix>:keys`, `<prefix>:ready`)
+                self._expire_matching(f"{self.prefix}:block:*")
+                client.delete(f"{self.prefix}:keys", f"{self.prefix}:ready")
+            return count
+        finally:
+            client.eval(self._RELEASE_LOCK, 1, lock, token)
+
+    def _expire_matching(self, pattern: str) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        for name in self.client.scan_iter(match=pattern, count=1000):
+            pipe.expire(name, self.OLD_VERSION_TTL)
+            if len(pipe) >= self.REBUILD_CHUNK:
+                pipe.execute()
+        pipe.execute()
+
+    def _ensure_loaded(self) -> str:
+        base = self._current_base()
+        if base is None:
+            self.rebuild()
+            base = self._current_base()
+        return base
+
+    def _apply(self, post_id: int, key: Optional[BlockKey], base: str) -> None:
+        block = self._block(key, base) if key is not None else None
+        old = self.client.hget(f"{base}:keys", post_id)
+        old = old.decode() if old is not None else None
+        if old == block:
+            return
+        pipe = self.client.pipeline()
+        if old is not None:
+            pipe.srem(old, post_id)
+            pipe.hdel(f"{base}:keys", post_id)
+        if block is not None:
+            pipe.sadd(block, post_id)
+            pipe.hset(f"{base}:keys", post_id, block)
+        pipe.execute()
+
+    def update(self, post: ItemPost) -> None:
+        base = self._current_base()
+        if base is None:
+            # Henüz oluşturulmadı: ilk kullanımda veritabanından zaten güncel okunur
+            return
+        self._apply(post.pk, post_block_key(post), base)
+
+    def remove(self, post_id: int) -> None:
+        base = self._current_base()
+        if base is not None:
+            self._apply(post_id, None, base)
+
+    def candidate_ids(self, post: ItemPost) -> List[int]:
+        base = self._ensure_loaded()
+        return [int(post_id) for post_id in self.client.smembers(self._block(candidate_block_key(post), base))]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_blocking_index():
+    """Süreç genelinde tek bloklama indeksi (`BLOCKING_INDEX_BACKEND`); 'off' ise None."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                backend = str(_setting("BLOCKING_INDEX_BACKEND", "local")).lower()
+                if backend == "off":
+                    return None
+                if backend == "redis":
+                    _index = RedisBlockingIndex(_setting("REDIS_URL", "redis://localhost:6379/0"))
+                else:
+                    _index = LocalBlockingIndex(
+                        ttl=_setting("BLOCKING_INDEX_TTL", 300),
+                        sync=_setting("BLOCKING_INDEX_SYNC", True),
+                    )
+    return _index
+
+
+def blocked_candidate_ids(post: ItemPost) -> Optional[List[int]]:
+    """
+    İlanın uyumlu aday id'leri; indeks kapalıysa veya kullanılamıyorsa None
+    (çağıran taraf veritabanı sorgusuna döner).
+    """
+    index = get_blocking_index()
+    if index is None:
+        return None
+    try:
+        return index.candidate_ids(post)
+    except Exception as e:
+        print(f"Bloklama indeksi kullanılamadı: {e}")
+        return None
+
+
+def update_blocking_index(post: ItemPost) -> None:
+    """İlan kaydedildi / durumu değişti (sinyallerden çağrılır)."""
+    index = get_blocking_index()
+    if index is None:
+        return
+    try:
+        index.update(post)
+    except Exception as e:
+        print(f"Bloklama indeksi güncellenemedi (ilan {post.pk}): {e}")
+
+
+def remove_from_blocking_index(post_id: int) -> None:
+    """İlan silindi (sinyallerden çağrılır)."""
+    index = get_blocking_index()
+    if index is None:
+        return
+    try:
+        index.remove(post_id)
+    except Exception as e:
+        print(f"Bloklama indeksi güncellenemedi (ilan {post_id}): {e}")
@@ -0,0 +1,30 @@
+"""
+İlanların kayıtlı özniteliklerini (kategori, renk, marka, normalize kelimeler)
+başlık / açıklamadan yeniden hesaplar.
+
+accounts 0005 migration'ı mevcut ilanları bir kez doldurur; anahtar kelime
+listeleri (accounts/attributes.py) değiştiğinde veya `QuerySet.update` ile
+başlık / açıklaması değişen ilanlar için bu komut çalıştırılır.
+
+Örnek:
+    python manage.py backfill_post_attributes
+    python manage.py backfill_post_attributes --batch-size 1000
+"""
+from django.core.management.base import BaseCommand
+
+from accounts.attributes import backfill_attributes
+from accounts.models import ItemPost
+
+
+class Command(BaseCommand):
+    help = "İlanların kategori / renk / marka / kelime alanlarını yeniden hesaplar."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Tek bulk_update sorgusundaki ilan sayısı')
+
+    def handle(self, *args, **options):
+        total = ItemPost.objects.count()
+        self.stdout.write(self.style.NOTICE(f"{total} ilan kontrol ediliyor..."))
+        updated = backfill_attributes(ItemPost.objects.all(), batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f"{updated} ilanın öznitelikleri güncellendi."))
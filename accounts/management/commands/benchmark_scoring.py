@@ -0,0 +1,144 @@
+"""
+Aday puanlamasını (accounts/scoring.py) tekil Python döngüsüyle karşılaştırır.
+
+Veritabanına yazmadan rastgele ilanlar üretilir (başlık / açıklama anahtar
+kelime listelerinden, öznitelikler `refresh_attributes` ile), görüntü
+benzerlikleri rastgele verilir. Her kaynak ilan için
+
+    - döngü  : adaylar tek tek, `calculate_total_similarity` ile (eski yol)
+    - toplu  : `CandidateScorer` ile tek geçişte
+
+puanlanır; iki yolun sonuçları (sıra ve skorlar) birebir karşılaştırılır ve
+saniyede puanlanan aday sayısı yazdırılır.
+
+Örnek:
+    python manage.py benchmark_scoring --candidates 10000 --queries 20
+"""
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.attributes import BRANDS, CATEGORY_KEYWORDS, COLORS
+from accounts.matching_service import MatchingService
+from accounts.models import ItemPost
+from accounts.scoring import CHILD_THRESHOLD, DEFAULT_THRESHOLD, CandidateScorer
+
+
+FILLER_WORDS = [
+    "kayboldu", "bulundu", "park", "otobüs", "metro", "durak", "dün", "akşam",
+    "sabah", "kafe", "okul", "lütfen", "ulaşın", "ödül", "yeni", "eski", "küçük", "büyük",
+]
+
+
+def _random_post(rng: random.Random, post_id: int, post_type: str, child_ratio: float) -> ItemPost:
+    keywords = rng.choice(list(CATEGORY_KEYWORDS.values()))
+    words = rng.sample(FILLER_WORDS, 4)
+    if rng.random() < 0.8:
+        words.append(rng.choice(keywords))
+    if rng.random() < 0.6:
+        words.append(rng.choice(COLORS))
+    if rng.random() < 0.3:
+        words.append(rng.choice(BRANDS))
+    rng.shuffle(words)
+    post = ItemPost(
+        id=post_id,
+        title=" ".join(words[:3]).capitalize(),
+        description=" ".join(words),
+        post_type=post_type,
+        status="active",
+        city="İstanbul",
+        is_missing_child=rng.random() < child_ratio,
+    )
+    post.refresh_attributes()
+    return post
+
+
+def _score_loop(service: MatchingService, post: ItemPost, candidates, image_sims):
+    """`find_matches`in aday döngüsü (CandidateScorer öncesi tekil yol)."""
+    matches = []
+    for candidate in candidates:
+        post_is_child = post.is_missing_child
+        candidate_is_child = candidate.is_missing_child
+        cat1 = service._extract_category(post)
+        cat2 = service._extract_category(candidate)
+        post_is_animal = cat1 == "hayvan"
+        candidate_is_animal = cat2 == "hayvan"
+        if post_is_child != candidate_is_child or post_is_animal != candidate_is_animal:
+            continue
+        if not (post_is_child and candidate_is_child) and not (post_is_animal and candidate_is_animal):
+            if cat1 and cat2:
+                if cat1.lower() != cat2.lower():
+                    continue
+            elif (cat1 and not cat2) or (cat2 and not cat1):
+                continue
+        image_sim = image_sims.get(candidate.id, 0.0)
+        similarity = service.calculate_total_similarity(post, candidate, image_sim=image_sim)
+        threshold = CHILD_THRESHOLD if post_is_child and candidate_is_child else DEFAULT_THRESHOLD
+        if similarity >= threshold:
+            matches.append({
+                'post': candidate,
+                'similarity': similarity,
+                'image_similarity': image_sim,
+                'feature_similarity': service.calculate_feature_similarity(post, candidate),
+            })
+    matches.sort(key=lambda x: x['similarity'], reverse=True)
+    return matches
+
+
+class Command(BaseCommand):
+    help = "Toplu (NumPy) aday puanlamasını tekil döngüyle hız ve sonuç açısından karşılaştırır."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--candidates", type=int, default=10_000, help="Şehirdeki aday ilan sayısı")
+        parser.add_argument("--queries", type=int, default=20, help="Puanlanacak kaynak ilan sayısı")
+        parser.add_argument("--child-ratio", type=float, default=0.0,
+                            help="Çocuk ilanı oranı (çocuk çiftleri tekil puanlanır)")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--skip-loop", action="store_true", help="Döngü yolunu ölçme (sadece toplu)")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        count = max(1, options["candidates"])
+        candidates = [
+            _random_post(rng, index + 1, "found", options["child_ratio"]) for index in range(count)
+        ]
+        queries = [
+            _random_post(rng, count + index + 1, "lost", options["child_ratio"])
+            for index in range(max(1, options["queries"]))
+        ]
+        image_sims = {candidate.id: rng.random() for candidate in candidates}
+        service = MatchingService()
+        self.stdout.write(f"{count} aday, {len(queries)} sorgu")
+
+        started = time.perf_counter()
+        scorer = CandidateScorer(candidates)
+        load_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        batched = [scorer.score(post, image_sims, service) for post in queries]
+        batched_seconds = time.perf_counter() - started
+        self.stdout.write(
+            f"  toplu : yükleme {load_seconds * 1000:.1f}ms, "
+            f"{batched_seconds * 1000 / len(queries):.2f}ms / sorgu, "
+            f"{count * len(queries) / batched_seconds:,.0f} aday/s"
+        )
+        self.stdout.write(f"  son sorgunun aşama sayaçları: {scorer.stats}")
+        if options["skip_loop"]:
+            return
+
+        started = time.perf_counter()
+        looped = [_score_loop(service, post, candidates, image_sims) for post in queries]
+        loop_seconds = time.perf_counter() - started
+        self.stdout.write(
+            f"  döngü : {loop_seconds * 1000 / len(queries):.2f}ms / sorgu, "
+            f"{count * len(queries) / loop_seconds:,.0f} aday/s "
+            f"({loop_seconds / batched_seconds:.1f}x)"
+        )
+
+        for post, expected, actual in zip(queries, looped, batched):
+            expected_rows = [(m['post'].id, m['similarity'], m['feature_similarity']) for m in expected]
+            actual_rows = [(m['post'].id, m['similarity'], m['feature_similarity']) for m in actual]
+            if expected_rows != actual_rows:
+                raise CommandError(f"İlan {post.id} için toplu ve döngü sonuçları farklı")
+        matched = sum(len(rows) for rows in batched)
+        self.stdout.write(self.style.SUCCESS(f"Sonuçlar birebir aynı ({matched} eşleşme)."))
@@ -0,0 +1,94 @@
+"""
+Kayıp / bulunan çocuk ilanlarının yüz vektörlerini kişi koleksiyonuna (PERSON_COLLECTION) yazar.
+
+Yeni çocuk ilanları kaydedilirken otomatik indekslenir; bu komut mevcut
+ilanları toplu olarak doldurmak içindir.
+
+Baseline'da oluşturulmuş kişi koleksiyonu L2 indeksli olabilir; yüz
+vektörleri birim normlu olduğundan koleksiyon IP (kosinüs) ile yeniden
+oluşturulmalıdır. `--recreate` koleksiyonu silip tüm aktif çocuk ilanlarını
+yeniden indeksler (o zamana kadar aramalar skoru gerçek metriğe göre çevirir).
+
+Örnek:
+    python manage.py index_faces --batch-size 16
+    python manage.py index_faces --recreate
+"""
+import os
+
+from django.core.management.base import BaseCommand
+
+from accounts.models import ItemPost
+from image_matching.milvus_connector import (
+    COLLECTION_METRICS,
+    PERSON_COLLECTION,
+    collection_metric,
+    drain,
+    drop_collection,
+)
+from image_matching.services import FaceMatchingService
+
+
+class Command(BaseCommand):
+    help = "Çocuk ilanlarının yüz vektörlerini kişi koleksiyonuna yazar."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=16,
+                            help='Tek seferde yüz algılaması yapılacak görüntü sayısı')
+        parser.add_argument('--recreate', action='store_true',
+                            help='Kişi koleksiyonunu silip yapılandırılan metrikle (IP) yeniden oluştur')
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        face_service = FaceMatchingService()
+
+        expected_metric = COLLECTION_METRICS[PERSON_COLLECTION]
+        try:
+            current_metric = collection_metric(PERSON_COLLECTION)
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f"Milvus'a bağlanılamadı: {e}"))
+            return
+        if options['recreate']:
+            self.stdout.write(self.style.WARNING(
+                f"{PERSON_COLLECTION} siliniyor ({current_metric}), {expected_metric} ile yeniden oluşturulacak..."
+            ))
+            if not drop_collection(PERSON_COLLECTION):
+                self.stderr.write(self.style.ERROR("Kişi koleksiyonu silinemedi!"))
+                return
+        elif current_metric != expected_metric:
+            self.stdout.write(self.style.WARNING(
+                f"{PERSON_COLLECTION} {current_metric} indeksli (beklenen {expected_metric}); "
+                f"taşımak için --recreate ile çalıştırın."
+            ))
+
+        posts = (
+            ItemPost.objects.filter(is_missing_child=True, status="active")
+            .exclude(image__isnull=True)
+            .exclude(image="")
+        )
+        items = []
+        for post in posts:
+            if not os.path.exists(post.image.path):
+                self.stdout.write(self.style.WARNING(f"Görüntü bulunamadı: {post.image.path}"))
+                continue
+            items.append({'ilan_id': post.id, 'image_path': post.image.path})
+
+        indexed = no_face = failed = 0
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            for item, result in zip(batch, face_service.index_faces(batch)):
+                if result['success']:
+                    indexed += 1
+                elif not result['error'] or result['error'] == 'No face detected':
+                    no_face += 1
+                else:
+                    failed += 1
+                    self.stdout.write(self.style.WARNING(f"İlan {item['ilan_id']}: {result['error']}"))
+            self.stdout.write(f"  İşlenen: {min(start + batch_size, len(items))}/{len(items)}")
+
+        # Tampondaki eklemeleri yaz ve segmentleri bir kez mühürle
+        if not drain(seal=True):
+            self.stderr.write(self.style.ERROR("Milvus tamponu boşaltılamadı!"))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Yüz indeksleme tamamlandı: {indexed} indekslendi, {no_face} yüz yok, {failed} hata"
+        ))
@@ -0,0 +1,43 @@
+"""
+ImageVector kayıtlarını `post` alanı üzerinden ilanlarına bağlar.
+
+`image_matching` 0003 migration'ı mevcut kayıtları bir kez bağlar; bu komut
+migration sonrasında bağlantısız kalan kayıtlar (örn. eski sürümle çalışan
+bir süreçten gelen vektörler) için tekrar çalıştırılabilir. Eşleme görsel
+dosya adının tam eşitliğiyle yapılır; bağlanamayan kayıtlar raporlanır.
+
+Örnek:
+    python manage.py link_image_vectors
+    python manage.py link_image_vectors --dry-run
+"""
+from django.core.management.base import BaseCommand
+
+from image_matching.models import ImageVector
+from image_matching.vector_lifecycle import link_unlinked_vectors
+
+
+class Command(BaseCommand):
+    help = "Bağlantısız ImageVector kayıtlarını görsel dosya adıyla ilanlara bağlar."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Sadece bağlantısız kayıt sayısını yazdır')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Tek UPDATE sorgusundaki en fazla kayıt sayısı')
+
+    def handle(self, *args, **options):
+        unlinked = ImageVector.objects.filter(post__isnull=True)
+        self.stdout.write(f"Bağlantısız kayıt: {unlinked.count()}")
+        if options['dry_run']:
+            return
+
+        linked = link_unlinked_vectors(batch_size=max(1, options['batch_size']))
+        self.stdout.write(self.style.SUCCESS(f"{linked} kayıt ilanına bağlandı."))
+
+        remaining = unlinked.filter(image_path__contains='item_images').count()
+        if remaining:
+            # İlan görseli yolunda olup ilanı bulunamayanlar: ilanı silinmiş kayıtlar
+            self.stdout.write(self.style.WARNING(
+                f"{remaining} ilan görseli kaydı bağlanamadı (ilanı silinmiş olabilir; "
+                f"bkz. python manage.py reconcile_vectors --fix)"
+            ))
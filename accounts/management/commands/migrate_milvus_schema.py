@@ -0,0 +1,118 @@
+"""
+Mevcut görüntü vektörü koleksiyonunu skaler filtre alanlı şemaya taşır.
+
+Eski şema sadece id, vector, user_id, image_path ve description içerir.
+Yeni şema ilan meta verisini de (post_id, post_type, city, category, status,
+is_missing_child) tutar; böylece `search_similar` karşıt tür / aynı şehir /
+aktif ilan filtresini indeks aramasının içinde uygular.
+
+Vektörler yeniden hesaplanmaz: eski koleksiyondaki vektörler meta veriyle
+birlikte geçici bir koleksiyona, her şehir kendi bölümüne (partition) düşecek
+şekilde kopyalanır; eski koleksiyon silinir ve geçici koleksiyon eski adla
+yeniden adlandırılır. Çalışan web / celery süreçleri önbellekteki koleksiyon
+tanıtıcısını ilk hatada yeniler.
+
+Örnek:
+    python manage.py migrate_milvus_schema --batch-size 1000
+"""
+import os
+
+from django.core.management.base import BaseCommand
+from pymilvus import utility
+
+from accounts.matching_service import post_vector_metadata
+from accounts.models import ItemPost
+from image_matching.model_registry import get_model_registry
+from image_matching.services import MilvusService, partition_for_city, vector_metadata
+
+
+class Command(BaseCommand):
+    help = "Görüntü vektörü koleksiyonuna ilan meta verisini (skaler filtre alanları) ekler."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=None,
+                            help='Embedding modeli (settings.EMBEDDING_MODELS anahtarı; varsayılan: DEFAULT_EMBEDDING_MODEL)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Tek seferde kopyalanacak vektör sayısı')
+        parser.add_argument('--force', action='store_true',
+                            help='Koleksiyon yeni şemada olsa bile meta veriyi yeniden yaz')
+
+    def handle(self, *args, **options):
+        model = get_model_registry().get(options['model'])
+        service = MilvusService(collection_name=model.collection, dimension=model.dim)
+        manager = service.manager
+        name = service.collection_name
+        batch_size = max(1, options['batch_size'])
+
+        if not service.connect():
+            self.stderr.write(self.style.ERROR("Milvus'a bağlanılamadı!"))
+            return
+
+        if not manager.has_collection(name):
+            self.stdout.write(self.style.NOTICE(f"Koleksiyon yok, yeni şemayla oluşturuluyor: {name}"))
+            service.create_collection()
+            return
+
+        if service.supports_filters() and not options['force']:
+            self.stdout.write(self.style.SUCCESS(
+                f"{name} zaten skaler alanları içeriyor (şehir bölümlerine yeniden dağıtmak için --force)."
+            ))
+            return
+
+        # Tampondaki eklemeler eski koleksiyona yazılsın ki kopyaya dahil olsun
+        service.drain(seal=True)
+
+        posts_by_filename = {
+            os.path.basename(post.image.name): post
+            for post in ItemPost.objects.exclude(image__isnull=True).exclude(image="")
+        }
+
+        shadow_name = f"{name}__migrate"
+        if utility.has_collection(shadow_name):
+            utility.drop_collection(shadow_name)
+            manager.invalidate(shadow_name)
+        if not service.create_collection(shadow_name):
+            self.stderr.write(self.style.ERROR("Geçici koleksiyon oluşturulamadı!"))
+            return
+
+        source = manager.collection(name)
+        target = manager.collection(shadow_name, load=False)
+        target_fields = [field.name for field in target.schema.fields if not field.auto_id]
+
+        copied = matched = 0
+        iterator = source.query_iterator(
+            batch_size=batch_size,
+            output_fields=["id", "vector", "user_id", "image_path", "description"],
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                by_partition = {}
+                for row in rows:
+                    post = posts_by_filename.get(os.path.basename(row.get("image_path") or ""))
+                    if post is not None:
+                        matched += 1
+                    row.update(vector_metadata(post_vector_metadata(post) if post else None))
+                    by_partition.setdefault(partition_for_city(row["city"]), []).append(row)
+                for partition, group in by_partition.items():
+                    manager.ensure_partition(shadow_name, partition)
+                    target.insert([[row[field] for row in group] for field in target_fields],
+                                  partition_name=partition)
+                copied += len(rows)
+                self.stdout.write(f"  Kopyalanan: {copied}")
+        finally:
+            iterator.close()
+
+        target.flush()
+        self.stdout.write(self.style.NOTICE(
+            f"{copied} vektör kopyalandı ({matched} tanesi bir ilanla eşleşti), koleksiyonlar değiştiriliyor..."
+        ))
+
+        utility.drop_collection(name)
+        manager.invalidate(name)
+        utility.rename_collection(shadow_name, name)
+        manager.invalidate(shadow_name)
+
+        self.stdout.write(self.style.SUCCESS(f"{name} yeni şemaya taşındı."))
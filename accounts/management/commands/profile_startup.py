@@ -0,0 +1,160 @@
+"""
+Django süreçlerinin soğuk başlangıç (import) süresini uygulama bazında ölçer.
+
+Ayrı bir Python süreci `-X importtime` ile başlatılır; django.setup(),
+URLconf (tüm view'lar) ve templatetag modülleri import edilir. Sonuç:
+    - her proje uygulamasının kendi import süresi,
+    - o uygulamanın tetiklediği üçüncü parti paketlerin süresi,
+    - en ağır paketler,
+    - başlangıçta yüklenmemesi gereken modüller (varsayılan: torch, open_clip, onnxruntime).
+
+Örnek (CI'da başlangıç gerilemelerini yakalamak için):
+    python manage.py profile_startup --budget-ms 1500
+"""
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+DEFAULT_FORBIDDEN = "torch,open_clip,onnxruntime,torchvision"
+
+_PROBE_SCRIPT = r"""
+import importlib, json, pkgutil, sys
+import django
+django.setup()
+
+from django.apps import apps
+from django.urls import get_resolver
+
+get_resolver().url_patterns  # tüm view modüllerini import et
+
+for app_config in apps.get_app_configs():
+    try:
+        tags = importlib.import_module(app_config.name + ".templatetags")
+    except ImportError:
+        continue
+    for module in pkgutil.iter_modules(tags.__path__):
+        importlib.import_module(f"{tags.__name__}.{module.name}")
+
+sys.stdout.write(json.dumps(sorted({name.split(".")[0] for name in sys.modules})))
+"""
+
+
+def _parse_importtime(stderr: str) -> list:
+    """`-X importtime` çıktısını ağaç düğümlerine çevir (kök düğüm listesi)."""
+    pending = defaultdict(list)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name_part = line[len("import time:"):].split("|", 2)
+        except ValueError:
+            continue
+        raw_name = name_part[1:] if name_part.startswith(" ") else name_part
+        depth = (len(raw_name) - len(raw_name.lstrip(" "))) // 2
+        node = {
+            "name": raw_name.strip(),
+            "self": int(self_us.strip()),
+            "cumulative": int(cumulative_us.strip()),
+            "children": pending.pop(depth + 1, []),
+        }
+        pending[depth].append(node)
+    return pending.get(0, [])
+
+
+def _top_package(name: str) -> str:
+    return name.split(".")[0]
+
+
+class Command(BaseCommand):
+    help = "Django başlangıcındaki import sürelerini uygulama bazında raporlar."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--budget-ms", type=float, default=None,
+                            help="Toplam import süresi bu değeri aşarsa komut hata verir")
+        parser.add_argument("--forbid", default=DEFAULT_FORBIDDEN,
+                            help=f"Başlangıçta yüklenmemesi gereken paketler (varsayılan: {DEFAULT_FORBIDDEN})")
+        parser.add_argument("--top", type=int, default=15, help="Listelenecek en ağır paket sayısı")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        env.setdefault("DJANGO_SETTINGS_MODULE", "kayip_esya.settings")
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _PROBE_SCRIPT],
+            cwd=str(settings.BASE_DIR),
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            tail = "\n".join(proc.stderr.splitlines()[-20:])
+            raise CommandError(f"Başlangıç ölçümü başarısız oldu:\n{tail}")
+
+        roots = _parse_importtime(proc.stderr)
+        loaded = set(json.loads(proc.stdout or "[]"))
+        project_apps = self._project_apps()
+
+        own_us = defaultdict(int)
+        triggered_us = defaultdict(lambda: defaultdict(int))
+        package_us = defaultdict(int)
+
+        def walk(node, owner_app):
+            package = _top_package(node["name"])
+            package_us[package] += node["self"]
+            if package in project_apps:
+                own_us[package] += node["self"]
+                owner_app = package
+            elif owner_app:
+                # Uygulama modülünün ilk kez import ettiği üçüncü parti paket:
+                # tüm alt ağacın maliyeti o uygulamaya yazılır
+                triggered_us[owner_app][package] += node["cumulative"]
+                return
+            for child in node["children"]:
+                walk(child, owner_app)
+
+        for root in roots:
+            walk(root, None)
+
+        total_ms = sum(root["cumulative"] for root in roots) / 1000
+
+        self.stdout.write(self.style.NOTICE("Uygulama bazında import süresi"))
+        self.stdout.write(f"{'uygulama':<20} {'kendi ms':>9} {'tetiklenen ms':>14}  en ağır bağımlılıklar")
+        for app in sorted(project_apps, key=lambda a: -(own_us[a] + sum(triggered_us[a].values()))):
+            deps = sorted(triggered_us[app].items(), key=lambda item: -item[1])[:3]
+            dep_text = ", ".join(f"{name} {us / 1000:.0f}ms" for name, us in deps)
+            self.stdout.write(
+                f"{app:<20} {own_us[app] / 1000:>9.1f} {sum(triggered_us[app].values()) / 1000:>14.1f}  {dep_text}"
+            )
+
+        self.stdout.write("")
+        self.stdout.write(self.style.NOTICE(f"En ağır {options['top']} paket (kendi süresi)"))
+        for package, us in sorted(package_us.items(), key=lambda item: -item[1])[: options["top"]]:
+            self.stdout.write(f"  {package:<30} {us / 1000:>8.1f} ms")
+
+        self.stdout.write("")
+        self.stdout.write(self.style.NOTICE(f"Toplam import süresi: {total_ms:.0f} ms"))
+
+        forbidden = [name.strip() for name in options["forbid"].split(",") if name.strip()]
+        leaked = sorted(name for name in forbidden if name in loaded)
+        errors = []
+        if leaked:
+            errors.append(f"Başlangıçta yüklenmemesi gereken paketler yüklendi: {', '.join(leaked)}")
+        if options["budget_ms"] is not None and total_ms > options["budget_ms"]:
+            errors.append(f"Başlangıç bütçesi aşıldı: {total_ms:.0f} ms > {options['budget_ms']:.0f} ms")
+        if errors:
+            raise CommandError("\n".join(errors))
+        self.stdout.write(self.style.SUCCESS("Başlangıç bütçesi içinde."))
+
+    def _project_apps(self) -> set:
+        base_dir = str(settings.BASE_DIR)
+        apps = {"kayip_esya"}
+        for app in settings.INSTALLED_APPS:
+            package = _top_package(app)
+            if os.path.isdir(os.path.join(base_dir, package)):
+                apps.add(package)
+        return apps
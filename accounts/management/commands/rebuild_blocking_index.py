@@ -0,0 +1,30 @@
+"""
+Eşleştirme adaylarının bloklama indeksini veritabanından yeniden oluşturur.
+
+Redis arka ucunda (`BLOCKING_INDEX_BACKEND=redis`) sinyali atlayan toplu
+güncellemelerden (`QuerySet.update`, doğrudan SQL) sonra çalıştırılır; local
+arka uç her süreçte `BLOCKING_INDEX_TTL` saniyede bir kendini yeniler.
+
+Örnek:
+    python manage.py rebuild_blocking_index
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.blocking_index import get_blocking_index
+
+
+class Command(BaseCommand):
+    help = "Eşleştirme adaylarının bloklama indeksini yeniden oluşturur."
+
+    def handle(self, *args, **options):
+        index = get_blocking_index()
+        if index is None:
+            raise CommandError("Bloklama indeksi kapalı (BLOCKING_INDEX_BACKEND=off)")
+        try:
+            count = index.rebuild()
+        except RuntimeError as e:
+            # Redis: başka bir süreç yeniden oluşturuyor (kilit tutuluyor)
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"{type(index).__name__}: {count} aktif ilan indekslendi."
+        ))
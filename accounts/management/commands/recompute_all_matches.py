@@ -1,12 +1,19 @@
 """
 Tüm mevcut ilanlar için eşleşmeleri yeni algoritma ile yeniden hesapla
+
+İlanlar şehir şehir işlenir: bir şehrin tüm aktif ilanlarının vektörleri
+önce toplu olarak getirilir, görüntü benzerlikleri bu önbellekten hesaplanır
+(ilan başına vektör deposu çağrısı yapılmaz).
 """
+from itertools import groupby
+
 from django.core.management.base import BaseCommand
 from django.db import transaction
 
 from accounts.models import ItemPost
 from accounts.matching_service import MatchingService
 from image_matching.models import ImageMatch
+from image_matching.services import city_key
 
 
 class Command(BaseCommand):
@@ -46,38 +53,41 @@ class Command(BaseCommand):
         processed = 0
         total_matches = 0
         
+        # Adaylar aynı şehirden geldiği için vektörler şehir başına bir kez getirilir
+        ordered = sorted(posts, key=lambda post: city_key(post.city))
         with transaction.atomic():
-            for post in posts:
-                try:
-                    # Önce eşleşmeleri bul (kaydetmeden)
-                    matches = matching_service.find_matches(post)
-                    if matches:
-                        self.stdout.write(
-                            self.style.NOTICE(
-                                f"[{processed+1}/{total}] İlan {post.id} ({post.title[:30]}...): "
-                                f"{len(matches)} eşleşme bulundu"
-                            )
-                        )
-                        # Şimdi kaydet
-                        saved_count = matching_service.save_matches(post)
-                        if saved_count > 0:
-                            total_matches += saved_count
+            for _, city_posts in groupby(ordered, key=lambda post: city_key(post.city)):
+                city_posts = list(city_posts)
+                matching_service.prefetch_image_vectors(city_posts)
+                for post in city_posts:
+                    try:
+                        # Önce eşleşmeleri bul, aynı sonucu kaydet (ikinci kez aranmaz)
+                        matches = matching_service.find_matches(post)
+                        if matches:
                             self.stdout.write(
-                                self.style.SUCCESS(
-                                    f"  -> {saved_count} eşleşme kaydedildi"
+                                self.style.NOTICE(
+                                    f"[{processed+1}/{total}] İlan {post.id} ({post.title[:30]}...): "
+                                    f"{len(matches)} eşleşme bulundu"
                                 )
                             )
-                    processed += 1
-                except Exception as e:
-                    self.stdout.write(
-                        self.style.ERROR(
-                            f"[{processed+1}/{total}] İlan {post.id} hatası: {e}"
+                            saved_count = matching_service.save_matches(post, matches=matches)
+                            if saved_count > 0:
+                                total_matches += saved_count
+                                self.stdout.write(
+                                    self.style.SUCCESS(
+                                        f"  -> {saved_count} eşleşme kaydedildi"
+                                    )
+                                )
+                    except Exception as e:
+                        self.stdout.write(
+                            self.style.ERROR(
+                                f"[{processed+1}/{total}] İlan {post.id} hatası: {e}"
+                            )
                         )
-                    )
-                    import traceback
-                    traceback.print_exc()
+                        import traceback
+                        traceback.print_exc()
                     processed += 1
-                    continue
+                matching_service.clear_image_vector_cache()
         
         self.stdout.write(self.style.SUCCESS(
             f"\n{'='*60}\n"
@@ -86,4 +96,3 @@ class Command(BaseCommand):
             f"- Toplam eşleşme: {total_matches}\n"
             f"{'='*60}"
         ))
-
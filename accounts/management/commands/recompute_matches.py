@@ -1,10 +1,13 @@
-import os
+from typing import Optional
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.db import transaction
 from django.db.models import F
 
+from accounts.matching_service import post_vector_metadata
 from accounts.models import ItemPost
-from image_matching.services import ImageMatchingService
+from image_matching.services import ImageMatchingService, city_key
 from image_matching.models import ImageVector, ImageMatch
 
 
@@ -13,9 +16,13 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--top", type=int, default=10, help="Her ilan için aranacak maksimum benzer ilan sayısı")
+        parser.add_argument("--batch-size", type=int, default=32, help="Tek CLIP çağrısında vektörlenecek görüntü sayısı")
+        parser.add_argument("--search-batch", type=int, default=None,
+                            help="Tek arama çağrısındaki ilan sayısı (varsayılan: VECTOR_SEARCH_BATCH_SIZE)")
 
     def handle(self, *args, **options):
         top_k = options["top"]
+        batch_size = options["batch_size"]
         matching_service = ImageMatchingService()
 
         # Aynı kullanıcıya ait mevcut eşleşmeleri temizle
@@ -27,85 +34,124 @@ class Command(BaseCommand):
             self.stdout.write(self.style.WARNING(f"Temizlenen self-match kaydı: {deleted}"))
 
         self.stdout.write(self.style.NOTICE("1) Vektörleri oluşturuyor..."))
-        self._ensure_vectors(matching_service)
+        self._ensure_vectors(matching_service, batch_size=batch_size)
 
         self.stdout.write(self.style.NOTICE("2) Eşleşmeleri yeniden hesaplıyor..."))
         with transaction.atomic():
-            self._recompute_matches(matching_service, top_k=top_k)
+            self._recompute_matches(matching_service, top_k=top_k, search_batch=options["search_batch"])
 
         self.stdout.write(self.style.SUCCESS("Tamamlandı."))
 
-    def _ensure_vectors(self, matching_service: ImageMatchingService) -> None:
-        posts = ItemPost.objects.exclude(image__isnull=True).exclude(image="").select_related("user")
-        for post in posts:
-            filename = os.path.basename(post.image.name)
-            vector = ImageVector.objects.filter(image_path__icontains=filename).first()
-            if vector:
-                continue
-            result = matching_service.process_image(
-                image_path=post.image.path,
-                user_id=str(post.user.id),
-                description=f"{post.title} - {post.description}",
+    def _ensure_vectors(self, matching_service: ImageMatchingService, batch_size: int = 32) -> None:
+        # Sadece aktif ilanlar: çözülen / kapanan ilanların vektörleri indekse geri eklenmez
+        posts = (
+            ItemPost.objects.filter(status="active")
+            .exclude(image__isnull=True).exclude(image="").select_related("user")
+        )
+        indexed = set(
+            ImageVector.objects.filter(model_name=matching_service.model.key, post__isnull=False)
+            .values_list("post_id", flat=True)
+        )
+        missing = [post for post in posts if post.id not in indexed]
+
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start:start + batch_size]
+            results = matching_service.process_images(
+                [
+                    {
+                        "image_path": post.image.path,
+                        "user_id": str(post.user.id),
+                        "description": f"{post.title} - {post.description}",
+                        "metadata": post_vector_metadata(post),
+                    }
+                    for post in batch
+                ],
+                batch_size=batch_size,
             )
-            if result.get("success"):
-                self.stdout.write(self.style.SUCCESS(f"[Vektör] {post.id} -> {result.get('vector_id')}"))
-            else:
-                self.stdout.write(self.style.WARNING(f"[Vektör HATA] {post.id}: {result.get('error')}"))
-
-    def _recompute_matches(self, matching_service: ImageMatchingService, top_k: int = 10) -> None:
-        posts = ItemPost.objects.exclude(image__isnull=True).exclude(image="").filter(status="active")
-
-        for post in posts:
-            source_vec = self._get_vector_for_post(post)
-            if not source_vec:
+            for post, result in zip(batch, results):
+                if result.get("success"):
+                    self.stdout.write(self.style.SUCCESS(f"[Vektör] {post.id} -> {result.get('vector_id')}"))
+                else:
+                    self.stdout.write(self.style.WARNING(f"[Vektör HATA] {post.id}: {result.get('error')}"))
+
+        if missing:
+            # Tampondaki eklemeleri yaz ve segmentleri bir kez mühürle
+            matching_service.milvus.drain(seal=True)
+
+    def _recompute_matches(self, matching_service: ImageMatchingService, top_k: int = 10,
+                           search_batch: Optional[int] = None) -> None:
+        posts = list(ItemPost.objects.exclude(image__isnull=True).exclude(image="").filter(status="active"))
+        # Aynı şehir / türdeki ilanlar aynı filtre grubunda toplu aranır
+        posts.sort(key=lambda post: (city_key(post.city), post.post_type))
+        chunk_size = max(1, search_batch or getattr(settings, "VECTOR_SEARCH_BATCH_SIZE", 256))
+
+        for start in range(0, len(posts), chunk_size):
+            chunk = {post.id: post for post in posts[start:start + chunk_size]}
+            # İlanın birden fazla kaydı varsa en yenisi kullanılır
+            latest = {
+                source_vec.post_id: source_vec
+                for source_vec in ImageVector.objects.filter(
+                    post_id__in=list(chunk), model_name=matching_service.model.key
+                ).order_by("created_at")
+            }
+            sources = {
+                source_vec.vector_id: (chunk[post_id], source_vec)
+                for post_id, source_vec in latest.items()
+            }
+            if not sources:
                 continue
 
-            opposite_type = "found" if post.post_type == "lost" else "lost"
-            matches = matching_service.find_similar_images(post.image.path, top_k=top_k, source_vector_id=None)
-
-            created = 0
-            for m in matches:
-                target_vec = ImageVector.objects.filter(vector_id=m.get("id")).first()
-                if not target_vec or target_vec == source_vec:
-                    continue
-
-                target_post = self._get_post_by_vector(
-                    target_vec,
-                    post_type=opposite_type,
-                    exclude_user_id=post.user_id,
-                )
-                if not target_post:
-                    continue
-
-                similarity = float(m.get("similarity", 0.0))
-                match_conf = max(0.0, min(1.0, similarity))
-
-                obj, was_created = ImageMatch.objects.get_or_create(
-                    source_vector=source_vec,
-                    target_vector=target_vec,
-                    defaults={
-                        "similarity_score": similarity,
-                        "match_confidence": match_conf,
-                    },
-                )
-                if was_created:
-                    created += 1
-
-            if created:
-                self.stdout.write(self.style.SUCCESS(f"[Eşleşme] Post {post.id} için {created} yeni eşleşme eklendi"))
-
-    def _get_vector_for_post(self, post: ItemPost):
-        filename = os.path.basename(post.image.name)
-        return ImageVector.objects.filter(image_path__icontains=filename).first()
-
-    def _get_post_by_vector(self, vec: ImageVector, post_type: str, exclude_user_id=None):
-        filename = os.path.basename(vec.image_path)
-        qs = ItemPost.objects.filter(
-            image__icontains=filename,
-            post_type=post_type,
-            status="active",
-        )
-        if exclude_user_id:
-            qs = qs.exclude(user_id=exclude_user_id)
-        return qs.first()
-
+            # Karşıt tür / aynı şehir / aktif / başka kullanıcı filtresi indeks aramasında uygulanır;
+            # parçadaki tüm ilanlar çok sorgulu tek RPC ile aranır
+            results = matching_service.find_similar_by_vector_ids(
+                list(sources),
+                top_k=top_k,
+                filters=[
+                    {
+                        "post_type": "found" if post.post_type == "lost" else "lost",
+                        "city": post.city,
+                        "status": "active",
+                        "exclude_user_id": str(post.user_id),
+                    }
+                    for post, _ in sources.values()
+                ],
+                batch_size=chunk_size,
+            )
+            target_vectors = ImageVector.objects.in_bulk(
+                {m.get("id") for matches in results.values() for m in matches}, field_name="vector_id"
+            )
+            target_posts = ItemPost.objects.filter(
+                id__in={vec.post_id for vec in target_vectors.values() if vec.post_id is not None},
+                status="active",
+            ).in_bulk()
+
+            for vector_id, matches in results.items():
+                post, source_vec = sources[vector_id]
+                opposite_type = "found" if post.post_type == "lost" else "lost"
+                created = 0
+                for m in matches:
+                    target_vec = target_vectors.get(m.get("id"))
+                    if not target_vec or target_vec == source_vec:
+                        continue
+
+                    target_post = target_posts.get(target_vec.post_id)
+                    if (not target_post or target_post.post_type != opposite_type
+                            or target_post.user_id == post.user_id):
+                        continue
+
+                    similarity = float(m.get("similarity", 0.0))
+                    match_conf = max(0.0, min(1.0, similarity))
+
+                    obj, was_created = ImageMatch.objects.get_or_create(
+                        source_vector=source_vec,
+                        target_vector=target_vec,
+                        defaults={
+                            "similarity_score": similarity,
+                            "match_confidence": match_conf,
+                        },
+                    )
+                    if was_created:
+                        created += 1
+
+                if created:
+                    self.stdout.write(self.style.SUCCESS(f"[Eşleşme] Post {post.id} için {created} yeni eşleşme eklendi"))
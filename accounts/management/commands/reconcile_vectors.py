@@ -0,0 +1,129 @@
+"""
+Vektör indeksini (Milvus / yerel depo) ImageVector tablosu ve ilanlarla uzlaştırır.
+
+Sinyaller ilan kapandığında / silindiğinde vektörleri indeksten kaldırır;
+sinyalleri atlayan işlemler (QuerySet.update, toplu silme, çöken süreçler)
+için bu komut periyodik çalıştırılır (örn. cron ile gecelik):
+
+    0 4 * * * python manage.py reconcile_vectors --fix
+
+Her embedding modeli için raporlanan durumlar:
+
+    - yetim        : indekste olup ImageVector kaydı olmayan vektörler
+    - pasif        : ilanı aktif olmadığı veya silindiği halde indekste duran vektörler
+    - geri eklenecek: ilanı yeniden aktif olduğu halde `is_found` işaretli vektörler
+    - eksik        : aktif ilanın kaydı olup indekste olmayan vektörler
+                     (düzeltmek için reindex_images)
+    - ilansız      : bir ilana bağlı olmayan kayıtlar (API yüklemeleri;
+                     ilan görselleri için bkz. link_image_vectors)
+
+`--fix` ile yetim ve pasif vektörler indeksten silinir, pasiflerin kaydı
+`is_found` işaretlenir, geri eklenecekler indekse geri yazılır ve silmeler
+sonrası indeks sıkıştırılır (compaction).
+
+Örnek:
+    python manage.py reconcile_vectors
+    python manage.py reconcile_vectors --model clip-default --fix
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from accounts.matching_service import post_vector_metadata
+from accounts.models import ItemPost
+from image_matching.model_registry import get_model_registry
+from image_matching.models import ImageVector
+from image_matching.services import get_vector_service
+from image_matching.vector_lifecycle import restore_vectors
+
+
+class Command(BaseCommand):
+    help = "Vektör indeksini ImageVector tablosu ve ilan durumlarıyla uzlaştırır, yetimleri raporlar."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=None,
+                            help='Sadece bu embedding modeli (varsayılan: yapılandırılmış tüm modeller)')
+        parser.add_argument('--fix', action='store_true',
+                            help='Yetim / pasif vektörleri indeksten sil, geri eklenecekleri geri yaz ve sıkıştır')
+        parser.add_argument('--show', type=int, default=5,
+                            help='Her durum için örnek olarak yazdırılacak id sayısı')
+
+    def handle(self, *args, **options):
+        registry = get_model_registry()
+        keys = [options['model']] if options['model'] else registry.keys()
+
+        posts = ItemPost.objects.exclude(image__isnull=True).exclude(image="").in_bulk()
+        for key in keys:
+            self._reconcile(registry.get(key), key == registry.default, posts, options)
+
+    def _reconcile(self, model, is_default_model: bool, posts: dict, options) -> None:
+        service = get_vector_service(model.collection, model.dim)
+        self.stdout.write(self.style.NOTICE(f"{model.identity} -> {service.collection_name}"))
+        if not service.connect():
+            self.stderr.write(self.style.ERROR("  Vektör deposuna bağlanılamadı!"))
+            return
+        if not service.has_collection():
+            self.stdout.write("  Koleksiyon yok, atlandı.")
+            return
+
+        service.drain()
+        index_ids = service.vector_ids()
+        records = ImageVector.objects.filter(
+            Q(model_name=model.key) | Q(model_name='') if is_default_model else Q(model_name=model.key)
+        )
+
+        known = set()
+        inactive, restorable, missing, unlinked = [], {}, [], []
+        rows = records.values_list('vector_id', 'post_id', 'image_path', 'is_found')
+        for vector_id, post_id, image_path, is_found in rows:
+            known.add(vector_id)
+            post = posts.get(post_id) if post_id is not None else None
+            in_index = vector_id in index_ids
+            if post is None:
+                # Bir ilana bağlı olmayan kayıt (API yüklemesi) veya ilanı silinmiş
+                if in_index and '/item_images/' in (image_path or '').replace('\\', '/'):
+                    inactive.append(vector_id)
+                else:
+                    unlinked.append(vector_id)
+            elif post.status != 'active':
+                if in_index:
+                    inactive.append(vector_id)
+            elif is_found:
+                restorable[post.id] = post
+            elif not in_index:
+                missing.append(vector_id)
+        orphans = sorted(index_ids - known)
+
+        self._report("yetim", orphans, options['show'])
+        self._report("pasif", inactive, options['show'])
+        self._report("geri eklenecek (ilan)", list(restorable), options['show'])
+        self._report("eksik", missing, options['show'])
+        self._report("ilansız", unlinked, options['show'])
+        if missing:
+            self.stdout.write(self.style.WARNING(
+                f"  Eksik vektörler için: python manage.py reindex_images --model {model.key} --force"
+            ))
+
+        if not options['fix']:
+            return
+        to_delete = orphans + inactive
+        if to_delete:
+            if service.delete_vectors(to_delete):
+                ImageVector.objects.filter(vector_id__in=inactive).update(is_found=True)
+                self.stdout.write(self.style.SUCCESS(f"  {len(to_delete)} vektör indeksten silindi."))
+            else:
+                self.stderr.write(self.style.ERROR("  Vektörler silinemedi!"))
+        restored = sum(
+            restore_vectors(post_id, metadata=post_vector_metadata(post))
+            for post_id, post in restorable.items()
+        )
+        if restored:
+            self.stdout.write(self.style.SUCCESS(f"  {restored} vektör indekse geri eklendi."))
+        service.drain(seal=True)
+        if to_delete and service.compact():
+            self.stdout.write(self.style.SUCCESS("  İndeks sıkıştırma başlatıldı."))
+
+    def _report(self, label: str, ids: list, show: int) -> None:
+        line = f"  {label:<22}: {len(ids)}"
+        if ids and show:
+            line += f"  (örn. {', '.join(str(i) for i in ids[:show])})"
+        self.stdout.write(self.style.WARNING(line) if ids else line)
@@ -4,10 +4,10 @@ Milvus koleksiyonunu IP metric ile yeniden oluşturur ve tüm görüntüleri yen
 import os
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from pymilvus import utility
-
+from accounts.matching_service import post_vector_metadata
 from accounts.models import ItemPost
-from image_matching.services import ImageMatchingService, MilvusService
+from image_matching.model_registry import get_model_registry
+from image_matching.services import ImageMatchingService
 from image_matching.models import ImageVector, ImageMatch
 
 
@@ -20,25 +20,40 @@ class Command(BaseCommand):
             action='store_true',
             help='Koleksiyonu silip yeniden oluştur (dikkatli kullanın!)'
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=32,
+            help='Tek CLIP çağrısında vektörlenecek görüntü sayısı'
+        )
+        parser.add_argument(
+            '--model',
+            default=None,
+            help='Yeniden indekslenecek embedding modeli (settings.EMBEDDING_MODELS anahtarı; varsayılan: DEFAULT_EMBEDDING_MODEL)'
+        )
 
     def handle(self, *args, **options):
         force = options.get('force', False)
+        batch_size = options.get('batch_size', 32)
         
-        milvus_service = MilvusService()
-        matching_service = ImageMatchingService()
-
-        # 1. Milvus'a bağlan
-        self.stdout.write(self.style.NOTICE("1) Milvus'a bağlanılıyor..."))
+        matching_service = ImageMatchingService(model=options.get('model'))
+        milvus_service = matching_service.milvus
+        model = matching_service.model
+        is_default_model = model.key == get_model_registry().default
+        self.stdout.write(self.style.NOTICE(f"Embedding modeli: {model.identity} -> {milvus_service.collection_name}"))
+
+        # 1. Vektör deposuna bağlan (Milvus veya VECTOR_BACKEND=local)
+        self.stdout.write(self.style.NOTICE("1) Vektör deposuna bağlanılıyor..."))
         if not milvus_service.connect():
             self.stderr.write(self.style.ERROR("Milvus'a bağlanılamadı!"))
             return
 
         # 2. Koleksiyonu sil ve yeniden oluştur
         collection_name = milvus_service.collection_name
-        if utility.has_collection(collection_name):
+        if milvus_service.has_collection():
             if force:
                 self.stdout.write(self.style.WARNING(f"2) Mevcut koleksiyon siliniyor: {collection_name}"))
-                utility.drop_collection(collection_name)
+                milvus_service.drop_collection()
                 self.stdout.write(self.style.SUCCESS("Koleksiyon silindi."))
             else:
                 self.stdout.write(self.style.WARNING(
@@ -54,62 +69,99 @@ class Command(BaseCommand):
             return
         self.stdout.write(self.style.SUCCESS("Koleksiyon oluşturuldu (IP metric)."))
 
-        # 4. Tüm ImageVector kayıtlarını temizle (eski vector_id'ler artık geçersiz)
+        # 4. Bu modelin ImageVector kayıtlarını temizle (eski vector_id'ler artık geçersiz)
         self.stdout.write(self.style.NOTICE("4) Eski ImageVector kayıtları temizleniyor..."))
-        vector_count = ImageVector.objects.count()
-        ImageVector.objects.all().delete()
-        self.stdout.write(self.style.SUCCESS(f"{vector_count} eski ImageVector kaydı silindi."))
+        old_vectors = ImageVector.objects.filter(model_name=model.key)
+        vector_count = old_vectors.count()
 
-        # 5. Tüm ImageMatch kayıtlarını temizle
+        # 5. Bu modelin ImageMatch kayıtlarını temizle
         self.stdout.write(self.style.NOTICE("5) Eski ImageMatch kayıtları temizleniyor..."))
-        match_count = ImageMatch.objects.count()
-        ImageMatch.objects.all().delete()
+        old_matches = ImageMatch.objects.filter(source_vector__model_name=model.key)
+        match_count = old_matches.count()
+        with transaction.atomic():
+            old_matches.delete()
+            old_vectors.delete()
+        self.stdout.write(self.style.SUCCESS(f"{vector_count} eski ImageVector kaydı silindi."))
         self.stdout.write(self.style.SUCCESS(f"{match_count} eski ImageMatch kaydı silindi."))
 
         # 6. Tüm ItemPost görüntülerini yeniden işle
-        self.stdout.write(self.style.NOTICE("6) Tüm görüntüler yeniden işleniyor..."))
-        posts = ItemPost.objects.exclude(image__isnull=True).exclude(image="").select_related("user")
+        self.stdout.write(self.style.NOTICE("6) Aktif ilanların görüntüleri yeniden işleniyor..."))
+        # Çözülen / kapanan ilanların vektörleri indekse geri eklenmez (bkz. vector_lifecycle)
+        posts = (
+            ItemPost.objects.filter(status="active")
+            .exclude(image__isnull=True).exclude(image="").select_related("user")
+        )
         total = posts.count()
         processed = 0
         failed = 0
 
+        batch = []
         for post in posts:
-            try:
-                if not os.path.exists(post.image.path):
-                    self.stdout.write(self.style.WARNING(f"Görüntü bulunamadı: {post.image.path}"))
-                    failed += 1
-                    continue
-
-                result = matching_service.process_image(
-                    image_path=post.image.path,
-                    user_id=str(post.user.id),
-                    description=f"{post.title} - {post.description}",
-                )
-
-                if result.get("success"):
-                    processed += 1
-                    if processed % 10 == 0:
-                        self.stdout.write(f"  İşlenen: {processed}/{total}")
-                else:
-                    failed += 1
-                    self.stdout.write(self.style.WARNING(
-                        f"Post {post.id} işlenemedi: {result.get('error')}"
-                    ))
-            except Exception as e:
+            if not os.path.exists(post.image.path):
+                self.stdout.write(self.style.WARNING(f"Görüntü bulunamadı: {post.image.path}"))
                 failed += 1
-                self.stdout.write(self.style.ERROR(f"Post {post.id} hatası: {e}"))
+                continue
+            batch.append(post)
+            if len(batch) >= batch_size:
+                ok, bad = self._process_batch(matching_service, batch, batch_size)
+                processed += ok
+                failed += bad
+                self.stdout.write(f"  İşlenen: {processed}/{total}")
+                batch = []
+        if batch:
+            ok, bad = self._process_batch(matching_service, batch, batch_size)
+            processed += ok
+            failed += bad
+
+        # Tampondaki eklemeleri yaz ve segmentleri bir kez mühürle
+        if not milvus_service.drain(seal=True):
+            self.stderr.write(self.style.ERROR("Milvus tamponu boşaltılamadı!"))
 
         self.stdout.write(self.style.SUCCESS(
             f"Görüntü işleme tamamlandı: {processed} başarılı, {failed} başarısız"
         ))
 
-        # 7. Eşleşmeleri yeniden hesapla
-        self.stdout.write(self.style.NOTICE("7) Eşleşmeler yeniden hesaplanıyor..."))
-        from accounts.management.commands.recompute_matches import Command as RecomputeCommand
-        recompute_cmd = RecomputeCommand()
-        recompute_cmd._recompute_matches(matching_service, top_k=10)
+        # 7. Eşleşmeleri yeniden hesapla (eşleştirme sadece varsayılan modeli kullanır)
+        if is_default_model:
+            self.stdout.write(self.style.NOTICE("7) Eşleşmeler yeniden hesaplanıyor..."))
+            from accounts.management.commands.recompute_matches import Command as RecomputeCommand
+            recompute_cmd = RecomputeCommand()
+            recompute_cmd._recompute_matches(matching_service, top_k=10)
+        else:
+            self.stdout.write(self.style.NOTICE("7) Deneysel model: eşleşmeler yeniden hesaplanmadı."))
 
         self.stdout.write(self.style.SUCCESS("\nYeniden indeksleme tamamlandi!"))
         self.stdout.write(self.style.SUCCESS(f"   - {processed} goruntu islendi"))
         self.stdout.write(self.style.SUCCESS(f"   - IP metric (cosine similarity) kullaniliyor"))
 
+    def _process_batch(self, matching_service: ImageMatchingService, posts, batch_size: int):
+        """Bir grup ilanın görüntüsünü tek CLIP batch'i ile işle."""
+        processed = 0
+        failed = 0
+        try:
+            results = matching_service.process_images(
+                [
+                    {
+                        'image_path': post.image.path,
+                        'user_id': str(post.user.id),
+                        'description': f"{post.title} - {post.description}",
+                        'metadata': post_vector_metadata(post),
+                    }
+                    for post in posts
+                ],
+                batch_size=batch_size,
+            )
+        except Exception as e:
+            for post in posts:
+                self.stdout.write(self.style.ERROR(f"Post {post.id} hatası: {e}"))
+            return 0, len(posts)
+
+        for post, result in zip(posts, results):
+            if result.get("success"):
+                processed += 1
+            else:
+                failed += 1
+                self.stdout.write(self.style.WARNING(
+                    f"Post {post.id} işlenemedi: {result.get('error')}"
+                ))
+        return processed, failed
@@ -5,22 +5,74 @@ Yeni eşleştirme algoritması:
 - Özellik benzerliği (kategori, renk, marka, başlık, açıklama) - %50 ağırlık
 - Toplam benzerlik skoru
 """
-import os
 import re
 from typing import List, Dict, Optional, Tuple
 from django.db.models import Q
 
 from accounts.models import ItemPost
+from accounts.blocking_index import blocked_candidate_ids
 from accounts.constants import MATCH_NOTIFY_THRESHOLD
-from image_matching.services import ImageMatchingService
+from accounts.scoring import CandidateScorer
+from image_matching.services import FaceMatchingService, ImageMatchingService, MilvusService, city_key
 from image_matching.models import ImageVector, ImageMatch
 
 
+def extract_category(post: ItemPost) -> Optional[str]:
+    """
+    İlanın kayıtta çıkarılmış kategorisi (bkz. `accounts.attributes`).
+    
+    Burada daha ince gruplar kullanıyoruz ki:
+    - Telefon sadece telefonla
+    - Bilgisayar sadece bilgisayarla
+    - Cüzdan sadece cüzdanla
+    - Çocuk sadece çocukla
+    eşleşsin.
+    """
+    return post.category or None
+
+
+def post_vector_metadata(post: ItemPost) -> dict:
+    """Milvus'ta vektörle birlikte tutulan, aramada filtre olarak kullanılan ilan meta verisi"""
+    return {
+        'post_id': post.id,
+        'post_type': post.post_type,
+        'city': city_key(post.city),
+        'category': extract_category(post) or '',
+        'status': post.status,
+        'is_missing_child': bool(getattr(post, 'is_missing_child', False)),
+    }
+
+
 class MatchingService:
     """Yeni eşleştirme servisi"""
     
     def __init__(self):
         self.image_service = ImageMatchingService()
+        self.face_service = FaceMatchingService()
+        # Toplu işlerde önceden getirilmiş vektörler: {vector_id: vektör}
+        self._vector_cache: Dict[str, object] = {}
+        # Son `find_matches` çağrısının aşama sayaçları (bkz. accounts/scoring.py)
+        self.last_match_stats: Dict[str, int] = {}
+    
+    def prefetch_image_vectors(self, posts: List[ItemPost]) -> int:
+        """
+        Toplu yeniden hesaplama için ilanların kayıtlı vektörlerini tek seferde
+        (VECTOR_QUERY_BATCH'lik sorgularla) getirip önbelleğe al; sonraki
+        `calculate_image_similarities` çağrıları vektör deposuna gitmez.
+        Dönen değer önbellekteki vektör sayısıdır.
+        """
+        vector_ids = [
+            vector_id for vector_id in self._vector_ids_for_posts(posts).values()
+            if vector_id not in self._vector_cache
+        ]
+        if vector_ids:
+            self._vector_cache.update(self.image_service.milvus.get_vectors(
+                vector_ids, cities=sorted({post.city for post in posts}),
+            ))
+        return len(self._vector_cache)
+    
+    def clear_image_vector_cache(self) -> None:
+        self._vector_cache = {}
     
     def calculate_feature_similarity(self, post1: ItemPost, post2: ItemPost) -> float:
         """
@@ -29,20 +81,20 @@ class MatchingService:
         Özellikler:
         - Başlık benzerliği (%20)
         - Açıklama benzerliği (%20)
-        - Kategori benzerliği (%30) - description'dan parse edilir
-        - Renk benzerliği (%15) - description'dan parse edilir
-        - Marka benzerliği (%15) - description'dan parse edilir
+        - Kategori benzerliği (%30) - kayıtta çıkarılmış `category`
+        - Renk benzerliği (%15) - kayıtta çıkarılmış `color`
+        - Marka benzerliği (%15) - kayıtta çıkarılmış `brand`
         """
         score = 0.0
         total_weight = 0.0
         
-        # 1. Başlık benzerliği (%20)
-        title_sim = self._text_similarity(post1.title.lower(), post2.title.lower())
+        # 1. Başlık benzerliği (%20) - kayıtta normalize edilmiş kelimelerle
+        title_sim = self._text_similarity(post1.title_tokens, post2.title_tokens)
         score += title_sim * 0.20
         total_weight += 0.20
         
         # 2. Açıklama benzerliği (%20)
-        desc_sim = self._text_similarity(post1.description.lower(), post2.description.lower())
+        desc_sim = self._text_similarity(post1.description_tokens, post2.description_tokens)
         score += desc_sim * 0.20
         total_weight += 0.20
         
@@ -103,127 +155,120 @@ class MatchingService:
         return len(intersection) / len(union)
     
     def _extract_category(self, post: ItemPost) -> Optional[str]:
-        """
-        Açıklamadan / başlıktan kategori bilgisini çıkar.
-        
-        Burada daha ince gruplar kullanıyoruz ki:
-        - Telefon sadece telefonla
-        - Bilgisayar sadece bilgisayarla
-        - Cüzdan sadece cüzdanla
-        - Çocuk sadece çocukla
-        eşleşsin.
-        """
-        # Önce kayıp çocuk kontrolü yap
-        if hasattr(post, 'is_missing_child') and post.is_missing_child:
-            return "cocuk"
-        
-        text = f"{post.title} {post.description}".lower()
-        
-        # Önce açıklamada "Kategori: Hayvan" kontrolü yap
-        if "kategori: hayvan" in text or "[kategori: hayvan" in text:
-            return "hayvan"
-        
-        categories = {
-            "cocuk": ["kayıp çocuk", "missing child", "kayıp çocuk", "bulunan çocuk", "found child", "çocuk"],
-            "hayvan": ["hayvan", "pet", "köpek", "kedi", "kuş", "animal", "dog", "cat", "bird"],
-            "telefon": ["telefon", "phone", "iphone", "android"],
-            "bilgisayar": ["bilgisayar", "laptop", "computer", "macbook", "notebook"],
-            "cüzdan": ["cüzdan", "wallet", "kartlık"],
-            "gözlük": ["gözlük", "glasses", "sunglasses"],
-            "anahtar": ["anahtar", "key", "anahtarlık"],
-            "çanta": ["çanta", "bag", "sırt çantası"],
-            "saat": ["saat", "watch", "kol saati"],
-        }
-        
-        for cat, keywords in categories.items():
-            if any(keyword in text for keyword in keywords):
-                return cat
-        
-        return None
+        """Kayıtlı kategori (bkz. `extract_category`)"""
+        return extract_category(post)
     
     def _extract_color(self, post: ItemPost) -> Optional[str]:
-        """Açıklamadan renk bilgisini çıkar"""
-        desc = post.description.lower()
-        
-        colors = ['siyah', 'beyaz', 'kırmızı', 'mavi', 'yeşil', 'sarı', 'mor', 
-                  'pembe', 'turuncu', 'kahverengi', 'gri', 'lacivert', 'bej',
-                  'black', 'white', 'red', 'blue', 'green', 'yellow', 'purple',
-                  'pink', 'orange', 'brown', 'gray', 'grey']
-        
-        for color in colors:
-            if color in desc:
-                return color
-        
-        return None
+        """Kayıtta açıklamadan çıkarılmış renk"""
+        return post.color or None
     
     def _extract_brand(self, post: ItemPost) -> Optional[str]:
-        """Açıklamadan marka bilgisini çıkar"""
-        desc = post.description.lower()
-        
-        brands = ['apple', 'samsung', 'huawei', 'xiaomi', 'sony', 'lg', 'nike',
-                  'adidas', 'ray-ban', 'gucci', 'prada', 'louis vuitton', 'lv']
-        
-        for brand in brands:
-            if brand in desc:
-                return brand
-        
-        return None
+        """Kayıtta açıklamadan çıkarılmış marka"""
+        return post.brand or None
     
     def calculate_image_similarity(self, post1: ItemPost, post2: ItemPost) -> float:
         """İki ilan arasındaki görüntü benzerliğini hesapla"""
-        if not post1.image or not post2.image:
-            return 0.0
+        return self.calculate_image_similarities(post1, [post2]).get(post2.id, 0.0)
+    
+    def calculate_image_similarities(self, post: ItemPost, candidates: List[ItemPost]) -> Dict[int, float]:
+        """
+        İlan ile aday ilanlar arasındaki görüntü benzerlikleri: {aday_id: 0-1}.
+        
+        Kayıtlı vektörler id ile tek seferde getirilir ve benzerlik doğrudan
+        iç çarpımla hesaplanır (ANN araması / top_k sınırı yok). Görseli veya
+        vektörü olmayan adaylar için 0.0 döner.
+        """
+        scores = {candidate.id: 0.0 for candidate in candidates}
+        if not post.image:
+            return scores
         
         try:
-            # İlk ilanın vektörünü bul veya oluştur
-            vec1 = self._get_vector_for_post(post1)
-            if not vec1:
+            # İlanın vektörünü bul veya oluştur
+            source_vec = self._get_vector_for_post(post)
+            if not source_vec:
                 result = self.image_service.process_image(
-                    image_path=post1.image.path,
-                    user_id=str(post1.user.id),
-                    description=f"{post1.title} - {post1.description}",
+                    image_path=post.image.path,
+                    user_id=str(post.user.id),
+                    description=f"{post.title} - {post.description}",
+                    metadata=post_vector_metadata(post),
                 )
                 if not result.get("success"):
-                    return 0.0
-                vec1 = self._get_vector_for_post(post1)
-            
-            if not vec1:
-                return 0.0
+                    return scores
+                source_vec = self._get_vector_for_post(post)
             
-            # İkinci ilanın vektörünü bul
-            vec2 = self._get_vector_for_post(post2)
-            if not vec2:
-                return 0.0
+            if not source_vec:
+                return scores
             
-            # Benzerlik skorunu bul
-            matches = self.image_service.find_similar_images(
-                image_path=post1.image.path,
-                top_k=100,  # Daha fazla sonuç al
-                source_vector_id=vec1.vector_id,
-            )
-            
-            # İkinci ilanın vector_id'sini bul
-            for match in matches:
-                if match.get('id') == vec2.vector_id:
-                    return float(match.get('similarity', 0.0))
+            # Adayların vektörlerini bul
+            target_vecs = self._vector_ids_for_posts(candidates)
+            if not target_vecs:
+                return scores
             
-            return 0.0
+            cached = self._vector_cache
+            if source_vec.vector_id in cached and all(v in cached for v in target_vecs.values()):
+                similarities = self._cached_similarities(source_vec.vector_id, list(target_vecs.values()))
+            else:
+                similarities = self.image_service.milvus.similarities(
+                    source_vec.vector_id,
+                    list(target_vecs.values()),
+                    cities=[post.city] + [candidate.city for candidate in candidates],
+                )
+            for candidate_id, vector_id in target_vecs.items():
+                scores[candidate_id] = similarities.get(vector_id, 0.0)
+            return scores
             
         except Exception as e:
             print(f"Görüntü benzerliği hesaplama hatası: {e}")
-            return 0.0
+            return scores
+    
+    def _cached_similarities(self, source_id: str, target_ids: List[str]) -> Dict[str, float]:
+        """`similarities` ile aynı hesap, önceden getirilmiş vektörlerle."""
+        import numpy as np
+        
+        matrix = np.stack([self._vector_cache[vector_id] for vector_id in target_ids]).astype(np.float32)
+        scores = matrix @ np.asarray(self._vector_cache[source_id], dtype=np.float32)
+        return {
+            vector_id: MilvusService._match(float(score))['similarity']
+            for vector_id, score in zip(target_ids, scores)
+        }
     
     def _get_vector_for_post(self, post: ItemPost) -> Optional[ImageVector]:
-        """İlan için ImageVector'ı bul"""
+        """İlan için ImageVector'ı bul (`post` FK indeksiyle)"""
         if not post.image:
             return None
-        filename = os.path.basename(post.image.name)
-        return ImageVector.objects.filter(image_path__icontains=filename).first()
+        return ImageVector.objects.filter(
+            post_id=post.id, model_name=self.image_service.model.key
+        ).first()
+    
+    def _vector_ids_for_posts(self, posts: List[ItemPost]) -> Dict[int, str]:
+        """Görselli ilanların vector_id'leri tek sorguda: {ilan_id: vector_id}"""
+        post_ids = [post.id for post in posts if post.image]
+        if not post_ids:
+            return {}
+        rows = ImageVector.objects.filter(
+            post_id__in=post_ids, model_name=self.image_service.model.key
+        ).order_by('created_at').values_list('post_id', 'vector_id')
+        # Aynı ilanın birden fazla kaydı varsa `.first()` gibi en yenisi kullanılır
+        return dict(rows)
+    
+    def calculate_face_similarity(self, post1: ItemPost, post2: ItemPost) -> Optional[float]:
+        """İki çocuk ilanının yüz benzerliği (PERSON_COLLECTION); yüz yoksa None"""
+        if not post1.image or not post2.image:
+            return None
+        try:
+            return self.face_service.face_similarity(post1.image.path, post2.id)
+        except Exception as e:
+            print(f"Yüz benzerliği hesaplama hatası: {e}")
+            return None
     
-    def calculate_child_similarity(self, post1: ItemPost, post2: ItemPost) -> float:
+    def calculate_child_similarity(self, post1: ItemPost, post2: ItemPost,
+                                   image_sim: Optional[float] = None) -> float:
         """
         Çocuklar için özel benzerlik hesaplama
         
+        image_sim: önceden (toplu) hesaplanmış CLIP görüntü benzerliği; yüz
+        vektörü yoksa bu değer kullanılır, verilmemişse hesaplanır.
+        
         Formül:
         - Görüntü benzerliği: %50 ağırlık (yüz tanıma için kritik)
         - Özellik benzerliği: %50 ağırlık
@@ -243,8 +288,13 @@ class MatchingService:
             post1.child_gender.lower() != post2.child_gender.lower()):
             return 0.0
         
-        # Görüntü benzerliği
-        image_sim = self.calculate_image_similarity(post1, post2)
+        # Görüntü benzerliği: önce kişi koleksiyonundaki yüz vektörleri,
+        # yüz yoksa genel CLIP görüntü benzerliği
+        face_sim = self.calculate_face_similarity(post1, post2)
+        if face_sim is not None:
+            image_sim = face_sim
+        elif image_sim is None:
+            image_sim = self.calculate_image_similarity(post1, post2)
         
         # Görüntü benzerliğini normalize et (çok düşükse minimum değer ver)
         if image_sim < 0.2:
@@ -371,10 +421,13 @@ class MatchingService:
         
         return min(total_sim, 1.0)  # Maksimum %100
     
-    def calculate_total_similarity(self, post1: ItemPost, post2: ItemPost) -> float:
+    def calculate_total_similarity(self, post1: ItemPost, post2: ItemPost,
+                                   image_sim: Optional[float] = None) -> float:
         """
         Toplam benzerlik skorunu hesapla
         
+        image_sim: önceden (toplu) hesaplanmış görüntü benzerliği; verilmemişse hesaplanır.
+        
         Formül:
         - Görüntü benzerliği: %40 ağırlık
         - Özellik benzerliği: %60 ağırlık (kategori daha önemli)
@@ -386,7 +439,7 @@ class MatchingService:
         cat1 = self._extract_category(post1)
         cat2 = self._extract_category(post2)
         if cat1 == "cocuk" and cat2 == "cocuk":
-            return self.calculate_child_similarity(post1, post2)
+            return self.calculate_child_similarity(post1, post2, image_sim=image_sim)
         
         # Önce kategori kontrolü yap: farklıysa hiç eşleşme sayma
         # Eğer her iki tarafta da kategori varsa ve farklıysa -> eşleşme yok
@@ -399,7 +452,8 @@ class MatchingService:
             # Birinde kategori var diğerinde yok - eşleşme yok
             return 0.0
 
-        image_sim = self.calculate_image_similarity(post1, post2)
+        if image_sim is None:
+            image_sim = self.calculate_image_similarity(post1, post2)
         feature_sim = self.calculate_feature_similarity(post1, post2)
 
         total_sim = (image_sim * 0.4) + (feature_sim * 0.6)
@@ -422,104 +476,54 @@ class MatchingService:
         opposite_type = "found" if post.post_type == "lost" else "lost"
         print(f"[FIND_MATCHES] İlan {post.id}: tip={post.post_type}, karşıt tip={opposite_type}, şehir={post.city}")
         
-        # Aynı şehirdeki karşıt tür ilanları bul (şehir adının başlangıcına göre eşleşme)
-        # Örnek: "Adıyaman, Kahta" ile "Adıyaman" eşleşir
-        city_parts = post.city.split(',')[0].strip() if post.city else ""
-        candidate_posts = ItemPost.objects.filter(
-            city__startswith=city_parts,
+        # Aynı şehirdeki karşıt tür, uyumlu (kategori / çocuk / hayvan) ilanlar
+        # bloklama indeksinden; sadece birincil anahtarla getirilir (bkz. accounts/blocking_index.py)
+        candidate_ids = blocked_candidate_ids(post)
+        if candidate_ids is not None:
+            candidate_posts = ItemPost.objects.filter(pk__in=candidate_ids)
+            source = "bloklama indeksi"
+        else:
+            # İndeks kapalı / kullanılamıyor: şehir adının başlangıcına göre eşleşme
+            # Örnek: "Adıyaman, Kahta" ile "Adıyaman" eşleşir
+            city_parts = post.city.split(',')[0].strip() if post.city else ""
+            candidate_posts = ItemPost.objects.filter(city__startswith=city_parts)
+            source = f"şehir başlangıcı: '{city_parts}'"
+        # İndeks gecikmeli olabilir: tür / durum / kullanıcı koşulları yine de uygulanır
+        candidate_posts = candidate_posts.filter(
             post_type=opposite_type,
             status="active",
         ).exclude(
             user_id=post.user_id
         )
         
-        print(f"[FIND_MATCHES] Aday ilan sayısı (şehir başlangıcı: '{city_parts}'): {candidate_posts.count()}")
+        candidates = [candidate for candidate in candidate_posts if candidate.image]
+        print(f"[FIND_MATCHES] Aday ilan sayısı ({source}): {len(candidates)}")
         
-        matches = []
-        for candidate in candidate_posts:
-            if not candidate.image:
-                continue
-            
-            # Çocuk ilanları için özel kontrol: her iki tarafta da çocuk ilanı olmalı
-            post_is_child = hasattr(post, 'is_missing_child') and post.is_missing_child
-            candidate_is_child = hasattr(candidate, 'is_missing_child') and candidate.is_missing_child
-            
-            # Hayvan ilanları için özel kontrol: her iki tarafta da hayvan ilanı olmalı
-            cat1 = self._extract_category(post)
-            cat2 = self._extract_category(candidate)
-            post_is_animal = cat1 == "hayvan"
-            candidate_is_animal = cat2 == "hayvan"
-            
-            print(f"[FIND_MATCHES] Aday {candidate.id}: çocuk ilanı={candidate_is_child}, hayvan ilanı={candidate_is_animal}, görsel={'var' if candidate.image else 'yok'}")
-            
-            if post_is_child != candidate_is_child:
-                # Biri çocuk ilanı diğeri değil -> eşleşme yok
-                print(f"[FIND_MATCHES] Aday {candidate.id} atlandı: çocuk ilanı eşleşmiyor")
-                continue
-            
-            # Hayvan ilanları için özel kontrol: hayvanlar sadece hayvanlarla eşleşmeli
-            if post_is_animal != candidate_is_animal:
-                # Biri hayvan ilanı diğeri değil -> eşleşme yok
-                print(f"[FIND_MATCHES] Aday {candidate.id} atlandı: hayvan ilanı eşleşmiyor (post hayvan={post_is_animal}, candidate hayvan={candidate_is_animal})")
-                continue
-            
-            # Kategori kontrolü - farklı kategorilerde eşleşme yok (çocuk ve hayvan hariç, çünkü zaten kontrol ettik)
-            if not (post_is_child and candidate_is_child) and not (post_is_animal and candidate_is_animal):
-                # Eğer her iki tarafta da kategori varsa ve farklıysa -> eşleşme yok
-                if cat1 and cat2:
-                    if cat1.lower() != cat2.lower():
-                        # Farklı kategoriler - eşleşme yok
-                        print(f"[FIND_MATCHES] Aday {candidate.id} atlandı: farklı kategoriler (post={cat1}, candidate={cat2})")
-                        continue
-                # Eğer birinde kategori var diğerinde yoksa -> eşleşme yok (güvenli tarafta olmak için)
-                elif (cat1 and not cat2) or (cat2 and not cat1):
-                    # Birinde kategori var diğerinde yok - eşleşme yok
-                    print(f"[FIND_MATCHES] Aday {candidate.id} atlandı: birinde kategori var diğerinde yok")
-                    continue
-            
-            # Toplam benzerlik skorunu hesapla
-            similarity = self.calculate_total_similarity(post, candidate)
-            
-            # Eşik değerleri:
-            # - Çocuk ilanları için: 0.50 (zaten daha hassas hesaplıyoruz)
-            # - Hayvan ilanları için: 0.40 (normal eşik)
-            # - Diğer tüm ilanlar için: 0.40
-            #
-            # Böylece normal eşya ilanlarında da daha fazla eşleşme görebileceksin.
-            if post_is_child and candidate_is_child:
-                threshold = 0.50
-            elif post_is_animal and candidate_is_animal:
-                threshold = 0.40  # Hayvan ilanları için normal eşik
-            else:
-                threshold = 0.40
-            
-            print(f"[FIND_MATCHES] Aday {candidate.id}: benzerlik={similarity:.2%}, eşik={threshold:.2%}, geçti={similarity >= threshold}")
-            
-            # Çocuk ilanlarında da artık eşik kontrolü var (0.50),
-            # ama genel eşik düşük olduğu için daha fazla sonuç göreceksin.
-            if similarity >= threshold:
-                matches.append({
-                    'post': candidate,
-                    'similarity': similarity,
-                    'image_similarity': self.calculate_image_similarity(post, candidate),
-                    'feature_similarity': self.calculate_feature_similarity(post, candidate),
-                })
-        
-        # Benzerlik skoruna göre sırala
-        matches.sort(key=lambda x: x['similarity'], reverse=True)
+        # Aşamalı puanlama (bkz. accounts/scoring.py): çocuk / hayvan / kategori
+        # kapıları ve özellik skoruna göre üst sınır önce; görüntü benzerliği
+        # sadece eşiği geçebilecek adaylar için tek seferde (kayıtlı vektörlerden)
+        # Eşikler: çocuk ilanları 0.50, hayvan ve diğer ilanlar 0.40
+        scorer = CandidateScorer(candidates)
+        matches = scorer.score(
+            post, lambda survivors: self.calculate_image_similarities(post, survivors), self
+        )
+        self.last_match_stats = scorer.stats
         
-        print(f"[FIND_MATCHES] Toplam {len(matches)} eşleşme bulundu")
+        print(f"[FIND_MATCHES] Toplam {len(matches)} eşleşme bulundu ({scorer.stats})")
         
         return matches
     
-    def save_matches(self, post: ItemPost) -> int:
+    def save_matches(self, post: ItemPost, matches: Optional[List[Dict]] = None) -> int:
         """
         Eşleşmeleri bul ve veritabanına kaydet
         
+        matches: daha önce `find_matches` ile bulunmuş eşleşmeler (verilmezse bulunur)
+        
         Returns:
             Kaydedilen eşleşme sayısı
         """
-        matches = self.find_matches(post)
+        if matches is None:
+            matches = self.find_matches(post)
         
         if not matches:
             return 0
@@ -534,6 +538,7 @@ class MatchingService:
                         image_path=post.image.path,
                         user_id=str(post.user.id),
                         description=f"{post.title} - {post.description}",
+                        metadata=post_vector_metadata(post),
                     )
                     if result.get("success"):
                         source_vec = self._get_vector_for_post(post)
@@ -557,6 +562,7 @@ class MatchingService:
                         image_path=target_post.image.path,
                         user_id=str(target_post.user.id),
                         description=f"{target_post.title} - {target_post.description}",
+                        metadata=post_vector_metadata(target_post),
                     )
                     if result.get("success"):
                         target_vec = self._get_vector_for_post(target_post)
@@ -0,0 +1,111 @@
+import re
+
+from django.db import migrations, models
+
+
+# `accounts.attributes` kurallarının bu migration anındaki sabit kopyası; anahtar
+# kelime listeleri sonradan değişirse `backfill_post_attributes` komutu çalıştırılır
+CATEGORY_KEYWORDS = [
+    ("cocuk", ["kayıp çocuk", "missing child", "bulunan çocuk", "found child", "çocuk"]),
+    ("hayvan", ["hayvan", "pet", "köpek", "kedi", "kuş", "animal", "dog", "cat", "bird"]),
+    ("telefon", ["telefon", "phone", "iphone", "android"]),
+    ("bilgisayar", ["bilgisayar", "laptop", "computer", "macbook", "notebook"]),
+    ("cüzdan", ["cüzdan", "wallet", "kartlık"]),
+    ("gözlük", ["gözlük", "glasses", "sunglasses"]),
+    ("anahtar", ["anahtar", "key", "anahtarlık"]),
+    ("çanta", ["çanta", "bag", "sırt çantası"]),
+    ("saat", ["saat", "watch", "kol saati"]),
+]
+COLORS = [
+    'siyah', 'beyaz', 'kırmızı', 'mavi', 'yeşil', 'sarı', 'mor',
+    'pembe', 'turuncu', 'kahverengi', 'gri', 'lacivert', 'bej',
+    'black', 'white', 'red', 'blue', 'green', 'yellow', 'purple',
+    'pink', 'orange', 'brown', 'gray', 'grey',
+]
+BRANDS = [
+    'apple', 'samsung', 'huawei', 'xiaomi', 'sony', 'lg', 'nike',
+    'adidas', 'ray-ban', 'gucci', 'prada', 'louis vuitton', 'lv',
+]
+FIELDS = ["category", "color", "brand", "title_tokens", "description_tokens"]
+WORD_RE = re.compile(r"\w+")
+
+
+def fold(text):
+    return (text or "").replace("İ", "i").replace("I", "ı").lower().replace("ı", "i")
+
+
+def first_contained(text, keywords):
+    return next((keyword for keyword in keywords if fold(keyword) in text), "")
+
+
+def attributes(post):
+    title = fold(post.title)
+    description = fold(post.description)
+    text = f"{title} {description}"
+    if post.is_missing_child:
+        category = "cocuk"
+    elif "kategori: hayvan" in text:
+        category = "hayvan"
+    else:
+        category = next(
+            (name for name, keywords in CATEGORY_KEYWORDS if first_contained(text, keywords)), ""
+        )
+    return {
+        "category": category,
+        "color": first_contained(description, COLORS),
+        "brand": first_contained(description, BRANDS),
+        "title_tokens": " ".join(dict.fromkeys(WORD_RE.findall(title))),
+        "description_tokens": " ".join(dict.fromkeys(WORD_RE.findall(description))),
+    }
+
+
+def backfill(apps, schema_editor):
+    """Mevcut ilanların özniteliklerini başlık / açıklamadan hesapla (sadece geçmiş model)."""
+    ItemPost = apps.get_model('accounts', 'ItemPost')
+    changed = []
+    rows = ItemPost.objects.only("id", "title", "description", "is_missing_child", *FIELDS)
+    for post in rows.iterator(chunk_size=500):
+        for field, value in attributes(post).items():
+            setattr(post, field, value)
+        changed.append(post)
+        if len(changed) >= 500:
+            ItemPost.objects.bulk_update(changed, FIELDS)
+            changed = []
+    if changed:
+        ItemPost.objects.bulk_update(changed, FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_itempost_child_age_itempost_child_eye_color_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itempost',
+            name='category',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=30, verbose_name='Kategori'),
+        ),
+        migrations.AddField(
+            model_name='itempost',
+            name='color',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=30, verbose_name='Renk'),
+        ),
+        migrations.AddField(
+            model_name='itempost',
+            name='brand',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=30, verbose_name='Marka'),
+        ),
+        migrations.AddField(
+            model_name='itempost',
+            name='title_tokens',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='itempost',
+            name='description_tokens',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_itempost_attributes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='itempost',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, verbose_name='Güncellenme Tarihi'),
+        ),
+    ]
@@ -2,6 +2,8 @@ from django.contrib.auth.models import AbstractUser
 from django.db import models
 from django.utils import timezone
 
+from .attributes import ATTRIBUTE_FIELDS, extract_attributes
+
 
 class User(AbstractUser):
     """Custom User model"""
@@ -56,7 +58,8 @@ class ItemPost(models.Model):
     # Kullanıcı ve tarih bilgileri
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='item_posts', verbose_name="Kullanıcı")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Oluşturulma Tarihi")
-    updated_at = models.DateTimeField(auto_now=True, verbose_name="Güncellenme Tarihi")
+    # İndeksli: bloklama indeksi başka süreçlerde kaydedilen ilanları bununla alır
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name="Güncellenme Tarihi")
     
     # Ekstra alanlar
     is_urgent = models.BooleanField(default=False, verbose_name="Acil")
@@ -81,6 +84,13 @@ class ItemPost(models.Model):
     last_seen_location = models.CharField(max_length=200, blank=True, null=True, verbose_name="Son Görüldüğü Yer")
     last_seen_clothing = models.TextField(blank=True, null=True, verbose_name="Son Görüldüğünde Üzerindeki Kıyafetler")
     
+    # Kayıtta başlık / açıklamadan çıkarılan öznitelikler (bkz. accounts/attributes.py)
+    category = models.CharField(max_length=30, blank=True, default='', db_index=True, verbose_name="Kategori")
+    color = models.CharField(max_length=30, blank=True, default='', db_index=True, verbose_name="Renk")
+    brand = models.CharField(max_length=30, blank=True, default='', db_index=True, verbose_name="Marka")
+    title_tokens = models.TextField(blank=True, default='', editable=False)
+    description_tokens = models.TextField(blank=True, default='', editable=False)
+    
     class Meta:
         db_table = 'accounts_itempost'
         ordering = ['-created_at']
@@ -90,6 +100,18 @@ class ItemPost(models.Model):
     def __str__(self):
         return f"{self.get_post_type_display()} - {self.title}"
     
+    def refresh_attributes(self) -> None:
+        """Kategori / renk / marka / kelime alanlarını başlık ve açıklamadan yeniden hesapla."""
+        for field, value in extract_attributes(self.title, self.description, self.is_missing_child).items():
+            setattr(self, field, value)
+    
+    def save(self, *args, **kwargs):
+        self.refresh_attributes()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'title', 'description', 'is_missing_child'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | set(ATTRIBUTE_FIELDS)
+        super().save(*args, **kwargs)
+    
     @property
     def is_recent(self):
         """Son 7 gün içinde oluşturulmuş mu?"""
@@ -0,0 +1,260 @@
+"""
+Aday ilanların toplu (NumPy) puanlanması.
+
+`find_matches` bir ilanın aynı şehirdeki karşıt tür adaylarını tek geçişte
+puanlar: adayların kayıtlı öznitelikleri (kategori / renk / marka kodları,
+başlık ve açıklama kelimeleri) ve görüntü benzerlikleri dizilere yüklenir;
+özellik skoru, kategori kapıları ve eşikler tüm adaylar için birlikte
+hesaplanır.
+
+Formül `MatchingService.calculate_feature_similarity` ve
+`calculate_total_similarity` ile bit düzeyinde aynıdır: ağırlıklar aynı
+sırayla toplanır, Jaccard benzerliği aynı tamsayı bölmesiyle hesaplanır
+(NumPy float64 işlemleri Python float'ı ile aynı IEEE yuvarlamasını yapar).
+Çocuk ilanı çiftleri (iki tarafın kategorisi "cocuk") yüz benzerliği RPC'si
+gerektirdiğinden `calculate_total_similarity` ile tek tek puanlanır.
+
+Puanlama aşamalıdır; pahalı görüntü terimi (CLIP vektörleri + vektör deposu)
+sadece eşiği geçebilecek adaylar için, çift başına bir kez hesaplanır:
+
+    1. kapı      : çocuk / hayvan bayrağı ve kategori uyuşmazlığı
+    2. cinsiyet  : çocuk çiftlerinde cinsiyet farkı (skor 0 olurdu)
+    3. üst sınır : görüntü benzerliği en fazla 1.0 olduğundan
+                   `1.0 * 0.4 + özellik * 0.6 < eşik` olan aday geçemez
+                   (0.40 eşiğinde sınır hep eşiğe ulaşır; pratikte sadece
+                   0.50 eşikli, "cocuk" kategorisiz çocuk çiftlerini eler)
+    4. görüntü   : kalan adayların görüntü benzerliği tek toplu çağrıyla
+    5. eşik      : 0.50 (çocuk) / 0.40
+
+Üst sınır kesindir: benzerlik [0, 1] aralığına kırpılır ve IEEE çarpma /
+toplama monotondur, yani elenen bir aday tam hesapta da eşiği geçemezdi.
+Her aşamada elenen aday sayısı `CandidateScorer.stats` (ve
+`MatchingService.last_match_stats`) ile okunur.
+
+Kıyaslama: python manage.py benchmark_scoring --candidates 10000
+"""
+from typing import Callable, Dict, List, Optional, Union
+
+from accounts.models import ItemPost
+
+
+# (özellik, ağırlık) — toplama sırası `calculate_feature_similarity` ile aynı olmalı
+FEATURE_WEIGHTS = (
+    ("title", 0.20),
+    ("description", 0.20),
+    ("category", 0.30),
+    ("color", 0.15),
+    ("brand", 0.15),
+)
+IMAGE_WEIGHT = 0.4
+FEATURE_WEIGHT = 0.6
+CHILD_THRESHOLD = 0.50
+DEFAULT_THRESHOLD = 0.40
+# Görüntü benzerliğinin üst sınırı (`MilvusService._match` [0, 1] aralığına kırpar)
+IMAGE_SIMILARITY_MAX = 1.0
+
+
+def _total_feature_weight() -> float:
+    total = 0.0
+    for _, weight in FEATURE_WEIGHTS:
+        total += weight
+    return total
+
+
+class _Vocabulary:
+    """Metin değerlerini tamsayı koda çevirir; boş değer 0."""
+
+    def __init__(self):
+        self._codes: Dict[str, int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        if not value:
+            return 0
+        return self._codes.setdefault(value, len(self._codes) + 1)
+
+
+class _TokenSets:
+    """Adayların kelime kümeleri düz dizi olarak: (kelime kodu, aday sırası)."""
+
+    def __init__(self, token_strings: List[str], vocabulary: _Vocabulary):
+        import numpy as np
+
+        ids, owners, sizes = [], [], []
+        for index, tokens in enumerate(token_strings):
+            words = set(tokens.split())
+            sizes.append(len(words))
+            for word in words:
+                ids.append(vocabulary.code(word))
+                owners.append(index)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.owners = np.asarray(owners, dtype=np.int64)
+        self.sizes = np.asarray(sizes, dtype=np.int64)
+
+    def jaccard(self, tokens: str, vocabulary: _Vocabulary):
+        """`MatchingService._text_similarity(tokens, aday)` tüm adaylar için."""
+        import numpy as np
+
+        count = len(self.sizes)
+        result = np.zeros(count, dtype=np.float64)
+        words = set(tokens.split())
+        if not words or not count:
+            return result
+        query_ids = np.asarray([vocabulary.code(word) for word in words], dtype=np.int64)
+        intersection = np.bincount(self.owners[np.isin(self.ids, query_ids)], minlength=count)
+        union = len(words) + self.sizes - intersection
+        valid = self.sizes > 0
+        result[valid] = intersection[valid] / union[valid]
+        return result
+
+
+class CandidateScorer:
+    """
+    Bir aday kümesini dizilere yükler ve kaynak ilana göre toplu puanlar.
+
+    Aynı aday kümesi birden fazla kaynak ilan için kullanılabilir (örn. aynı
+    şehirdeki tüm kayıp ilanları aynı bulunan ilanlarına karşı).
+    """
+
+    def __init__(self, candidates: List[ItemPost]):
+        import numpy as np
+
+        self.candidates = list(candidates)
+        self._vocabulary = _Vocabulary()
+        code = self._vocabulary.code
+        self.is_child = np.asarray([bool(candidate.is_missing_child) for candidate in self.candidates], dtype=bool)
+        self.category = np.asarray([code(candidate.category) for candidate in self.candidates], dtype=np.int64)
+        self.color = np.asarray([code(candidate.color) for candidate in self.candidates], dtype=np.int64)
+        self.brand = np.asarray([code(candidate.brand) for candidate in self.candidates], dtype=np.int64)
+        self.gender = np.asarray(
+            [code((candidate.child_gender or "").lower()) for candidate in self.candidates], dtype=np.int64
+        )
+        self.title_tokens = _TokenSets([c.title_tokens for c in self.candidates], self._vocabulary)
+        self.description_tokens = _TokenSets([c.description_tokens for c in self.candidates], self._vocabulary)
+        # Son `score` çağrısının aşama sayaçları
+        self.stats: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def feature_similarities(self, post: ItemPost):
+        """`calculate_feature_similarity(post, aday)` tüm adaylar için."""
+        import numpy as np
+
+        code = self._vocabulary.code
+
+        def _equal_or(values, own: int, missing: float):
+            # İki tarafta da değer varsa eşitse 1.0 / değilse 0.0, yoksa `missing`
+            return np.where((values > 0) & (own > 0), np.where(values == own, 1.0, 0.0), missing)
+
+        category = code(post.category)
+        if category:
+            category_sim = np.where(self.category > 0, np.where(self.category == category, 1.0, 0.0), 0.2)
+        else:
+            category_sim = np.where(self.category > 0, 0.2, 0.5)
+        features = {
+            "title": self.title_tokens.jaccard(post.title_tokens, self._vocabulary),
+            "description": self.description_tokens.jaccard(post.description_tokens, self._vocabulary),
+            "category": category_sim,
+            "color": _equal_or(self.color, code(post.color), 0.5),
+            "brand": _equal_or(self.brand, code(post.brand), 0.5),
+        }
+        score = np.zeros(len(self), dtype=np.float64)
+        for name, weight in FEATURE_WEIGHTS:
+            score = score + features[name] * weight
+        return score / _total_feature_weight()
+
+    def score(self, post: ItemPost,
+              image_sims: Union[Dict[int, float], Callable[[List[ItemPost]], Dict[int, float]]],
+              matching_service, limit: Optional[int] = None) -> List[Dict]:
+        """
+        `find_matches` ile aynı kurallarla eşleşmeleri bul ve benzerliğe göre sırala.
+
+        image_sims: {aday_id: görüntü benzerliği} veya aday listesi alıp bu
+            sözlüğü döndüren çağrılabilir; çağrılabilir, ucuz aşamaları geçen
+            adaylarla bir kez çağrılır. Eksik adaylar 0.0 sayılır.
+        matching_service: çocuk ilanı çiftlerinin tekil puanlaması için.
+        limit: verilirse en iyi `limit` eşleşme döner.
+        """
+        import numpy as np
+
+        count = len(self.candidates)
+        stats = self.stats = {
+            'candidates': count,
+            'rejected_gate': 0,
+            'rejected_gender': 0,
+            'rejected_bound': 0,
+            'image_scored': 0,
+            'rejected_threshold': 0,
+            'matched': 0,
+        }
+        if not count:
+            return []
+        code = self._vocabulary.code
+        category = code(post.category)
+        child_category = code("cocuk")
+        animal_category = code("hayvan")
+
+        # 1. Çocuk / hayvan ilanları sadece kendi türleriyle; kategori kapısı herkese:
+        # `find_matches` çocuk / hayvan çiftlerini atlasa da `calculate_total_similarity`
+        # kategorisi uyuşmayan her çifte 0.0 verir (ikisi de "cocuk" / "hayvan" ise uyuşur)
+        post_is_child = bool(post.is_missing_child)
+        post_is_animal = category == animal_category
+        candidate_is_animal = self.category == animal_category
+        both_child = self.is_child & post_is_child
+        alive = (self.is_child == post_is_child) & (candidate_is_animal == post_is_animal)
+        has_category = self.category > 0
+        if category:
+            category_conflict = ~has_category | (self.category != category)
+        else:
+            category_conflict = has_category
+        alive &= ~category_conflict
+        stats['rejected_gate'] = count - int(alive.sum())
+
+        # 2. İki tarafın kategorisi "cocuk": `calculate_child_similarity`; cinsiyet farkı 0 verir
+        child_path = alive & (self.category == child_category) if category == child_category else np.zeros(count, bool)
+        gender = code((post.child_gender or "").lower())
+        if gender and child_path.any():
+            gender_conflict = child_path & (self.gender > 0) & (self.gender != gender)
+            stats['rejected_gender'] = int(gender_conflict.sum())
+            alive &= ~gender_conflict
+            child_path &= ~gender_conflict
+
+        # 3. Üst sınır: en iyi görüntü benzerliğiyle bile eşiğin altında kalanlar
+        threshold = np.where(both_child, CHILD_THRESHOLD, DEFAULT_THRESHOLD)
+        feature = self.feature_similarities(post)
+        bound = IMAGE_SIMILARITY_MAX * IMAGE_WEIGHT + feature * FEATURE_WEIGHT
+        below = alive & ~child_path & (bound < threshold)
+        stats['rejected_bound'] = int(below.sum())
+        alive &= ~below
+
+        # 4. Görüntü benzerliği sadece kalan adaylar için (tek toplu çağrı)
+        survivors = np.flatnonzero(alive)
+        stats['image_scored'] = len(survivors)
+        if callable(image_sims):
+            image_sims = image_sims([self.candidates[index] for index in survivors]) if len(survivors) else {}
+        image = np.zeros(count, dtype=np.float64)
+        for index in survivors:
+            image[index] = image_sims.get(self.candidates[index].id, 0.0)
+        similarity = image * IMAGE_WEIGHT + feature * FEATURE_WEIGHT
+        for index in np.flatnonzero(child_path):
+            similarity[index] = matching_service.calculate_total_similarity(
+                post, self.candidates[index], image_sim=float(image[index])
+            )
+
+        # 5. Eşik
+        passed = survivors[similarity[survivors] >= threshold[survivors]]
+        stats['rejected_threshold'] = len(survivors) - len(passed)
+        stats['matched'] = len(passed)
+        # Kararlı sıralama: eşit skorlarda aday sırası korunur (list.sort(reverse=True) gibi)
+        ranked = passed[np.argsort(-similarity[passed], kind="stable")]
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [
+            {
+                'post': self.candidates[index],
+                'similarity': float(similarity[index]),
+                'image_similarity': float(image[index]),
+                'feature_similarity': float(feature[index]),
+            }
+            for index in ranked
+        ]
@@ -1,8 +1,28 @@
-from django.db.models.signals import post_save
+import os
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
 from django.dispatch import receiver
 
+from accounts.blocking_index import remove_from_blocking_index, update_blocking_index
 from accounts.models import ItemPost
-from accounts.matching_service import MatchingService
+from accounts.matching_service import MatchingService, post_vector_metadata
+from image_matching.services import FaceMatchingService
+from image_matching.utils import clip_input_path, make_clip_input_derivative
+from image_matching.vector_lifecycle import (
+    deactivate_vectors,
+    get_vector_deleter,
+    purge_vectors,
+    refresh_vectors,
+    restore_vectors,
+    vector_ids_for_post,
+)
+
+
+# Vektörle birlikte indekste tutulan meta veriyi (post_vector_metadata) ve
+# vektör açıklamasını etkileyen alanlar
+VECTOR_METADATA_FIELDS = ('city', 'title', 'description', 'is_missing_child')
 
 
 def _process_matches_for_post(post: ItemPost):
@@ -34,19 +54,139 @@ def _process_matches_for_post(post: ItemPost):
         traceback.print_exc()
 
 
+def _ensure_clip_input_derivative(post: ItemPost):
+    """Görsel yeni veya değişmişse küçültülmüş CLIP girişini (yeniden) üret."""
+    try:
+        image_path = post.image.path
+        derivative = clip_input_path(image_path)
+        if os.path.exists(derivative) and os.path.getmtime(derivative) >= os.path.getmtime(image_path):
+            return
+        make_clip_input_derivative(image_path)
+    except Exception as e:
+        print(f"[SIGNAL HATA] İlan {post.id} için küçültülmüş görsel üretilemedi: {e}")
+
+
+def _index_child_face(post: ItemPost):
+    """Çocuk ilanının yüz vektörünü kişi koleksiyonuna yaz (eşleştirmeden önce)."""
+    try:
+        result = FaceMatchingService().index_face(post.id, post.image.path)
+        if result['success']:
+            print(f"[SIGNAL] İlan {post.id} için yüz vektörü kaydedildi.")
+        else:
+            print(f"[SIGNAL] İlan {post.id} için yüz vektörü yok: {result['error']}")
+    except Exception as e:
+        print(f"[SIGNAL HATA] İlan {post.id} için yüz indeksleme hatası: {e}")
+
+
+def _deactivate_post_vectors(post: ItemPost):
+    """İlan aktiflikten çıktı: vektörleri indeksten kaldır (toplu, arka planda)."""
+    try:
+        count = deactivate_vectors(post.id, include_face=post.is_missing_child)
+        print(f"[SIGNAL] İlan {post.id} ({post.status}): {count} vektör indeksten kaldırılıyor.")
+    except Exception as e:
+        print(f"[SIGNAL HATA] İlan {post.id} için vektör kaldırma hatası: {e}")
+
+
+def _restore_post_vectors(post: ItemPost):
+    """İlan yeniden aktif oldu: vektörleri (ve çocuk ilanında yüz vektörünü) geri ekle."""
+    try:
+        count = restore_vectors(post.id, metadata=post_vector_metadata(post))
+        print(f"[SIGNAL] İlan {post.id} yeniden aktif: {count} vektör indekse geri eklendi.")
+        if post.is_missing_child and not get_vector_deleter().cancel_faces([post.id]):
+            _index_child_face(post)
+    except Exception as e:
+        print(f"[SIGNAL HATA] İlan {post.id} için vektör geri ekleme hatası: {e}")
+
+
+def _refresh_post_vectors(post: ItemPost):
+    """İlan düzenlendi: vektörleri yeni şehir / kategori meta verisiyle yeniden yaz."""
+    try:
+        count = refresh_vectors(
+            post.id,
+            metadata=post_vector_metadata(post),
+            description=f"{post.title} - {post.description}",
+        )
+        print(f"[SIGNAL] İlan {post.id} düzenlendi: {count} vektörün meta verisi güncellendi.")
+    except Exception as e:
+        print(f"[SIGNAL HATA] İlan {post.id} için vektör meta verisi güncellenemedi: {e}")
+
+
+@receiver(pre_save, sender=ItemPost)
+def itempost_pre_save(sender, instance: ItemPost, update_fields=None, **kwargs):
+    # Durum ve meta veri değişikliklerini post_save'de görebilmek için kayıttaki eski değerleri sakla
+    instance._previous_status = None
+    instance._previous_metadata = None
+    fields = ('status',) + VECTOR_METADATA_FIELDS
+    if update_fields is not None:
+        fields = tuple(field for field in fields if field in update_fields)
+    if instance.pk and fields:
+        previous = ItemPost.objects.filter(pk=instance.pk).values(*fields).first()
+        if previous:
+            instance._previous_status = previous.pop('status', None)
+            instance._previous_metadata = previous
+
+
+@receiver(pre_delete, sender=ItemPost)
+def itempost_pre_delete(sender, instance: ItemPost, **kwargs):
+    # ImageVector kayıtları CASCADE ile silinmeden önce indeksten kaldırılacak id'leri topla
+    instance._vector_ids = vector_ids_for_post(instance.pk)
+
+
+@receiver(post_delete, sender=ItemPost)
+def itempost_post_delete(sender, instance: ItemPost, **kwargs):
+    # İlan silindi: ImageVector / ImageMatch kayıtları CASCADE ile silindi, vektörler indeksten silinir
+    post_id = instance.pk
+    transaction.on_commit(lambda: remove_from_blocking_index(post_id))
+    vector_ids = getattr(instance, '_vector_ids', {})
+    ilan_id = instance.id if instance.is_missing_child and instance.image else None
+    if not vector_ids and ilan_id is None:
+        return
+
+    def _purge():
+        try:
+            count = purge_vectors(vector_ids, ilan_id=ilan_id)
+            print(f"[SIGNAL] Silinen ilanın {count} vektörü kaldırılıyor.")
+        except Exception as e:
+            print(f"[SIGNAL HATA] Silinen ilanın vektörleri kaldırılamadı: {e}")
+
+    transaction.on_commit(_purge)
+
+
 @receiver(post_save, sender=ItemPost)
 def itempost_post_save(sender, instance: ItemPost, created, **kwargs):
+    # Aday bloklama indeksi: yeni / değişen / çözülen ilanın anahtarını güncelle
+    transaction.on_commit(lambda: update_blocking_index(instance))
+    
+    # İlan aktiflikten çıktıysa / yeniden aktif olduysa vektörleri indeksten kaldır / geri ekle
+    previous_status = getattr(instance, '_previous_status', None)
+    if not created and instance.image and previous_status and previous_status != instance.status:
+        if previous_status == 'active':
+            transaction.on_commit(lambda: _deactivate_post_vectors(instance))
+        elif instance.status == 'active':
+            transaction.on_commit(lambda: _restore_post_vectors(instance))
+    elif not created and instance.image and instance.status == 'active':
+        # Şehir / başlık / açıklama / çocuk bayrağı değiştiyse indeksteki meta veri (ve şehir bölümü) yenilenir
+        previous_metadata = getattr(instance, '_previous_metadata', None) or {}
+        if any(getattr(instance, field) != value for field, value in previous_metadata.items()):
+            transaction.on_commit(lambda: _refresh_post_vectors(instance))
+    
     # Yeni ilan eklendiğinde veya resmi güncellendiğinde eşleştirmeyi tetikle
     if not instance.image:
         print(f"[SIGNAL] İlan {instance.id} için resim yok, eşleştirme atlandı.")
         return
     
+    # CLIP için küçültülmüş giriş kopyasını yükleme anında bir kez üret
+    if getattr(settings, 'CLIP_INPUT_DERIVATIVES', False):
+        _ensure_clip_input_derivative(instance)
+    
     # Sadece yeni oluşturma; dilerseniz güncelleme için de çalıştırabilirsiniz
     if created:
         try:
             is_child = getattr(instance, 'is_missing_child', False)
             child_info = f" (Cocuk ilani: {is_child})" if is_child else ""
             print(f"[SIGNAL] Yeni ilan eklendi (ID: {instance.id}, Tip: {instance.post_type}{child_info}), eşleştirme başlatılıyor...")
+            if is_child:
+                _index_child_face(instance)
             _process_matches_for_post(instance)
             print(f"[SIGNAL] İlan {instance.id} için eşleştirme tamamlandı.")
         except Exception as e:
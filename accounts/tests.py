@@ -0,0 +1,211 @@
+import random
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from accounts.attributes import KeywordMatcher, extract_attributes, fold
+from accounts.matching_service import MatchingService, post_vector_metadata
+from accounts.models import ItemPost, User
+from accounts.scoring import CandidateScorer
+from image_matching import services
+from image_matching.models import ImageVector
+from image_matching.services import ImageMatchingService
+
+
+class VectorMetadataRefreshTests(TestCase):
+    """İlan düzenlenince indeksteki şehir / kategori meta verisi güncellenmeli."""
+
+    def setUp(self):
+        self.vector_dir = tempfile.mkdtemp()
+        settings_override = override_settings(
+            VECTOR_BACKEND='local', LOCAL_VECTOR_DIR=self.vector_dir, BLOCKING_INDEX_BACKEND='off'
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(shutil.rmtree, self.vector_dir, True)
+        services._local_services.clear()
+        self.addCleanup(services._local_services.clear)
+
+        self.user = User.objects.create_user(username='test', email='test@example.com', password='test')
+        # Görselsiz oluşturulur (sinyal CLIP / eşleştirme çalıştırmasın), görsel sinyalsiz eklenir
+        self.post = ItemPost.objects.create(
+            title='Siyah cüzdan', description='Parkta kayboldu', post_type='lost',
+            location='Kadıköy', city='İstanbul', contact_phone='5550000000', user=self.user,
+        )
+        ItemPost.objects.filter(pk=self.post.pk).update(image='item_images/cuzdan.jpg')
+        self.post.refresh_from_db()
+
+        self.image_service = ImageMatchingService()
+        self.vector = [1.0] + [0.0] * (self.image_service.model.dim - 1)
+        self.vector_id = 'test-vector'
+        self.image_service.milvus.insert_vector(
+            vector_id=self.vector_id, vector=self.vector, user_id=str(self.user.id),
+            image_path=self.post.image.name, metadata=post_vector_metadata(self.post),
+        )
+        ImageVector.objects.create(
+            user=self.user, image_path=self.post.image.name, vector_id=self.vector_id,
+            model_name=self.image_service.model.key, post=self.post,
+        )
+
+    def _search_ids(self, city: str):
+        matches = self.image_service.milvus.search_similar(
+            self.vector, top_k=5, filters={'city': city, 'status': 'active'}
+        )
+        return [match['id'] for match in matches]
+
+    def test_city_edit_moves_vector_to_new_city(self):
+        self.assertEqual(self._search_ids('İstanbul'), [self.vector_id])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.city = 'Ankara'
+            self.post.save()
+
+        self.assertEqual(self._search_ids('Ankara'), [self.vector_id])
+        self.assertEqual(self._search_ids('İstanbul'), [])
+        self.assertEqual(
+            ImageVector.objects.get(vector_id=self.vector_id).description,
+            'Siyah cüzdan - Parkta kayboldu',
+        )
+
+
+class AttributeExtractionTests(SimpleTestCase):
+    """Türkçe katlama ve anahtar kelime eşleyicinin eski `keyword in text` davranışı."""
+
+    def test_fold_unifies_turkish_i(self):
+        self.assertEqual(fold("KIRMIZI"), "kirmizi")
+        self.assertEqual(fold("kırmızı"), "kirmizi")
+        self.assertEqual(fold("İPHONE"), fold("IPHONE"))
+        self.assertEqual(fold("İstanbul"), "istanbul")
+        # Diğer Türkçe harfler korunur
+        self.assertEqual(fold("KUŞ"), "kuş")
+        self.assertEqual(fold(""), "")
+
+    def test_matcher_matches_inside_words(self):
+        matcher = KeywordMatcher([("phone", "telefon"), ("çanta", "çanta")])
+        self.assertEqual(matcher.find("Smartphone bulundu"), "telefon")
+        self.assertEqual(matcher.find("Sırt çantası kayıp"), "çanta")
+        self.assertIsNone(matcher.find("kusura bakmayın"))
+
+    def test_matcher_priority_is_list_order_not_position(self):
+        matcher = KeywordMatcher([("cüzdan", "cüzdan"), ("anahtar", "anahtar"), ("anahtarlık", "anahtarlık")])
+        self.assertEqual(matcher.find("anahtarlık ve cüzdan"), "cüzdan")
+        self.assertEqual(matcher.find("anahtarlık"), "anahtar")
+
+    def test_category_gating_matches_baseline(self):
+        self.assertEqual(extract_attributes("Smartphone", "")["category"], "telefon")
+        self.assertEqual(extract_attributes("İPHONE 13", "")["category"], "telefon")
+        self.assertEqual(extract_attributes("Kedi", "Kategori: Hayvan")["category"], "hayvan")
+        self.assertEqual(extract_attributes("Cüzdan", "", is_missing_child=True)["category"], "cocuk")
+        self.assertEqual(extract_attributes("Defter", "")["category"], "")
+
+    def test_color_and_brand_come_from_description(self):
+        attributes = extract_attributes("Siyah telefon", "KIRMIZI kılıflı Samsung")
+        self.assertEqual(attributes["color"], "kırmızı")
+        self.assertEqual(attributes["brand"], "samsung")
+
+
+class _OfflineMatchingService(MatchingService):
+    """Yüz RPC'si ve vektör deposu olmadan: görüntü benzerliği sözlükten gelir."""
+
+    def __init__(self, image_sims):
+        self.image_sims = image_sims
+
+    def calculate_face_similarity(self, post1, post2):
+        return None
+
+    def calculate_image_similarity(self, post1, post2):
+        return self.image_sims.get(post2.id, 0.0)
+
+
+def _reference_matches(service, post, candidates, image_sims):
+    """Vektörleştirme öncesi `find_matches` döngüsü (kapılar + calculate_total_similarity)."""
+    matches = []
+    cat1 = service._extract_category(post)
+    for candidate in candidates:
+        cat2 = service._extract_category(candidate)
+        post_is_child, candidate_is_child = bool(post.is_missing_child), bool(candidate.is_missing_child)
+        post_is_animal, candidate_is_animal = cat1 == "hayvan", cat2 == "hayvan"
+        if post_is_child != candidate_is_child or post_is_animal != candidate_is_animal:
+            continue
+        if not (post_is_child and candidate_is_child) and not (post_is_animal and candidate_is_animal):
+            if (cat1 or cat2) and (not cat1 or not cat2 or cat1.lower() != cat2.lower()):
+                continue
+        image_sim = image_sims.get(candidate.id, 0.0)
+        similarity = service.calculate_total_similarity(post, candidate, image_sim=image_sim)
+        threshold = 0.50 if post_is_child and candidate_is_child else 0.40
+        if similarity >= threshold:
+            matches.append({'post': candidate, 'similarity': similarity, 'image_similarity': image_sim})
+    matches.sort(key=lambda match: match['similarity'], reverse=True)
+    return matches
+
+
+class CandidateScorerParityTests(SimpleTestCase):
+    """Toplu puanlama ve budama eski aday döngüsüyle aynı sonucu vermeli."""
+
+    WORDS = ["siyah", "deri", "cüzdan", "telefon", "kadıköy", "park", "mavi", "çanta", "kedi", "anahtar"]
+    CATEGORIES = ["", "", "telefon", "cüzdan", "çanta", "hayvan", "anahtar"]
+    COLORS = ["", "siyah", "mavi", "kırmızı"]
+    BRANDS = ["", "", "apple", "samsung"]
+
+    def _post(self, rng, post_id, child_rate=0.15):
+        is_child = rng.random() < child_rate
+        return ItemPost(
+            id=post_id,
+            title_tokens=" ".join(rng.sample(self.WORDS, rng.randint(0, 4))),
+            description_tokens=" ".join(rng.sample(self.WORDS, rng.randint(0, 6))),
+            # Kategorisi "cocuk" olmayan çocuk ilanları (eski kayıtlar) üst sınır aşamasına düşer
+            category="cocuk" if is_child and rng.random() < 0.5 else rng.choice(self.CATEGORIES),
+            color=rng.choice(self.COLORS),
+            brand=rng.choice(self.BRANDS),
+            is_missing_child=is_child,
+            child_gender=rng.choice(["", "erkek", "kız"]) if is_child else None,
+            child_age=rng.choice([None, 6, 8]) if is_child else None,
+        )
+
+    def _image_sims(self, rng, candidates):
+        # Üst sınırı zorlamak için 0.0 ve 1.0 uçları da dahil
+        return {c.id: rng.choice([0.0, 1.0, rng.random(), rng.uniform(0.9, 1.0)]) for c in candidates}
+
+    def test_score_matches_reference_loop(self):
+        rng = random.Random(2024)
+        for round_number in range(40):
+            candidates = [self._post(rng, 1000 * round_number + index) for index in range(1, 150)]
+            post = self._post(rng, 1000 * round_number)
+            image_sims = self._image_sims(rng, candidates)
+            service = _OfflineMatchingService(image_sims)
+
+            expected = _reference_matches(service, post, candidates, image_sims)
+            actual = CandidateScorer(candidates).score(post, image_sims, service)
+
+            self.assertEqual(
+                [match['post'].id for match in actual], [match['post'].id for match in expected]
+            )
+            for got, want in zip(actual, expected):
+                self.assertAlmostEqual(got['similarity'], want['similarity'], delta=1e-9)
+
+    def test_pruning_never_drops_candidates_above_threshold(self):
+        rng = random.Random(7)
+        pruned = 0
+        for round_number in range(40):
+            # Üst sınır sadece kategorisiz çocuk çiftlerini (eşik 0.50) eleyebilir
+            candidates = [self._post(rng, 1000 * round_number + index, 0.9) for index in range(1, 150)]
+            post = self._post(rng, 1000 * round_number, 0.9)
+            image_sims = self._image_sims(rng, candidates)
+            service = _OfflineMatchingService(image_sims)
+            scored = set()
+
+            def _lookup(survivors):
+                scored.update(candidate.id for candidate in survivors)
+                return {candidate.id: image_sims[candidate.id] for candidate in survivors}
+
+            scorer = CandidateScorer(candidates)
+            scorer.score(post, _lookup, service)
+            self.assertEqual(scorer.stats['image_scored'], len(scored))
+            pruned += scorer.stats['rejected_bound']
+
+            # Budanan her aday en iyi görüntü benzerliğiyle (1.0) bile eşiğin altında kalmalı
+            best_case = {candidate.id: 1.0 for candidate in candidates}
+            for match in _reference_matches(_OfflineMatchingService(best_case), post, candidates, best_case):
+                self.assertIn(match['post'].id, scored)
+        self.assertGreater(pruned, 0)
@@ -10,8 +10,7 @@ from django.conf import settings
 from django.views.decorators.http import require_POST
 from django.db import models
 from django.db.models import Q
-import os
-from typing import List, Dict
+from typing import List, Dict, Optional
 from .forms import UserRegistrationForm, UserLoginForm, LostItemPostForm, MissingChildPostForm, FoundChildPostForm
 from .models import ItemPost
 from .services import upsert_item_post_to_mongo
@@ -35,9 +34,10 @@ def add_notification(request, title: str, message: str, level: str = "info") ->
 
 
 def _get_post_by_vector_cached(vec: ImageVector, post_type: str, exclude_user_id=None):
-    filename = os.path.basename(vec.image_path)
+    if vec.post_id is None:
+        return None
     qs = ItemPost.objects.filter(
-        image__icontains=filename,
+        pk=vec.post_id,
         post_type=post_type,
         status="active",
     )
@@ -62,6 +62,34 @@ def landing(request):
     })
 
 
+def _semantic_search_scores(query: str, filters: Optional[Dict] = None) -> Dict[int, float]:
+    """
+    Metin sorgusunu CLIP ile görüntü koleksiyonunda ara.
+
+    filters: indeks aramasında uygulanan skaler filtreler (bkz. `search_similar`);
+    aday penceresi (SEMANTIC_SEARCH_CANDIDATES) sadece uygun ilanlarla dolar.
+    Dönen değer: {ilan_id: benzerlik}. Eşleşen görüntüler ilanlara
+    `ImageVector.post` üzerinden tek sorguyla bağlanır.
+    """
+    from image_matching.services import ImageMatchingService
+
+    image_service = ImageMatchingService()
+    matches = image_service.search_by_text(
+        query, top_k=settings.SEMANTIC_SEARCH_CANDIDATES, filters=filters
+    )
+    if not matches:
+        return {}
+
+    vector_scores = {m['id']: m['similarity'] for m in matches}
+    post_scores = {}
+    vectors = ImageVector.objects.filter(
+        vector_id__in=list(vector_scores), model_name=image_service.model.key, post__isnull=False
+    ).values_list('vector_id', 'post_id')
+    for vector_id, post_id in vectors:
+        post_scores[post_id] = max(post_scores.get(post_id, 0.0), vector_scores[vector_id])
+    return post_scores
+
+
 @login_required
 def home(request):
     """Ana sayfa - İlan akışı (Sadece giriş yapmış kullanıcılar)"""
@@ -72,12 +100,33 @@ def home(request):
     selected_city = request.GET.get('city', '').strip()
     query = request.GET.get('q', '').strip()
     child_filter = request.GET.get('child_filter', 'all')  # 'children' | 'animals' | 'others' | 'all'
+    search_mode = request.GET.get('search_mode', 'keyword')  # 'keyword' | 'semantic'
 
     if selected_type in ['lost', 'found']:
         posts = posts.filter(post_type=selected_type)
     if selected_city:
         posts = posts.filter(city__iexact=selected_city)
-    if query:
+
+    # Anlamsal arama: CLIP metin vektörü ile görüntü koleksiyonunda ara,
+    # sonuçları benzerlik sırasıyla göster (tablo taraması yok)
+    semantic_scores = {}
+    if query and search_mode == 'semantic':
+        # Ana sayfa filtreleri indeks aramasına da verilir; sonra veritabanında kesinleştirilir
+        semantic_filters = {'status': 'active'}
+        if selected_type in ['lost', 'found']:
+            semantic_filters['post_type'] = selected_type
+        if selected_city:
+            semantic_filters['city'] = selected_city
+        if child_filter == 'children':
+            semantic_filters['is_missing_child'] = True
+        elif child_filter in ('animals', 'others'):
+            semantic_filters['is_missing_child'] = False
+        semantic_scores = _semantic_search_scores(query, filters=semantic_filters)
+        if semantic_scores:
+            posts = posts.filter(pk__in=list(semantic_scores))
+        else:
+            search_mode = 'keyword'
+    if query and search_mode != 'semantic':
         posts = posts.filter(title__icontains=query) | posts.filter(description__icontains=query)
 
     # Çocuk / hayvan / diğer ilanlar filtresi
@@ -104,7 +153,12 @@ def home(request):
         .order_by('city')
     )
 
-    # Sayfalama
+    if semantic_scores:
+        posts = sorted(posts, key=lambda post: -semantic_scores[post.id])
+
+    # Sayfalama (filtreler sayfa bağlantılarında korunur)
+    filter_params = request.GET.copy()
+    filter_params.pop('page', None)
     paginator = Paginator(posts, 12)  # Sayfa başına 12 ilan
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
@@ -113,14 +167,21 @@ def home(request):
     post_matches = {}
     if page_obj:
         from image_matching.models import ImageVector, ImageMatch
-        import os
+        
+        # Sayfadaki ilanların vektörleri tek sorguda (`post` FK indeksiyle)
+        page_vectors = {
+            vec.post_id: vec
+            for vec in ImageVector.objects.filter(
+                post__in=[post.id for post in page_obj if post.image],
+                model_name=settings.DEFAULT_EMBEDDING_MODEL,
+            ).order_by('created_at')
+        }
         
         for post in page_obj:
             if post.image:
                 try:
                     # İlanın vektörünü bul
-                    filename = os.path.basename(post.image.name)
-                    source_vec = ImageVector.objects.filter(image_path__icontains=filename).first()
+                    source_vec = page_vectors.get(post.id)
                     
                     if source_vec:
                         # En yüksek eşleşme oranını bul
@@ -159,6 +220,8 @@ def home(request):
         'selected_type': selected_type,
         'selected_city': selected_city,
         'query': query,
+        'search_mode': search_mode,
+        'filter_query': filter_params.urlencode(),
         'child_filter': child_filter,
         'post_matches': post_matches,  # İlan ID -> en yüksek eşleşme oranı
     }
@@ -641,12 +704,12 @@ def mark_match_as_found(request, lost_post_id: int, found_post_id: int):
         
         # Kayıp ilanın vector'ünü bul
         lost_vector = ImageVector.objects.filter(
-            image_path__icontains=str(lost_post.id)
+            post=lost_post, model_name=settings.DEFAULT_EMBEDDING_MODEL
         ).first()
         
         # Bulunan ilanın vector'ünü bul
         found_vector = ImageVector.objects.filter(
-            image_path__icontains=str(found_post.id)
+            post=found_post, model_name=settings.DEFAULT_EMBEDDING_MODEL
         ).first()
         
         if lost_vector and found_vector:
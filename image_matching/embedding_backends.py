@@ -0,0 +1,172 @@
+"""
+CLIP görüntü embedding backend'leri.
+
+Aynı arayüze sahip üç backend vardır ve `settings.CLIP_BACKEND` ile seçilir:
+
+    - "torch"     : open_clip + PyTorch (fp32, varsayılan)
+    - "onnx"      : dışa aktarılmış görsel kule, ONNX Runtime (CPU, fp32)
+    - "onnx-int8" : aynı modelin dinamik int8 kuantize edilmiş sürümü
+
+ONNX modelleri `python manage.py export_clip_onnx` komutu ile üretilir.
+ONNX backend'leri PyTorch gerektirmez; ön işleme NumPy ile open_clip'in
+ViT-B-32 dönüşümlerinin (bicubic resize + center crop + normalize) aynısıdır.
+
+Her backend:
+    - preprocess(img: PIL.Image) -> tek görüntü girişi
+    - encode(inputs: list) -> L2 normu 1 olan float16 vektör listesi (bkz. vectors.py)
+"""
+
+from functools import lru_cache
+
+from PIL import Image
+
+from .vectors import as_vectors
+
+
+BACKEND_TORCH = "torch"
+BACKEND_ONNX = "onnx"
+BACKEND_ONNX_INT8 = "onnx-int8"
+BACKENDS = (BACKEND_TORCH, BACKEND_ONNX, BACKEND_ONNX_INT8)
+
+# open_clip / OpenAI CLIP normalizasyon sabitleri
+CLIP_MEAN = (0.48145466, 0.4578275, 0.40821073)
+CLIP_STD = (0.26862954, 0.26130258, 0.27577711)
+
+
+class TorchClipBackend:
+    """open_clip modelini PyTorch ile çalıştıran backend."""
+
+    name = BACKEND_TORCH
+
+    def __init__(self, model_name: str = "ViT-B-32", pretrained: str = "openai",
+                 device: str | None = None):
+        from .utils import _load_clip_model
+
+        self.model, self._preprocess, self.device = _load_clip_model(
+            model_name=model_name, pretrained=pretrained, device=device
+        )
+
+    def preprocess(self, img: Image.Image):
+        return self._preprocess(img)
+
+    def encode(self, inputs: list) -> list:
+        import torch
+
+        batch = torch.stack(inputs).to(self.device)
+        with torch.no_grad():
+            features = self.model.encode_image(batch)
+            features = features / features.norm(dim=-1, keepdim=True)
+        return as_vectors(features.cpu().numpy())
+
+
+class OnnxClipBackend:
+    """Dışa aktarılmış CLIP görsel kulesini ONNX Runtime ile CPU'da çalıştıran backend."""
+
+    def __init__(self, model_path: str, image_size: int = 224, num_threads: int = 0,
+                 name: str = BACKEND_ONNX):
+        try:
+            import onnxruntime as ort  # type: ignore
+        except ImportError as exc:  # pragma: no cover - sadece runtime uyarısı
+            raise ImportError(
+                "onnxruntime bulunamadı. Lütfen önce `pip install onnxruntime` çalıştırın."
+            ) from exc
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+
+        self.name = name
+        self.image_size = image_size
+        self.session = ort.InferenceSession(
+            str(model_path), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+
+    def preprocess(self, img: Image.Image):
+        """open_clip ViT-B-32 ön işlemesinin NumPy karşılığı (C, H, W float32)."""
+        import numpy as np
+
+        size = self.image_size
+        width, height = img.size
+        # Kısa kenarı `size` yap (torchvision.transforms.Resize ile aynı yuvarlama)
+        if width <= height:
+            new_width, new_height = size, int(size * height / width)
+        else:
+            new_width, new_height = int(size * width / height), size
+        img = img.resize((new_width, new_height), Image.BICUBIC)
+
+        # Ortadan kırp (torchvision.transforms.CenterCrop ile aynı yuvarlama)
+        left = int(round((new_width - size) / 2.0))
+        top = int(round((new_height - size) / 2.0))
+        img = img.crop((left, top, left + size, top + size))
+
+        pixels = np.asarray(img, dtype=np.float32) / 255.0
+        pixels = (pixels - np.array(CLIP_MEAN, dtype=np.float32)) / np.array(CLIP_STD, dtype=np.float32)
+        return pixels.transpose(2, 0, 1)
+
+    def encode(self, inputs: list) -> list:
+        import numpy as np
+
+        batch = np.stack(inputs).astype(np.float32, copy=False)
+        features = self.session.run(None, {self.input_name: batch})[0]
+        features = features / np.linalg.norm(features, axis=-1, keepdims=True)
+        return as_vectors(features)
+
+
+def create_backend(name: str, **options):
+    """
+    Ayarlara bakmadan backend örneği oluştur.
+
+    Alt süreçlerde (benchmark, embedding sunucusu) Django ayarları olmadan
+    çalışabilmek için tüm parametreler açıkça verilir.
+    """
+    if name == BACKEND_TORCH:
+        return TorchClipBackend(
+            model_name=options.get("model_name", "ViT-B-32"),
+            pretrained=options.get("pretrained", "openai"),
+            device=options.get("device"),
+        )
+    if name in (BACKEND_ONNX, BACKEND_ONNX_INT8):
+        model_path = options.get("model_path")
+        if not model_path:
+            raise ValueError(f"'{name}' backend'i için model_path gerekli.")
+        return OnnxClipBackend(
+            model_path=model_path,
+            num_threads=options.get("num_threads", 0),
+            name=name,
+        )
+    raise ValueError(f"Bilinmeyen CLIP backend'i: {name} (seçenekler: {', '.join(BACKENDS)})")
+
+
+def configured_backend_name() -> str:
+    """`settings.CLIP_BACKEND` değerini döndür (ayarlar yüklü değilse 'torch')."""
+    try:
+        from django.conf import settings
+
+        return getattr(settings, "CLIP_BACKEND", BACKEND_TORCH)
+    except Exception:
+        return BACKEND_TORCH
+
+
+def backend_options(name: str, model_name: str = "ViT-B-32", pretrained: str = "openai",
+                    device: str | None = None) -> dict:
+    """Verilen backend için ayarlardan `create_backend` parametrelerini üret."""
+    if name == BACKEND_TORCH:
+        return {"model_name": model_name, "pretrained": pretrained, "device": device}
+
+    from django.conf import settings
+
+    path_setting = "CLIP_ONNX_INT8_MODEL_PATH" if name == BACKEND_ONNX_INT8 else "CLIP_ONNX_MODEL_PATH"
+    return {
+        "model_path": str(getattr(settings, path_setting)),
+        "num_threads": getattr(settings, "CLIP_ONNX_THREADS", 0),
+    }
+
+
+@lru_cache(maxsize=None)
+def get_clip_backend(name: str | None = None, model_name: str = "ViT-B-32",
+                     pretrained: str = "openai", device: str | None = None):
+    """Backend'i bir kez oluştur ve süreç boyunca cache et."""
+    name = name or configured_backend_name()
+    return create_backend(name, **backend_options(name, model_name, pretrained, device))
@@ -0,0 +1,295 @@
+"""
+İçerik adresli CLIP embedding önbelleği.
+
+Aynı görüntü dosyası için CLIP modelinin tekrar tekrar çalıştırılmasını
+engeller. Anahtar; dosya içeriğinin SHA-256 özeti ile model adı, ön-eğitim
+seti, backend ve model sürümünden üretilir. Böylece dosya yolu değişse bile aynı
+içerik tekrar vektörlenmez, model değiştiğinde ise eski vektörler kullanılmaz.
+
+İki katman vardır:
+    - Süreç içi LRU (son kullanılan N vektör, bellekte)
+    - Kalıcı disk deposu (`settings.EMBEDDING_CACHE_DIR`)
+
+Her iki katmanda vektörler kompakt bayt biçiminde tutulur (float16 ~1KB,
+`EMBEDDING_CACHE_QUANTIZATION="int8"` ile ~0.5KB; bkz. vectors.py).
+
+Kullanım örneği:
+
+    from image_matching.embedding_cache import get_embedding_cache
+    from image_matching.utils import image_to_clip_vectors
+
+    cache = get_embedding_cache()
+    results = cache.get_or_compute(["a.jpg", "b.jpg"], image_to_clip_vectors)
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from .embedding_backends import configured_backend_name
+from .vectors import from_bytes, to_bytes
+
+
+_HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def file_digest(image_path: str) -> str:
+    """Dosya içeriğinin SHA-256 özetini döndür."""
+    digest = hashlib.sha256()
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """Dosya içeriği + model kimliği ile anahtarlanan iki katmanlı vektör önbelleği."""
+
+    def __init__(self, directory: Optional[str], namespace: str, max_entries: int = 2048,
+                 quantization: Optional[str] = None):
+        self.directory = directory
+        self.namespace = namespace
+        self.max_entries = max(0, max_entries)
+        self.quantization = quantization
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        # (yol) -> (mtime_ns, boyut, özet): aynı dosyayı her seferinde yeniden hash'lememek için
+        self._digests: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    # --- Anahtar üretimi -------------------------------------------------
+
+    def _digest_for(self, image_path: str) -> str:
+        stat = os.stat(image_path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            cached = self._digests.get(image_path)
+            if cached and cached[:2] == signature:
+                self._digests.move_to_end(image_path)
+                return cached[2]
+
+        digest = file_digest(image_path)
+        with self._lock:
+            self._digests[image_path] = (*signature, digest)
+            while len(self._digests) > max(self.max_entries, 1):
+                self._digests.popitem(last=False)
+        return digest
+
+    def key_for(self, image_path: str) -> str:
+        """Görüntü için önbellek anahtarını üret."""
+        content = self._digest_for(image_path)
+        return hashlib.sha256(f"{self.namespace}\0{content}".encode("utf-8")).hexdigest()
+
+    # --- Kalıcı depo -----------------------------------------------------
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        if not self.directory:
+            return None
+        return os.path.join(self.directory, key[:2], f"{key}.bin")
+
+    def _read_disk(self, key: str) -> Optional[bytes]:
+        path = self._disk_path(key)
+        if not path:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            print(f"Embedding önbelleği okuma hatası: {exc}")
+            return None
+
+    def _write_disk(self, key: str, payload: bytes) -> None:
+        path = self._disk_path(key)
+        if not path:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            # Aynı anahtarı yazan diğer süreçlerle yarış durumunda atomik değiştir
+            os.replace(tmp_path, path)
+        except OSError as exc:
+            print(f"Embedding önbelleği yazma hatası: {exc}")
+
+    # --- Bellek katmanı --------------------------------------------------
+
+    def _remember(self, key: str, payload: bytes) -> None:
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._memory[key] = payload
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _encode(self, vector) -> bytes:
+        return to_bytes(vector, self.quantization)
+
+    @staticmethod
+    def _decode(payload: bytes):
+        return from_bytes(payload)
+
+    # --- Genel API -------------------------------------------------------
+
+    def get(self, image_path: str):
+        """Önbellekte varsa vektörü döndür, yoksa None."""
+        try:
+            key = self.key_for(image_path)
+        except OSError:
+            return None
+        return self._get_by_key(key)
+
+    def _get_by_key(self, key: str):
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+        if payload is None:
+            payload = self._read_disk(key)
+            if payload is None:
+                return None
+            self._remember(key, payload)
+        return self._decode(payload)
+
+    def put(self, image_path: str, vector) -> None:
+        """Vektörü her iki katmana da yaz."""
+        try:
+            key = self.key_for(image_path)
+        except OSError:
+            return
+        self._put_by_key(key, vector)
+
+    def _put_by_key(self, key: str, vector) -> None:
+        payload = self._encode(vector)
+        self._remember(key, payload)
+        self._write_disk(key, payload)
+
+    def get_or_compute(
+        self,
+        image_paths: Sequence[str],
+        compute: Callable[[List[str]], List[Dict]],
+    ) -> List[Dict]:
+        """
+        Önbellekte olmayan görüntüleri `compute` ile toplu olarak vektörle.
+
+        `compute`, `image_to_clip_vectors` ile aynı sözleşmeye sahip olmalıdır.
+        Dönen liste giriş sırasındadır:
+            {'image_path': str, 'vector': np.ndarray | None, 'error': str | None}
+        """
+        results: List[Dict] = []
+        missing_paths: List[str] = []
+        missing_keys: Dict[str, Optional[str]] = {}
+
+        for path in image_paths:
+            result = {"image_path": path, "vector": None, "error": None}
+            results.append(result)
+            try:
+                key = self.key_for(path)
+            except OSError as exc:
+                result["error"] = str(exc)
+                continue
+            vector = self._get_by_key(key)
+            if vector is not None:
+                result["vector"] = vector
+                continue
+            if path not in missing_keys:
+                missing_paths.append(path)
+                missing_keys[path] = key
+
+        if not missing_paths:
+            return results
+
+        computed = {item["image_path"]: item for item in compute(missing_paths)}
+        for path in missing_paths:
+            item = computed.get(path)
+            if item and item.get("vector") is not None:
+                self._put_by_key(missing_keys[path], item["vector"])
+
+        for result in results:
+            if result["vector"] is not None or result["error"]:
+                continue
+            item = computed.get(result["image_path"])
+            if not item:
+                result["error"] = "Embedding could not be computed"
+                continue
+            result["vector"] = item.get("vector")
+            result["error"] = item.get("error")
+        return results
+
+    def clear_memory(self) -> None:
+        """Süreç içi katmanı boşalt (disk deposuna dokunmaz)."""
+        with self._lock:
+            self._memory.clear()
+            self._digests.clear()
+
+
+class QueryVectorCache:
+    """
+    Sık kullanılan metin sorgularının vektörleri için süreç içi LRU.
+
+    Sorgu metni boşlukları sadeleştirilip küçük harfe çevrilerek anahtarlanır;
+    vektörler kompakt bayt biçiminde tutulur.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max(0, max_entries)
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.split()).lower()
+
+    def get_or_compute(self, query: str, compute: Callable[[str], object]):
+        key = self.normalize(query)
+        with self._lock:
+            payload = self._memory.get(key)
+            if payload is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return from_bytes(payload)
+            self.misses += 1
+
+        vector = compute(key)
+        if self.max_entries:
+            with self._lock:
+                self._memory[key] = to_bytes(vector)
+                while len(self._memory) > self.max_entries:
+                    self._memory.popitem(last=False)
+        return vector
+
+
+@lru_cache(maxsize=None)
+def get_query_vector_cache(model_identity: str) -> QueryVectorCache:
+    """Verilen model (bkz. model_registry) için metin sorgu önbelleği."""
+    return QueryVectorCache(getattr(settings, "TEXT_QUERY_CACHE_ENTRIES", 1024))
+
+
+@lru_cache(maxsize=None)
+def get_embedding_cache(model_name: str = "ViT-B-32", pretrained: str = "openai",
+                        backend: Optional[str] = None, version: Optional[str] = None) -> EmbeddingCache:
+    """
+    Verilen CLIP modeli için süreç genelinde tek önbellek örneğini döndür.
+
+    Backend adı ve decode yolu da anahtara girer: int8 kuantize modelin veya
+    küçültülmüş girişten üretilen vektörler diğerleriyle karışmaz.
+    """
+    from .utils import decode_variant
+
+    backend = backend or configured_backend_name()
+    version = version or getattr(settings, "EMBEDDING_MODEL_VERSION", "1")
+    return EmbeddingCache(
+        directory=getattr(settings, "EMBEDDING_CACHE_DIR", None),
+        namespace=f"{model_name}:{pretrained}:{backend}:{decode_variant()}:{version}",
+        max_entries=getattr(settings, "EMBEDDING_CACHE_MEMORY_ENTRIES", 2048),
+        quantization=getattr(settings, "EMBEDDING_CACHE_QUANTIZATION", "") or None,
+    )
@@ -0,0 +1,432 @@
+"""
+Süreç dışı CLIP embedding sunucusu ve ince istemcisi.
+
+Her Django / gunicorn işçisinin CLIP modelini ayrı ayrı belleğe yüklemesi
+yerine, modeli tutan N işçi süreçli tek bir yerel servis çalıştırılır:
+
+    python manage.py run_embedding_server
+
+Web süreçleri `EmbeddingClient` ile Unix soketi (veya yerel TCP) üzerinden
+istek gönderir. Sunucu, eşzamanlı gelen istekleri kısa bir bekleme penceresi
+(`EMBEDDING_SERVER_MAX_WAIT_MS`) içinde birleştirip tek bir batch halinde
+boştaki işçiye verir; aynı dosya için gelen istekler tek vektörlemede
+paylaşılır.
+
+Protokol (multiprocessing.connection, pickle):
+    istek : {'op': 'embed', 'paths': [...]} | {'op': 'embed_text', 'texts': [...]} | {'op': 'ping'}
+    yanıt : [{'image_path', 'vector', 'error'}, ...] | [{'text', 'vector', 'error'}, ...]
+            | {'ok': True, ...}
+
+Metin sorguları (anlamsal arama) da sunucuda vektörlenir; böylece web
+süreçleri PyTorch / CLIP metin kulesini hiç yüklemez. Metin kulesi işçide ilk
+metin isteğinde bir kez yüklenir.
+
+Vektörler hat üzerinde kompakt bayt biçiminde (`vectors.to_bytes`, float16)
+taşınır; istemci bunları tekrar NumPy vektörüne çevirir.
+
+Bir işçi süreç ölürse (büyük görselde OOM, torch içinde çökme) havuz yerine
+yenisini başlatır ama görevini düşürür; bu yüzden her batch'in sonucu
+`task_timeout` saniye beklenir. Süre dolarsa batch hata sonucuyla
+tamamlanır ve işçi yuvası serbest bırakılır.
+"""
+
+import os
+import queue
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def parse_address(address: str) -> Tuple[object, str]:
+    """
+    Adres metnini multiprocessing.connection formatına çevir.
+
+        "unix:/tmp/embedding.sock" -> ("/tmp/embedding.sock", "AF_UNIX")
+        "127.0.0.1:8765"           -> (("127.0.0.1", 8765), "AF_INET")
+    """
+    if address.startswith("unix:"):
+        return address[len("unix:"):], "AF_UNIX"
+    host, _, port = address.rpartition(":")
+    return (host or "127.0.0.1", int(port)), "AF_INET"
+
+
+# --- İşçi süreç tarafı -----------------------------------------------------
+
+_worker_backend = None
+
+
+def _init_worker(backend_name: str, backend_options: dict) -> None:
+    """Her işçi süreç başlarken modeli bir kez yükler."""
+    global _worker_backend
+    from .embedding_backends import create_backend
+
+    _worker_backend = create_backend(backend_name, **backend_options)
+
+
+def _embed_in_worker(paths: List[str], batch_size: int) -> List[Dict]:
+    from .utils import embed_images_with_backend
+    from .vectors import to_bytes
+
+    results = embed_images_with_backend(_worker_backend, paths, batch_size=batch_size)
+    for result in results:
+        if result["vector"] is not None:
+            result["vector"] = to_bytes(result["vector"])
+    return results
+
+
+def _embed_text_in_worker(texts: List[str], text_options: dict) -> List[Dict]:
+    from .utils import text_to_clip_vector
+    from .vectors import to_bytes
+
+    results = []
+    for text in texts:
+        result = {"text": text, "vector": None, "error": None}
+        try:
+            result["vector"] = to_bytes(text_to_clip_vector(text, **text_options))
+        except Exception as exc:
+            result["error"] = str(exc)
+        results.append(result)
+    return results
+
+
+# --- Sunucu ----------------------------------------------------------------
+
+class _PendingRequest:
+    """Bir istemci isteğinin sonucunu bekleyen kayıt."""
+
+    def __init__(self, paths: List[str]):
+        self.paths = paths
+        self.results: Optional[List[Dict]] = None
+        self.done = threading.Event()
+
+
+class EmbeddingServer:
+    """Eşzamanlı istekleri birleştirip işçi süreç havuzuna dağıtan sunucu."""
+
+    def __init__(
+        self,
+        address: str,
+        backend_name: str,
+        backend_options: dict,
+        workers: int = 2,
+        max_batch: int = 32,
+        max_wait_ms: int = 10,
+        authkey: Optional[bytes] = None,
+        task_timeout: float = 25.0,
+        text_options: Optional[dict] = None,
+        log=print,
+    ):
+        self.address, self.family = parse_address(address)
+        self.backend_name = backend_name
+        self.backend_options = backend_options
+        self.workers = max(1, workers)
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0, max_wait_ms) / 1000.0
+        self.authkey = authkey
+        # Batch başına en fazla bekleme; istemci zaman aşımından kısa olmalı ki
+        # istemci yerel CLIP'e düşmek yerine hata sonucu alsın
+        self.task_timeout = max(0.1, float(task_timeout))
+        # Metin kulesi (`text_to_clip_vector`) parametreleri: model_name, pretrained, device
+        self.text_options = dict(text_options or {})
+        self.log = log
+
+        self._queue: "queue.Queue[_PendingRequest]" = queue.Queue()
+        # Boştaki işçi sayısı kadar batch aynı anda işlenir; işçiler meşgulken
+        # istekler kuyrukta birikir ve bir sonraki batch daha büyük olur.
+        self._free_workers = threading.Semaphore(self.workers)
+        self._pool = None
+        self._listener = None
+        self._stopped = threading.Event()
+        self.stats = {"requests": 0, "batches": 0, "images": 0, "texts": 0, "timeouts": 0}
+
+    # İşçi süreçte çalışan fonksiyonlar (spawn ile çağrılabilmeleri için modül düzeyinde)
+    worker_initializer = staticmethod(_init_worker)
+    worker_task = staticmethod(_embed_in_worker)
+    text_worker_task = staticmethod(_embed_text_in_worker)
+
+    def serve_forever(self) -> None:
+        import multiprocessing
+
+        # Havuz, iş parçacıkları başlamadan önce oluşturulur
+        ctx = multiprocessing.get_context("spawn")
+        self._pool = ctx.Pool(
+            self.workers,
+            initializer=self.worker_initializer,
+            initargs=(self.backend_name, self.backend_options),
+        )
+
+        if self.family == "AF_UNIX":
+            self._remove_stale_socket()
+        self._listener = Listener(self.address, family=self.family, authkey=self.authkey)
+        self.log(
+            f"Embedding sunucusu dinliyor: {self.address} "
+            f"(backend={self.backend_name}, işçi={self.workers}, "
+            f"max_batch={self.max_batch}, max_wait={self.max_wait * 1000:.0f}ms)"
+        )
+
+        threading.Thread(target=self._batch_loop, name="embedding-batcher", daemon=True).start()
+
+        try:
+            while not self._stopped.is_set():
+                try:
+                    conn = self._listener.accept()
+                except OSError:
+                    if self._stopped.is_set():
+                        break
+                    raise
+                except Exception as exc:
+                    # Hatalı authkey vb. tek bağlantıyı düşürür, sunucuyu değil
+                    self.log(f"Bağlantı reddedildi: {exc}")
+                    continue
+                threading.Thread(
+                    target=self._serve_connection, args=(conn,), daemon=True
+                ).start()
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        if self._listener is not None:
+            self._listener.close()
+        if self._pool is not None:
+            self._pool.terminate()
+        if self.family == "AF_UNIX" and os.path.exists(self.address):
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+
+    def _remove_stale_socket(self) -> None:
+        if not os.path.exists(self.address):
+            return
+        try:
+            Client(self.address, family=self.family, authkey=self.authkey).close()
+        except Exception:
+            os.unlink(self.address)
+            return
+        raise RuntimeError(f"Soket zaten kullanımda (başka bir sunucu çalışıyor): {self.address}")
+
+    def _serve_connection(self, conn) -> None:
+        with conn:
+            while not self._stopped.is_set():
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    return
+                op = message.get("op") if isinstance(message, dict) else None
+                if op == "ping":
+                    conn.send({"ok": True, "backend": self.backend_name, "workers": self.workers, **self.stats})
+                elif op == "embed":
+                    pending = _PendingRequest(list(message.get("paths") or []))
+                    self.stats["requests"] += 1
+                    self._queue.put(pending)
+                    # Batch biriktirme ve kuyrukta bekleme payıyla; normalde `_dispatch` daha önce tamamlar
+                    if not pending.done.wait(self.task_timeout + self.max_wait + 1.0):
+                        pending.results = [
+                            {"image_path": path, "vector": None, "error": "Embedding işçisi yanıt vermedi"}
+                            for path in pending.paths
+                        ]
+                    conn.send(pending.results)
+                elif op == "embed_text":
+                    self.stats["requests"] += 1
+                    conn.send(self._embed_texts(list(message.get("texts") or [])))
+                else:
+                    conn.send({"ok": False, "error": f"Bilinmeyen işlem: {op}"})
+
+    def _embed_texts(self, texts: List[str]) -> List[Dict]:
+        """
+        Metin sorgularını boştaki bir işçide vektörle.
+
+        Sorgular kısa ve seyrek olduğundan görsel batch'lerine katılmaz; ama
+        aynı işçi yuvası semaforunu kullanır ve aynı `task_timeout` ile beklenir.
+        """
+        import multiprocessing
+
+        if not texts:
+            return []
+        self.stats["texts"] += len(texts)
+        self._free_workers.acquire()
+        try:
+            result = self._pool.apply_async(self.text_worker_task, (texts, self.text_options))
+            return result.get(timeout=self.task_timeout)
+        except multiprocessing.TimeoutError:
+            self.stats["timeouts"] += 1
+            self.log(f"Embedding işçisi {self.task_timeout:.0f} sn içinde yanıt vermedi (süreç ölmüş olabilir)")
+            error = "Embedding işçisi yanıt vermedi"
+        except Exception as exc:
+            error = str(exc)
+        finally:
+            self._free_workers.release()
+        return [{"text": text, "vector": None, "error": error} for text in texts]
+
+    def _batch_loop(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                first = self._queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            # İşçi yuvası sadece iş varken tutulur; boşta beklerken metin istekleri
+            # (`_embed_texts`) aynı semaforu alabilmeli
+            self._free_workers.acquire()
+
+            batch = [first]
+            size = len(first.paths)
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(item)
+                size += len(item.paths)
+
+            self._dispatch(batch)
+
+    def _dispatch(self, batch: List[_PendingRequest]) -> None:
+        # Aynı dosya birden fazla istekte geçiyorsa tek kez vektörlenir
+        unique_paths = list(dict.fromkeys(path for item in batch for path in item.paths))
+        self.stats["batches"] += 1
+        self.stats["images"] += len(unique_paths)
+
+        def _finish(results: List[Dict]) -> None:
+            by_path = {result["image_path"]: result for result in results}
+            for item in batch:
+                item.results = [
+                    dict(by_path.get(path) or {"image_path": path, "vector": None, "error": "Sonuç yok"})
+                    for path in item.paths
+                ]
+                item.done.set()
+            self._free_workers.release()
+
+        def _fail(error: str) -> None:
+            _finish([{"image_path": path, "vector": None, "error": error} for path in unique_paths])
+
+        try:
+            result = self._pool.apply_async(self.worker_task, (unique_paths, self.max_batch))
+        except Exception as exc:
+            _fail(str(exc))
+            return
+        # Sonuç ayrı bir iş parçacığında beklenir; ölen işçinin görevi hiç tamamlanmadığı
+        # için callback'lere güvenilmez, `get(timeout)` batch'i her durumda sonlandırır
+        threading.Thread(
+            target=self._await_result, args=(result, _finish, _fail), daemon=True
+        ).start()
+
+    def _await_result(self, result, finish, fail) -> None:
+        import multiprocessing
+
+        try:
+            results = result.get(timeout=self.task_timeout)
+        except multiprocessing.TimeoutError:
+            self.stats["timeouts"] += 1
+            self.log(f"Embedding işçisi {self.task_timeout:.0f} sn içinde yanıt vermedi (süreç ölmüş olabilir)")
+            fail("Embedding işçisi yanıt vermedi")
+            return
+        except Exception as exc:
+            fail(str(exc))
+            return
+        finish(results)
+
+
+# --- İstemci ---------------------------------------------------------------
+
+class EmbeddingClient:
+    """Embedding sunucusu için iş parçacığı başına kalıcı bağlantı kullanan ince istemci."""
+
+    def __init__(self, address: str, authkey: Optional[bytes] = None, timeout: float = 30.0):
+        self.address, self.family = parse_address(address)
+        self.authkey = authkey
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = Client(self.address, family=self.family, authkey=self.authkey)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            try:
+                conn.close()
+            except OSError:
+                pass
+
+    def _request(self, message: dict):
+        last_error = None
+        # Sunucu yeniden başlatıldıysa eski bağlantı kopmuş olabilir: bir kez yeniden bağlan
+        for _ in range(2):
+            try:
+                conn = self._connection()
+                conn.send(message)
+                if not conn.poll(self.timeout):
+                    self._reset()
+                    raise TimeoutError(f"Embedding sunucusu {self.timeout} sn içinde yanıt vermedi")
+                return conn.recv()
+            except TimeoutError:
+                raise
+            except (EOFError, OSError) as exc:
+                last_error = exc
+                self._reset()
+        raise ConnectionError(f"Embedding sunucusuna ulaşılamadı: {last_error}")
+
+    def embed(self, image_paths: Sequence[str]) -> List[Dict]:
+        """`image_to_clip_vectors` ile aynı biçimde sonuç döndürür."""
+        from .vectors import from_bytes
+
+        if not image_paths:
+            return []
+        results = self._request({"op": "embed", "paths": list(image_paths)})
+        for result in results:
+            if result.get("vector") is not None:
+                result["vector"] = from_bytes(result["vector"])
+        return results
+
+    def embed_texts(self, texts: Sequence[str]) -> List[Dict]:
+        """Metinleri vektörle: [{'text', 'vector', 'error'}, ...] (giriş sırasında)."""
+        from .vectors import from_bytes
+
+        if not texts:
+            return []
+        results = self._request({"op": "embed_text", "texts": list(texts)})
+        for result in results:
+            if result.get("vector") is not None:
+                result["vector"] = from_bytes(result["vector"])
+        return results
+
+    def ping(self) -> dict:
+        return self._request({"op": "ping"})
+
+
+_client: Optional[EmbeddingClient] = None
+_client_lock = threading.Lock()
+
+
+def get_embedding_client() -> EmbeddingClient:
+    """Ayarlardan süreç genelinde tek istemci örneği oluştur."""
+    global _client
+    from django.conf import settings
+
+    with _client_lock:
+        if _client is None:
+            _client = EmbeddingClient(
+                settings.EMBEDDING_SERVER_ADDRESS,
+                authkey=embedding_server_authkey(),
+                timeout=getattr(settings, "EMBEDDING_SERVER_TIMEOUT", 30.0),
+            )
+        return _client
+
+
+def embedding_server_authkey() -> bytes:
+    from django.conf import settings
+
+    return (getattr(settings, "EMBEDDING_SERVER_AUTHKEY", "") or settings.SECRET_KEY).encode("utf-8")
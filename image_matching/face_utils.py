@@ -1,23 +1,226 @@
 """
-Yüz tanıma / FaceNet entegrasyonu için geçici yardımcı fonksiyonlar.
+CPU üzerinde yüz algılama ve yüz embedding'i.
 
-Projede gerçek FaceNet modeli entegre edilene kadar, bu dosya
-`get_face_embedding` fonksiyonunu basit bir stub olarak sağlar.
+OpenCV'nin DNN tabanlı modelleri kullanılır (ek derin öğrenme paketi gerekmez):
+    - YuNet (cv2.FaceDetectorYN)      : yüz algılama + 5 yüz noktası
+    - SFace (cv2.FaceRecognizerSF)    : hizalanmış 112x112 yüzden 128 boyutlu embedding
+
+Model dosyaları (OpenCV Zoo) `settings.FACE_DETECTOR_MODEL_PATH` ve
+`settings.FACE_RECOGNIZER_MODEL_PATH` ile verilir:
+    face_detection_yunet_2023mar.onnx
+    face_recognition_sface_2021dec.onnx
+
+Toplu çağrılarda görüntüler iş parçacığı havuzunda decode edilip algılanır
+(OpenCV çağrıları GIL'i bırakır; her iş parçacığının kendi model örneği
+vardır). Embedding'ler görüntü içeriğine göre önbelleklenir (bkz.
+embedding_cache.py); yüz bulunamayan görüntüler de önbelleğe boş vektör
+olarak yazılır ve tekrar algılanmaz. Hizalanmış yüz kırpıntıları
+`settings.FACE_CROP_DIR` altına kaydedilir.
+
+Kullanım örneği:
+
+    from image_matching.face_utils import get_face_embedding
+
+    is_face, vector = get_face_embedding("media/item_images/cocuk.jpg")
 """
 
-from typing import List, Tuple
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover - sadece tip kontrolü
+    import numpy as np
+
+# SFace embedding boyutu
+FACE_EMBEDDING_DIM = 128
+
+_local = threading.local()
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def _models():
+    """İş parçacığına ait (dedektör, tanıyıcı) çifti; OpenCV model nesneleri paylaşılmaz."""
+    models = getattr(_local, "models", None)
+    if models is None:
+        import cv2
 
+        detector_path = str(_setting("FACE_DETECTOR_MODEL_PATH", ""))
+        recognizer_path = str(_setting("FACE_RECOGNIZER_MODEL_PATH", ""))
+        for path in (detector_path, recognizer_path):
+            if not path or not os.path.exists(path):
+                raise FileNotFoundError(f"Yüz modeli bulunamadı: {path or '(ayarlanmamış)'}")
 
-def get_face_embedding(image_path: str) -> Tuple[bool, List[float] | None]:
+        detector = cv2.FaceDetectorYN.create(
+            detector_path,
+            "",
+            (320, 320),
+            score_threshold=float(_setting("FACE_SCORE_THRESHOLD", 0.9)),
+            nms_threshold=0.3,
+            top_k=50,
+            backend_id=cv2.dnn.DNN_BACKEND_OPENCV,
+            target_id=cv2.dnn.DNN_TARGET_CPU,
+        )
+        recognizer = cv2.FaceRecognizerSF.create(
+            recognizer_path,
+            "",
+            backend_id=cv2.dnn.DNN_BACKEND_OPENCV,
+            target_id=cv2.dnn.DNN_TARGET_CPU,
+        )
+        models = _local.models = (detector, recognizer)
+    return models
+
+
+def _read_image(image_path: str):
+    """Görüntüyü BGR olarak oku; algılama için uzun kenarı sınırla."""
+    import cv2
+
+    img = cv2.imread(image_path, cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Görüntü okunamadı: {image_path}")
+    max_side = int(_setting("FACE_DETECTION_MAX_SIDE", 640))
+    height, width = img.shape[:2]
+    scale = max_side / max(height, width)
+    if scale < 1.0:
+        img = cv2.resize(img, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    return img
+
+
+def _detect_and_embed(image_path: str) -> Tuple[Optional[object], Optional[object]]:
+    """
+    Tek görüntü: en belirgin yüzü bul, hizala ve embedding çıkar.
+
+    Dönen değer: (vektör, kırpıntı) — yüz yoksa (boş vektör, None).
+    """
+    import numpy as np
+
+    from .vectors import as_vector
+
+    detector, recognizer = _models()
+    img = _read_image(image_path)
+    height, width = img.shape[:2]
+    detector.setInputSize((width, height))
+    _, faces = detector.detect(img)
+    if faces is None or len(faces) == 0:
+        return as_vector([]), None
+
+    # En büyük ve en güvenilir yüz: alan x skor
+    face = max(faces, key=lambda f: float(f[2] * f[3] * f[14]))
+    crop = recognizer.alignCrop(img, face)
+    feature = recognizer.feature(crop).reshape(-1).astype(np.float32)
+    norm = float(np.linalg.norm(feature))
+    if not norm:
+        return as_vector([]), None
+    return as_vector(feature / norm), crop
+
+
+def _save_crop(key: str, crop) -> None:
+    import cv2
+
+    directory = _setting("FACE_CROP_DIR", None)
+    if not directory:
+        return
+    path = os.path.join(str(directory), key[:2], f"{key}.jpg")
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cv2.imwrite(path, crop)
+    except Exception as exc:
+        print(f"Yüz kırpıntısı kaydedilemedi: {exc}")
+
+
+def face_crop_path(image_path: str) -> Optional[str]:
+    """Görüntü için kaydedilmiş hizalanmış yüz kırpıntısının yolu (yoksa None)."""
+    directory = _setting("FACE_CROP_DIR", None)
+    if not directory:
+        return None
+    try:
+        key = get_face_cache().key_for(image_path)
+    except OSError:
+        return None
+    path = os.path.join(str(directory), key[:2], f"{key}.jpg")
+    return path if os.path.exists(path) else None
+
+
+@lru_cache(maxsize=1)
+def get_face_cache():
+    """Yüz embedding'leri için içerik adresli önbellek (CLIP vektörlerinden ayrı ad alanı)."""
+    from .embedding_cache import EmbeddingCache
+
+    detector = os.path.basename(str(_setting("FACE_DETECTOR_MODEL_PATH", "yunet")))
+    recognizer = os.path.basename(str(_setting("FACE_RECOGNIZER_MODEL_PATH", "sface")))
+    return EmbeddingCache(
+        directory=_setting("EMBEDDING_CACHE_DIR", None),
+        namespace=f"face:{detector}:{recognizer}:{_setting('FACE_DETECTION_MAX_SIDE', 640)}",
+        max_entries=_setting("EMBEDDING_CACHE_MEMORY_ENTRIES", 2048),
+    )
+
+
+def compute_face_embeddings(image_paths: Sequence[str], num_workers: Optional[int] = None) -> List[Dict]:
+    """
+    Önbelleğe bakmadan görüntüleri paralel olarak işle.
+
+    `image_to_clip_vectors` ile aynı sözleşme; yüz bulunamayan görüntüler için
+    `vector` boş (uzunluğu 0) dizidir.
+    """
+    if not image_paths:
+        return []
+    if num_workers is None:
+        num_workers = min(4, os.cpu_count() or 1)
+
+    cache = get_face_cache()
+
+    def _one(image_path: str) -> Dict:
+        try:
+            vector, crop = _detect_and_embed(image_path)
+            if crop is not None:
+                _save_crop(cache.key_for(image_path), crop)
+            return {"image_path": image_path, "vector": vector, "error": None}
+        except Exception as exc:
+            return {"image_path": image_path, "vector": None, "error": str(exc)}
+
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+        return list(executor.map(_one, image_paths))
+
+
+def get_face_embeddings(image_paths: Sequence[str], num_workers: Optional[int] = None) -> List[Dict]:
+    """
+    Birden fazla görüntü için (önbellekli) yüz embedding'i.
+
+    Dönen liste giriş sırasındadır:
+        {'image_path': str, 'vector': np.ndarray | None, 'has_face': bool, 'error': str | None}
+    """
+    results = get_face_cache().get_or_compute(
+        list(image_paths), lambda paths: compute_face_embeddings(paths, num_workers=num_workers)
+    )
+    for result in results:
+        vector = result["vector"]
+        result["has_face"] = vector is not None and len(vector) > 0
+        if not result["has_face"]:
+            result["vector"] = None
+    return results
+
+
+def get_face_embedding(image_path: str) -> Tuple[bool, "np.ndarray | None"]:
     """
     Verilen görüntüde yüz algıla ve varsa embedding döndür.
 
     Dönüş:
         (is_face, embedding or None)
 
-    Not: Şu an sadece stub; her zaman yüz yokmuş gibi (False, None) döner.
-    Gerçek projede burası FaceNet / başka bir yüz modeli ile değiştirilmelidir.
+    Modeller yüklenemezse veya görüntü okunamazsa (False, None) döner;
+    çağıran taraf CLIP'e geri düşer.
     """
-    return False, None
-
-
+    result = get_face_embeddings([image_path])[0]
+    if result["error"]:
+        print(f"Yüz embedding hatası: {result['error']}")
+        return False, None
+    return result["has_face"], result["vector"]
@@ -0,0 +1,306 @@
+"""
+Milvus vektör indeksi seçimi, arama parametreleri ve çevrimiçi yeniden oluşturma.
+
+İndeks tipi ve parametreleri sabit değil, koleksiyondaki satır sayısı ve
+hedef recall'a (`MILVUS_INDEX_TARGET_RECALL`) göre seçilir:
+
+    - küçük koleksiyonlar (< 100k)        : IVF_FLAT, nlist ~ 4·√n
+    - orta (bellek bütçesine sığıyorsa)   : HNSW (M / efConstruction recall'a göre)
+    - büyük veya bütçeyi aşan             : IVF_SQ8 (vektör başına 1 bayt/boyut)
+
+Arama parametreleri (nprobe / ef) koleksiyondaki mevcut indeksten ve hedef
+recall'dan türetilir, koleksiyon tanıtıcısı başına bir kez hesaplanır.
+
+`rebuild_index` koleksiyonu yeni indeksle gölge bir koleksiyona kopyalar
+(bölümler korunur), kopyalama sırasında eklenen satırları yakalar, sonra eski
+koleksiyonu silip gölgeyi eski adla yeniden adlandırır; servis bu sırada
+çalışmaya devam eder (tampondaki eklemeler değişim anında yeniden denenir).
+
+Kullanım örneği:
+
+    from image_matching.index_tuning import recommend_index, rebuild_index
+
+    config = recommend_index(row_count=250_000, dim=512, metric="IP")
+    rebuild_index("image_vectors", config)
+"""
+
+import json
+import math
+import weakref
+from typing import Callable, Dict, Optional
+
+from .milvus_connection import get_milvus_manager
+
+INDEX_TYPES = ("IVF_FLAT", "IVF_SQ8", "HNSW")
+
+# Bu satır sayısının altında IVF_FLAT tam doğruluğa yakın ve en ucuz seçenek
+SMALL_COLLECTION_ROWS = 100_000
+
+# Hedef recall -> taranacak IVF kümesi oranı (nprobe / nlist) ve HNSW ef değeri
+_RECALL_STEPS = (
+    # (recall, nprobe oranı, ef)
+    (0.90, 1 / 64, 64),
+    (0.95, 1 / 32, 128),
+    (0.98, 1 / 16, 256),
+    (0.99, 1 / 8, 512),
+)
+
+_search_params_cache: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def _recall_step(target_recall: float):
+    for step in _RECALL_STEPS:
+        if target_recall <= step[0]:
+            return step
+    return _RECALL_STEPS[-1]
+
+
+def _nlist_for(row_count: int) -> int:
+    """nlist ~ 4·√n, 2'nin kuvvetine yuvarlanmış (16 - 65536)."""
+    target = 4 * math.sqrt(max(row_count, 1))
+    return int(min(65536, max(16, 2 ** round(math.log2(target)))))
+
+
+def hnsw_memory_mb(row_count: int, dim: int, m: int) -> float:
+    """HNSW indeksinin yaklaşık bellek kullanımı (ham vektörler + komşu listeleri)."""
+    return row_count * (dim * 4 + m * 2 * 8) / (1024 * 1024)
+
+
+def recommend_index(row_count: int, dim: int, metric: str = "IP",
+                    target_recall: Optional[float] = None,
+                    memory_budget_mb: Optional[float] = None,
+                    index_type: Optional[str] = None) -> dict:
+    """
+    Satır sayısı ve hedef recall'a göre indeks yapılandırması öner.
+
+    Dönen değer `create_index` ile kullanılabilir:
+        {'index_type': ..., 'metric_type': ..., 'params': {...}}
+
+    index_type verilirse (veya `MILVUS_INDEX_TYPE` "auto" değilse) tip
+    zorlanır, sadece parametreler hesaplanır.
+    """
+    if target_recall is None:
+        target_recall = float(_setting("MILVUS_INDEX_TARGET_RECALL", 0.95))
+    if memory_budget_mb is None:
+        memory_budget_mb = float(_setting("MILVUS_INDEX_MEMORY_BUDGET_MB", 4096))
+    if index_type is None:
+        configured = str(_setting("MILVUS_INDEX_TYPE", "auto")).upper()
+        index_type = None if configured == "AUTO" else configured
+
+    hnsw_m = 32 if target_recall >= 0.99 else 16
+    if index_type is None:
+        if row_count < SMALL_COLLECTION_ROWS:
+            index_type = "IVF_FLAT"
+        elif hnsw_memory_mb(row_count, dim, hnsw_m) <= memory_budget_mb:
+            index_type = "HNSW"
+        else:
+            index_type = "IVF_SQ8"
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Desteklenmeyen indeks tipi: {index_type} (seçenekler: {', '.join(INDEX_TYPES)})")
+
+    if index_type == "HNSW":
+        params = {"M": hnsw_m, "efConstruction": 400 if target_recall >= 0.98 else 200}
+    else:
+        params = {"nlist": _nlist_for(row_count)}
+    return {"index_type": index_type, "metric_type": metric.upper(), "params": params}
+
+
+def search_params_for_index(index: dict, top_k: int = 10, target_recall: Optional[float] = None) -> dict:
+    """İndeks yapılandırmasına ve hedef recall'a göre `search(param=...)` değeri."""
+    if target_recall is None:
+        target_recall = float(_setting("MILVUS_INDEX_TARGET_RECALL", 0.95))
+    _, probe_ratio, ef = _recall_step(target_recall)
+    index_type = index.get("index_type")
+    params = index.get("params") or {}
+    if index_type == "HNSW":
+        search = {"ef": max(int(top_k), ef)}
+    elif index_type in ("IVF_FLAT", "IVF_SQ8", "IVF_PQ"):
+        nlist = int(params.get("nlist", 128))
+        # IVF_SQ8 nicemleme kaybını daha fazla küme tarayarak telafi eder
+        ratio = probe_ratio * (1.5 if index_type != "IVF_FLAT" else 1.0)
+        search = {"nprobe": int(min(nlist, max(8, math.ceil(nlist * ratio))))}
+    else:
+        search = {}
+    return {"metric_type": index.get("metric_type", "IP"), "params": search}
+
+
+def _normalize_params(params: dict) -> dict:
+    """Milvus'tan okunan parametreler metin olarak gelebilir: sayıları sayıya çevir."""
+    normalized = {}
+    for key, value in (params or {}).items():
+        try:
+            normalized[key] = int(value)
+        except (TypeError, ValueError):
+            normalized[key] = value
+    return normalized
+
+
+def current_index(collection, field_name: str = "vector") -> Optional[dict]:
+    """Koleksiyondaki vektör indeksinin yapılandırması (yoksa None)."""
+    for index in collection.indexes:
+        if index.field_name != field_name:
+            continue
+        params = dict(index.params)
+        nested = params.get("params") or {}
+        if isinstance(nested, str):
+            nested = json.loads(nested)
+        return {
+            "index_type": params.get("index_type"),
+            "metric_type": params.get("metric_type"),
+            "params": _normalize_params(nested),
+        }
+    return None
+
+
+def search_params(collection, top_k: int = 10, default_metric: str = "IP") -> dict:
+    """
+    Koleksiyonun mevcut indeksine göre arama parametreleri.
+
+    Koleksiyon tanıtıcısı başına bir kez hesaplanır; indeks yeniden
+    oluşturulduğunda tanıtıcı da yenilendiği için önbellek kendiliğinden düşer.
+    """
+    cached = _search_params_cache.get(collection)
+    if cached is None:
+        index = current_index(collection) or {"index_type": None, "metric_type": default_metric}
+        cached = _search_params_cache[collection] = index
+    result = search_params_for_index(cached, top_k=top_k)
+    if not result["metric_type"]:
+        result["metric_type"] = default_metric
+    return result
+
+
+def create_tuned_index(collection, metric: str, row_count: int = 0, field_name: str = "vector") -> dict:
+    """Yeni (boş) koleksiyon için önerilen indeksi oluştur ve yapılandırmayı döndür."""
+    dim = next(field.params.get("dim") for field in collection.schema.fields if field.name == field_name)
+    config = recommend_index(row_count, int(dim), metric=metric)
+    collection.create_index(field_name, config)
+    return config
+
+
+def _row_key(row: dict, key_fields) -> tuple:
+    return tuple(row[field] for field in key_fields)
+
+
+def rebuild_index(collection_name: str, config: dict, batch_size: int = 1000,
+                  log: Callable[[str], None] = print) -> int:
+    """
+    Koleksiyonu yeni indeksle çevrimiçi olarak yeniden oluştur.
+
+    Adımlar: gölge koleksiyon (aynı şema ve bölümler, yeni indeks) -> veriyi
+    bölüm bölüm kopyala -> kopyalama sırasında eklenen satırları yakala ->
+    eski koleksiyonu sil -> gölgeyi eski adla yeniden adlandır.
+
+    Satır eşlemesi birincil anahtarla yapılır; auto_id koleksiyonlarda
+    vektör dışındaki alanların tamamı anahtar olarak kullanılır. Dönen değer
+    kopyalanan satır sayısıdır.
+    """
+    from pymilvus import Collection, utility
+
+    manager = get_milvus_manager()
+    if not manager.ensure_connected():
+        raise ConnectionError("Milvus'a bağlanılamadı")
+
+    source = manager.load_partitions(collection_name, None)
+    schema = source.schema
+    primary = next(field for field in schema.fields if field.is_primary)
+    vector_field = "vector"
+    copy_fields = [field.name for field in schema.fields if not field.auto_id]
+    if primary.auto_id:
+        key_fields = [name for name in copy_fields if name != vector_field]
+    else:
+        key_fields = [primary.name]
+
+    shadow_name = f"{collection_name}__reindex"
+    if utility.has_collection(shadow_name, using=manager.alias):
+        utility.drop_collection(shadow_name, using=manager.alias)
+    manager.invalidate(shadow_name)
+    shadow = Collection(shadow_name, schema, using=manager.alias)
+    partitions = sorted(manager.partitions(collection_name, refresh=True))
+    for partition in partitions:
+        if not shadow.has_partition(partition):
+            shadow.create_partition(partition)
+
+    def _copy(only_missing: Optional[set] = None) -> int:
+        copied = 0
+        for partition in partitions:
+            iterator = source.query_iterator(
+                batch_size=batch_size, output_fields=copy_fields, partition_names=[partition]
+            )
+            try:
+                while True:
+                    rows = iterator.next()
+                    if not rows:
+                        break
+                    if only_missing is not None:
+                        rows = [row for row in rows if _row_key(row, key_fields) in only_missing]
+                        if not rows:
+                            continue
+                    shadow.insert([[row[name] for row in rows] for name in copy_fields], partition_name=partition)
+                    copied += len(rows)
+            finally:
+                iterator.close()
+        return copied
+
+    def _keys(collection) -> set:
+        keys = set()
+        iterator = collection.query_iterator(batch_size=batch_size * 10, output_fields=key_fields)
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                keys.update(_row_key(row, key_fields) for row in rows)
+        finally:
+            iterator.close()
+        return keys
+
+    log(f"{collection_name}: {len(partitions)} bölüm gölge koleksiyona kopyalanıyor...")
+    copied = _copy()
+    shadow.flush()
+    shadow.create_index(vector_field, config)
+    shadow.load()
+
+    # Kopyalama sırasında diğer süreçlerin eklediği satırlar
+    missing = _keys(source) - _keys(shadow)
+    if missing:
+        log(f"{collection_name}: kopyalama sırasında eklenen {len(missing)} satır aktarılıyor...")
+        copied += _copy(only_missing=missing)
+        shadow.flush()
+
+    log(f"{collection_name}: koleksiyonlar değiştiriliyor ({config['index_type']} {config['params']})")
+    utility.drop_collection(collection_name, using=manager.alias)
+    manager.invalidate(collection_name)
+    utility.rename_collection(shadow_name, collection_name, using=manager.alias)
+    manager.invalidate(shadow_name)
+    return copied
+
+
+def tuning_report(collection_name: str, metric: str = "IP", target_recall: Optional[float] = None) -> Dict:
+    """Koleksiyonun mevcut indeksini, satır sayısını ve önerilen yapılandırmayı döndür."""
+    manager = get_milvus_manager()
+    collection = manager.collection(collection_name, load=False)
+    dim = next(field.params.get("dim") for field in collection.schema.fields if field.name == "vector")
+    row_count = collection.num_entities
+    current = current_index(collection)
+    recommended = recommend_index(
+        row_count, int(dim), metric=(current or {}).get("metric_type") or metric, target_recall=target_recall
+    )
+    return {
+        "collection": collection_name,
+        "rows": row_count,
+        "dim": int(dim),
+        "current": current,
+        "recommended": recommended,
+        "needs_rebuild": current is None
+        or current["index_type"] != recommended["index_type"]
+        or current["params"] != recommended["params"],
+    }
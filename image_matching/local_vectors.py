@@ -0,0 +1,558 @@
+"""
+Milvus sunucusu gerektirmeyen gömülü vektör deposu (NumPy + memmap).
+
+Küçük kurulumlar, CI ve kiosklar için `MilvusService` ile aynı arayüzü
+(insert_vector, search_similar, search_similar_batch, get_vectors,
+similarities, delete_vectors, drain ...) sağlar; `VECTOR_BACKEND = "local"` ile seçilir (bkz.
+`services.get_vector_service`).
+
+Her koleksiyon `LOCAL_VECTOR_DIR/<koleksiyon>/` altında tutulur:
+
+    state.json            : {"generation": g, "dimension": d}
+    vectors.<g>.f32       : float32 [kapasite x boyut] matris (np.memmap)
+    rows.<g>.jsonl        : yalnız eklenen işlem günlüğü (add / del satırları)
+
+Arama tam (kesin) iç çarpımdır: `matrix @ query` BLAS sgemv ile yapılır,
+top_k `argpartition` ile seçilir. Skaler filtreler (şehir, tür, durum ...)
+sözlük kodlu tamsayı sütunlarında vektörel maske olarak uygulanır; filtre
+aday kümesini küçültüyorsa sadece o satırlar çarpılır.
+
+Aynı dizini kullanan birden fazla süreç (gunicorn işçileri, celery) dosya
+kilidi ile yazar; her süreç işlemden önce günlüğün yeni satırlarını okur
+(tek `os.stat`). Silinen satırlar belirli bir orana ulaşınca depo yeni
+nesil dosyalara sıkıştırılır.
+
+Kullanım örneği:
+
+    from image_matching.local_vectors import LocalVectorService
+
+    store = LocalVectorService("image_vectors_clip_default", dimension=512)
+    store.insert_vector("uuid", vector, user_id="3", image_path="a.jpg", metadata={"city": "Ankara"})
+    store.search_similar(vector, top_k=10, filters={"city": "Ankara"})
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+try:  # Dosya kilidi sadece POSIX'te; Windows kioskta tek süreç varsayılır
+    import fcntl
+except ImportError:  # pragma: no cover - platforma bağlı
+    fcntl = None
+
+# Arama sonucunda `MilvusService.search_similar` ile aynı alanlar döner
+OUTPUT_FIELDS = ("id", "user_id", "image_path", "description",
+                 "post_id", "post_type", "city", "category", "status", "is_missing_child")
+# Eşitlik filtresi sözlük kodlu tamsayı sütunlarda uygulanan metin alanları
+CODED_FIELDS = ("user_id", "post_type", "city", "category", "status")
+
+# Matris dosyası bu kadar satırla başlar, doldukça iki katına çıkar
+INITIAL_CAPACITY = 1024
+# Silinen satırlar bu sayıyı ve toplamın bu oranını aşınca depo sıkıştırılır
+COMPACT_MIN_DELETED = 1000
+COMPACT_RATIO = 0.25
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+class LocalVectorService:
+    """Disk üzerinde memmap matrisle tutulan, kesin IP aramalı vektör deposu"""
+
+    def __init__(self, collection_name: str = "image_vectors", dimension: int = 512,
+                 directory: Optional[str] = None):
+        self.collection_name = collection_name
+        self.dimension = int(dimension)
+        self.directory = Path(directory or _setting("LOCAL_VECTOR_DIR", "vector_store")) / collection_name
+        self._lock = threading.RLock()
+        self._lock_depth = 0
+        self._state_mtime = None
+        self._reset(generation=None)
+
+    # --- Durum -----------------------------------------------------------
+
+    def _reset(self, generation: Optional[int]) -> None:
+        import numpy as np
+
+        self._generation = generation
+        self._matrix = None
+        self._capacity = 0
+        self._log_offset = 0
+        self._count = 0
+        self._deleted = 0
+        self._records: List[Optional[dict]] = []
+        self._rows_by_id: Dict[str, int] = {}
+        self._vocab: Dict[str, Dict[str, int]] = {field: {} for field in CODED_FIELDS}
+        self._codes = {field: np.zeros(0, dtype=np.int32) for field in CODED_FIELDS}
+        self._post_ids = np.zeros(0, dtype=np.int64)
+        self._missing_child = np.zeros(0, dtype=bool)
+        self._alive = np.zeros(0, dtype=bool)
+
+    def _path(self, name: str) -> Path:
+        return self.directory / name
+
+    def _vectors_path(self, generation: int) -> Path:
+        return self._path(f"vectors.{generation}.f32")
+
+    def _log_path(self, generation: int) -> Path:
+        return self._path(f"rows.{generation}.jsonl")
+
+    @contextmanager
+    def _file_lock(self):
+        """Süreçler arası yazma kilidi; iç içe çağrılarda dosya bir kez kilitlenir."""
+        with self._lock:
+            if fcntl is None or self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with open(self._path("lock"), "a") as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _write_state(self, generation: int) -> None:
+        tmp = self._path("state.json.tmp")
+        tmp.write_text(json.dumps({"generation": generation, "dimension": self.dimension}))
+        os.replace(tmp, self._path("state.json"))
+
+    def _open_matrix(self, min_rows: int = 0) -> None:
+        """Matris dosyasını eşle; `min_rows` sığmıyorsa dosyayı büyüt."""
+        import numpy as np
+
+        path = self._vectors_path(self._generation)
+        row_bytes = self.dimension * 4
+        capacity = path.stat().st_size // row_bytes if path.exists() else 0
+        if capacity < max(min_rows, 1):
+            capacity = max(INITIAL_CAPACITY, capacity * 2, min_rows)
+            with open(path, "ab") as handle:
+                handle.truncate(capacity * row_bytes)
+        if self._matrix is not None:
+            self._matrix.flush()
+        self._matrix = np.memmap(path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension))
+        self._capacity = capacity
+
+    def _ensure_columns(self, rows: int) -> None:
+        import numpy as np
+
+        size = len(self._alive)
+        if rows <= size:
+            return
+        size = max(INITIAL_CAPACITY, size * 2, rows)
+
+        def _grow(array):
+            grown = np.zeros(size, dtype=array.dtype)
+            grown[:len(array)] = array
+            return grown
+
+        self._codes = {field: _grow(codes) for field, codes in self._codes.items()}
+        self._post_ids = _grow(self._post_ids)
+        self._missing_child = _grow(self._missing_child)
+        self._alive = _grow(self._alive)
+
+    def _code(self, field: str, value, create: bool = False) -> int:
+        vocab = self._vocab[field]
+        value = str(value)
+        code = vocab.get(value)
+        if code is None:
+            if not create:
+                return -1
+            code = vocab[value] = len(vocab)
+        return code
+
+    def _sync(self) -> None:
+        """Diskteki son duruma yetiş (başka süreçlerin yazdıkları dahil)."""
+        state_path = self._path("state.json")
+        try:
+            mtime = state_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            # Koleksiyon henüz yok (veya silindi): boş depo
+            if self._generation is not None:
+                self._reset(generation=None)
+            self._state_mtime = None
+            return
+        if mtime != self._state_mtime:
+            state = json.loads(state_path.read_text())
+            if int(state["dimension"]) != self.dimension:
+                raise ValueError(
+                    f"{self.collection_name} boyutu {state['dimension']}, beklenen {self.dimension}"
+                )
+            if state["generation"] != self._generation:
+                self._reset(generation=state["generation"])
+                self._open_matrix()
+            self._state_mtime = mtime
+
+        log_path = self._log_path(self._generation)
+        if not log_path.exists() or log_path.stat().st_size <= self._log_offset:
+            return
+        with open(log_path, "rb") as handle:
+            handle.seek(self._log_offset)
+            data = handle.read()
+        # Yazılması bitmemiş son satır bir sonraki senkronizasyonda okunur
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].splitlines():
+            if line.strip():
+                self._apply(json.loads(line))
+        self._log_offset += end
+
+    def _apply(self, entry: dict) -> None:
+        if entry["op"] == "del":
+            for vector_id in entry["ids"]:
+                self._remove(vector_id)
+            return
+
+        row = entry["row"]
+        record = entry["record"]
+        if row >= self._capacity:
+            self._open_matrix(min_rows=row + 1)
+        self._ensure_columns(row + 1)
+        # Aynı id ile yeniden ekleme: eski satır geçersiz
+        self._remove(record["id"])
+        while len(self._records) <= row:
+            self._records.append(None)
+        self._records[row] = record
+        self._rows_by_id[record["id"]] = row
+        for field in CODED_FIELDS:
+            self._codes[field][row] = self._code(field, record[field], create=True)
+        self._post_ids[row] = record["post_id"]
+        self._missing_child[row] = record["is_missing_child"]
+        self._alive[row] = True
+        self._count = max(self._count, row + 1)
+
+    def _remove(self, vector_id: str) -> bool:
+        row = self._rows_by_id.pop(vector_id, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        self._records[row] = None
+        self._deleted += 1
+        return True
+
+    def _append(self, entries: List[dict], vectors=None) -> None:
+        """
+        Günlüğe yaz ve yerel duruma uygula (dosya kilidi altında çağrılır).
+
+        `add` girdilerinin satır numarası burada atanır; vektör önce matrise,
+        sonra günlüğe yazılır; günlük satırı işlemin tamamlandığını gösterir.
+        """
+        log_path = self._log_path(self._generation)
+        if log_path.exists() and log_path.stat().st_size > self._log_offset:
+            # Yarım kalmış (çöken süreçten) son satırı at
+            os.truncate(log_path, self._log_offset)
+        row = self._count
+        adds = [entry for entry in entries if entry["op"] == "add"]
+        if adds:
+            if row + len(adds) > self._capacity:
+                self._open_matrix(min_rows=row + len(adds))
+            for offset, entry in enumerate(adds):
+                entry["row"] = row + offset
+            self._matrix[row:row + len(adds)] = vectors
+        data = b"".join(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n" for entry in entries)
+        with open(log_path, "ab") as handle:
+            handle.write(data)
+        for entry in entries:
+            self._apply(entry)
+        self._log_offset += len(data)
+
+    # --- MilvusService arayüzü --------------------------------------------
+
+    def connect(self) -> bool:
+        """Diskteki duruma yetiş (sunucu yok; depo ilk eklemede oluşturulur)."""
+        try:
+            with self._lock:
+                self._sync()
+            return True
+        except Exception as e:
+            print(f"Local vector store error ({self.collection_name}): {e}")
+            return False
+
+    def supports_filters(self) -> bool:
+        return True
+
+    def has_collection(self) -> bool:
+        return self._path("state.json").exists()
+
+    def create_collection(self, collection_name: Optional[str] = None) -> bool:
+        """Depo dizinini ve ilk nesil dosyalarını oluştur (varsa dokunmaz)."""
+        if collection_name and collection_name != self.collection_name:
+            return LocalVectorService(collection_name, self.dimension, self.directory.parent).create_collection()
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            with self._file_lock():
+                if not self._path("state.json").exists():
+                    # Nesil numarası zamandan: silinip yeniden oluşturulan depo
+                    # diğer süreçlerde eski nesille karışmaz
+                    generation = time.time_ns() // 1_000_000
+                    self._log_path(generation).touch()
+                    self._write_state(generation)
+            return True
+        except Exception as e:
+            print(f"Collection creation error: {e}")
+            return False
+
+    def drop_collection(self) -> bool:
+        """Depo dosyalarını sil."""
+        with self._file_lock():
+            self._reset(generation=None)
+            self._state_mtime = None
+            # Önce durum dosyası: diğer süreçler depoyu boş görür
+            self._path("state.json").unlink(missing_ok=True)
+            for path in self.directory.glob("*"):
+                if path.name != "lock":
+                    path.unlink()
+        return True
+
+    def insert_vector(self, vector_id: str, vector, user_id: str,
+                      image_path: str, description: str = "", metadata: Optional[dict] = None):
+        """Vektör ekle (aynı id varsa eskisinin yerine geçer); bkz. `MilvusService.insert_vector`."""
+        from .services import vector_metadata
+        from .vectors import as_vector
+
+        try:
+            import numpy as np
+
+            vector = np.asarray(as_vector(vector), dtype=np.float32).reshape(1, -1)
+            if vector.shape[1] != self.dimension:
+                raise ValueError(f"Vektör boyutu {vector.shape[1]}, beklenen {self.dimension}")
+            record = {
+                'id': vector_id,
+                'user_id': str(user_id),
+                'image_path': image_path,
+                'description': description,
+                **vector_metadata(metadata),
+            }
+            with self._file_lock():
+                if not self.has_collection():
+                    self.create_collection()
+                self._sync()
+                self._append([{"op": "add", "record": record}], vector)
+            return True
+        except Exception as e:
+            print(f"Vector insertion error: {e}")
+            return False
+
+    def delete_vectors(self, vector_ids: List[str]) -> bool:
+        """Vektörleri id ile sil."""
+        ids = [vector_id for vector_id in dict.fromkeys(vector_ids) if vector_id]
+        if not ids:
+            return True
+        try:
+            with self._file_lock():
+                self._sync()
+                ids = [vector_id for vector_id in ids if vector_id in self._rows_by_id]
+                if ids:
+                    self._append([{"op": "del", "ids": ids}])
+                self._maybe_compact()
+            return True
+        except Exception as e:
+            print(f"Vector delete error: {e}")
+            return False
+
+    def drain(self, seal: bool = False) -> bool:
+        """Matrisi ve günlüğü diske yaz (`seal=True`: gerekiyorsa sıkıştır)."""
+        try:
+            with self._file_lock():
+                self._sync()
+                if self._matrix is not None:
+                    self._matrix.flush()
+                if seal:
+                    self._maybe_compact()
+            return True
+        except Exception as e:
+            print(f"Local vector store flush error ({self.collection_name}): {e}")
+            return False
+
+    def _maybe_compact(self) -> None:
+        if self._deleted < COMPACT_MIN_DELETED or self._deleted < self._count * COMPACT_RATIO:
+            return
+        self.compact()
+
+    def compact(self) -> bool:
+        """Silinmiş satırları atarak depoyu yeni nesil dosyalara yaz (dosya kilidi altında)."""
+        import numpy as np
+
+        with self._file_lock():
+            self._sync()
+            if self._generation is None:
+                return True
+            live = np.flatnonzero(self._alive[:self._count])
+            old_generation = self._generation
+            generation = old_generation + 1
+            capacity = max(INITIAL_CAPACITY, len(live))
+            matrix = np.memmap(self._vectors_path(generation), dtype=np.float32, mode="w+",
+                               shape=(capacity, self.dimension))
+            for start in range(0, len(live), 65536):
+                chunk = live[start:start + 65536]
+                matrix[start:start + len(chunk)] = self._matrix[chunk]
+            matrix.flush()
+            del matrix
+            with open(self._log_path(generation), "wb") as handle:
+                for new_row, row in enumerate(live):
+                    entry = {"op": "add", "row": new_row, "record": self._records[row]}
+                    handle.write(json.dumps(entry, ensure_ascii=False).encode("utf-8") + b"\n")
+                handle.flush()
+                os.fsync(handle.fileno())
+            self._write_state(generation)
+            # Diğer süreçlerin eşlemesi dosya silinse de geçerli kalır; sonraki
+            # senkronizasyonda yeni nesli yüklerler
+            self._matrix = None
+            for path in (self._vectors_path(old_generation), self._log_path(old_generation)):
+                try:
+                    path.unlink()
+                except OSError as e:
+                    print(f"Eski vektör dosyası silinemedi ({path}): {e}")
+            self._state_mtime = None
+            self._sync()
+            return True
+
+    def _mask(self, filters: Optional[dict]):
+        """Filtreye uyan canlı satırlar (filtre yoksa ve silinen satır yoksa None)."""
+        import numpy as np
+
+        from .services import city_key
+
+        active = {key: value for key, value in (filters or {}).items() if value is not None}
+        n = self._count
+        if not active and not self._deleted:
+            return None
+        mask = self._alive[:n].copy()
+        for key, value in active.items():
+            if key == 'exclude_post_id':
+                mask &= self._post_ids[:n] != int(value)
+            elif key == 'exclude_user_id':
+                mask &= self._codes['user_id'][:n] != self._code('user_id', value)
+            elif key == 'vector_ids':
+                selected = np.zeros(n, dtype=bool)
+                rows = [self._rows_by_id[v] for v in value if v in self._rows_by_id]
+                selected[rows] = True
+                mask &= selected
+            elif key == 'post_id':
+                mask &= self._post_ids[:n] == int(value)
+            elif key == 'is_missing_child':
+                mask &= self._missing_child[:n] == bool(value)
+            elif key == 'city':
+                mask &= self._codes['city'][:n] == self._code('city', city_key(value))
+            elif key in CODED_FIELDS:
+                mask &= self._codes[key][:n] == self._code(key, value)
+            else:
+                raise ValueError(f"Bilinmeyen filtre: {key}")
+        return mask
+
+    def search_similar(self, query_vector, top_k: int = 10,
+                       filters: Optional[dict] = None) -> List[dict]:
+        """Kesin IP araması; sonuç biçimi ve filtreler `MilvusService.search_similar` ile aynı."""
+        return self._search([query_vector], top_k, filters)[0]
+
+    def search_similar_batch(self, query_vectors, top_k: int = 10, filters=None,
+                             batch_size: Optional[int] = None) -> List[List[dict]]:
+        """Çok sorgulu arama; bkz. `services.search_in_batches`."""
+        from .services import search_in_batches
+
+        return search_in_batches(self, query_vectors, top_k, filters, batch_size)
+
+    def _search(self, query_vectors, top_k: int, filters: Optional[dict] = None) -> List[List[dict]]:
+        """Aynı filtreyle birden fazla sorgu: tek matris çarpımı (sgemm)."""
+        import numpy as np
+
+        from .services import MilvusService
+        from .vectors import as_vector
+
+        empty = [[] for _ in query_vectors]
+        try:
+            if not query_vectors:
+                return empty
+            queries = np.stack([
+                np.asarray(as_vector(query_vector), dtype=np.float32).reshape(-1)
+                for query_vector in query_vectors
+            ])
+            with self._lock:
+                self._sync()
+                n = self._count
+                if not n:
+                    return empty
+                mask = self._mask(filters)
+                if mask is None:
+                    rows = None
+                    scores = self._matrix[:n] @ queries.T
+                else:
+                    rows = np.flatnonzero(mask)
+                    # Aday kümesi büyükse tüm matrisi çarpmak kopyalamaktan ucuz
+                    if len(rows) > n // 2:
+                        scores = (self._matrix[:n] @ queries.T)[rows]
+                    else:
+                        scores = self._matrix[rows] @ queries.T
+                k = min(int(top_k), scores.shape[0])
+                if k <= 0:
+                    return empty
+                results = []
+                for column in range(scores.shape[1]):
+                    column_scores = scores[:, column]
+                    top = np.argpartition(-column_scores, k - 1)[:k]
+                    top = top[np.argsort(-column_scores[top], kind="stable")]
+                    records = [self._records[row] for row in (top if rows is None else rows[top])]
+                    results.append([
+                        MilvusService._match(float(column_scores[i]), **{field: record[field] for field in OUTPUT_FIELDS})
+                        for i, record in zip(top, records)
+                    ])
+            return results
+        except Exception as e:
+            print(f"Search error: {e}")
+            return empty
+
+    def get_vectors(self, vector_ids: List[str], cities: Optional[List[str]] = None) -> dict:
+        """Kayıtlı vektörleri id ile getir: {vector_id: np.ndarray} (`cities` yerelde gereksiz)."""
+        import numpy as np
+
+        with self._lock:
+            self._sync()
+            return {
+                vector_id: np.array(self._matrix[self._rows_by_id[vector_id]])
+                for vector_id in dict.fromkeys(vector_ids)
+                if vector_id in self._rows_by_id
+            }
+
+    def similarities(self, source_vector_id: str, target_vector_ids: List[str],
+                     cities: Optional[List[str]] = None) -> dict:
+        """Kaynak ile hedefler arasındaki kesin benzerlik: {target_id: 0-1}; bkz. `MilvusService.similarities`."""
+        from .services import MilvusService
+
+        with self._lock:
+            self._sync()
+            source = self._rows_by_id.get(source_vector_id)
+            targets = [vector_id for vector_id in dict.fromkeys(target_vector_ids) if vector_id in self._rows_by_id]
+            if source is None or not targets:
+                return {}
+            scores = self._matrix[[self._rows_by_id[vector_id] for vector_id in targets]] @ self._matrix[source]
+        return {
+            vector_id: MilvusService._match(float(score))['similarity']
+            for vector_id, score in zip(targets, scores)
+        }
+
+    def count(self) -> int:
+        """Canlı vektör sayısı."""
+        with self._lock:
+            self._sync()
+            return len(self._rows_by_id)
+
+    def vector_ids(self) -> set:
+        """Depodaki tüm vektör id'leri (uzlaştırma için)."""
+        with self._lock:
+            self._sync()
+            return set(self._rows_by_id)
@@ -0,0 +1,189 @@
+"""
+CLIP embedding backend'lerini karşılaştırır: görüntü/sn, bellek (RSS) ve
+open_clip (torch) referansına göre kosinüs sapması (parity kontrolü).
+
+Her backend ayrı bir süreçte çalıştırılır; böylece ölçülen bellek sadece
+o backend'e aittir.
+
+Örnek:
+    python manage.py benchmark_clip_backends --images media/item_images --limit 200
+"""
+import multiprocessing
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from image_matching.embedding_backends import (
+    BACKEND_TORCH,
+    BACKENDS,
+    backend_options,
+)
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+
+def collect_images(inputs) -> list:
+    """Dosya ve klasör listesinden görüntü yollarını topla (küçültülmüş kopyalar hariç)."""
+    from image_matching.utils import DERIVATIVE_DIRNAME
+
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for root, dirs, files in os.walk(item):
+                dirs[:] = sorted(d for d in dirs if d != DERIVATIVE_DIRNAME)
+                for filename in sorted(files):
+                    if filename.lower().endswith(IMAGE_EXTENSIONS):
+                        paths.append(os.path.join(root, filename))
+        elif os.path.isfile(item):
+            paths.append(item)
+    return paths
+
+
+def _rss_mb() -> tuple:
+    """(anlık RSS, tepe RSS) MB cinsinden."""
+    current = peak = 0.0
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    current = int(line.split()[1]) / 1024
+                elif line.startswith("VmHWM:"):
+                    peak = int(line.split()[1]) / 1024
+        return current, peak
+    except OSError:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return peak, peak
+
+
+def _run_backend(name: str, options: dict, paths: list, batch_size: int, repeat: int) -> dict:
+    """Alt süreçte çalışır: backend'i yükle, görüntüleri vektörle, ölçümleri döndür."""
+    from image_matching.embedding_backends import create_backend
+    from image_matching.utils import open_image_for_clip
+
+    rss_start, _ = _rss_mb()
+    load_started = time.perf_counter()
+    backend = create_backend(name, **options)
+    load_seconds = time.perf_counter() - load_started
+    rss_loaded, _ = _rss_mb()
+
+    vectors = []
+    timings = []
+    for run in range(repeat):
+        started = time.perf_counter()
+        run_vectors = []
+        for start in range(0, len(paths), batch_size):
+            inputs = [
+                backend.preprocess(open_image_for_clip(path, use_derivative=False))
+                for path in paths[start:start + batch_size]
+            ]
+            run_vectors.extend(backend.encode(inputs))
+        timings.append(time.perf_counter() - started)
+        if run == 0:
+            vectors = run_vectors
+
+    _, rss_peak = _rss_mb()
+    best = min(timings)
+    return {
+        "backend": name,
+        "vectors": vectors,
+        "load_seconds": load_seconds,
+        "images_per_second": len(paths) / best if best > 0 else 0.0,
+        "ms_per_image": best * 1000 / max(len(paths), 1),
+        "model_rss_mb": rss_loaded - rss_start,
+        "peak_rss_mb": rss_peak,
+    }
+
+
+def _cosine(a, b) -> float:
+    import numpy as np
+
+    a = np.asarray(a, dtype=np.float32)
+    b = np.asarray(b, dtype=np.float32)
+    norm_a = float(np.linalg.norm(a))
+    norm_b = float(np.linalg.norm(b))
+    if not norm_a or not norm_b:
+        return 0.0
+    return float(a @ b) / (norm_a * norm_b)
+
+
+class Command(BaseCommand):
+    help = "CLIP backend'lerini hız, bellek ve torch referansına göre doğruluk açısından karşılaştırır."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", nargs="+", required=True, help="Görüntü dosyaları veya klasörleri")
+        parser.add_argument("--backends", default=",".join(BACKENDS),
+                            help=f"Virgülle ayrılmış backend listesi (varsayılan: {','.join(BACKENDS)})")
+        parser.add_argument("--limit", type=int, default=100, help="Kullanılacak maksimum görüntü sayısı")
+        parser.add_argument("--batch-size", type=int, default=16)
+        parser.add_argument("--repeat", type=int, default=3, help="Tekrar sayısı (en iyi süre raporlanır)")
+        parser.add_argument("--max-drift", type=float, default=None,
+                            help="Ortalama kosinüs sapması bu değeri aşarsa komut hata verir")
+
+    def handle(self, *args, **options):
+        paths = collect_images(options["images"])[: options["limit"]]
+        if not paths:
+            raise CommandError("Görüntü bulunamadı.")
+
+        names = [n.strip() for n in options["backends"].split(",") if n.strip()]
+        unknown = [n for n in names if n not in BACKENDS]
+        if unknown:
+            raise CommandError(f"Bilinmeyen backend: {', '.join(unknown)}")
+        # Parity kontrolü için torch referansı her zaman ölçülür
+        if BACKEND_TORCH not in names:
+            names.insert(0, BACKEND_TORCH)
+
+        self.stdout.write(self.style.NOTICE(
+            f"{len(paths)} görüntü, batch={options['batch_size']}, tekrar={options['repeat']}"
+        ))
+
+        ctx = multiprocessing.get_context("spawn")
+        reports = {}
+        for name in names:
+            backend_opts = backend_options(name)
+            if name != BACKEND_TORCH and not os.path.exists(backend_opts["model_path"]):
+                self.stdout.write(self.style.WARNING(
+                    f"[{name}] model dosyası yok: {backend_opts['model_path']} "
+                    "(önce `python manage.py export_clip_onnx` çalıştırın)"
+                ))
+                continue
+            self.stdout.write(self.style.NOTICE(f"[{name}] ölçülüyor..."))
+            with ctx.Pool(1) as pool:
+                reports[name] = pool.apply(
+                    _run_backend,
+                    (name, backend_opts, paths, options["batch_size"], options["repeat"]),
+                )
+
+        reference = reports.get(BACKEND_TORCH)
+        worst_drift = 0.0
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'backend':<10} {'img/sn':>8} {'ms/img':>8} {'yükleme sn':>10} "
+            f"{'model MB':>9} {'tepe MB':>8} {'ort. sapma':>11} {'maks. sapma':>11}"
+        )
+        for name, report in reports.items():
+            mean_drift = max_drift = 0.0
+            if reference and name != BACKEND_TORCH:
+                drifts = [
+                    1.0 - _cosine(a, b) for a, b in zip(reference["vectors"], report["vectors"])
+                ]
+                mean_drift = sum(drifts) / len(drifts)
+                max_drift = max(drifts)
+                worst_drift = max(worst_drift, mean_drift)
+            self.stdout.write(
+                f"{name:<10} {report['images_per_second']:>8.1f} {report['ms_per_image']:>8.1f} "
+                f"{report['load_seconds']:>10.2f} {report['model_rss_mb']:>9.0f} "
+                f"{report['peak_rss_mb']:>8.0f} {mean_drift:>11.5f} {max_drift:>11.5f}"
+            )
+
+        if options["max_drift"] is not None and worst_drift > options["max_drift"]:
+            raise CommandError(
+                f"Kosinüs sapması eşiği aşıldı: {worst_drift:.5f} > {options['max_drift']:.5f}"
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"\nAktif backend (settings.CLIP_BACKEND): {getattr(settings, 'CLIP_BACKEND', BACKEND_TORCH)}"
+        ))
@@ -0,0 +1,131 @@
+"""
+CLIP giriş decode yolunu ölçer: tam çözünürlük, JPEG draft modu ve
+önceden küçültülmüş model girişi kopyası.
+
+Her yol için görüntü başına süre ve decode edilen piksel tamponunun boyutu
+(ayırma zirvesinin yaklaşık ölçüsü) raporlanır.
+
+Örnek:
+    python manage.py benchmark_image_decode --images media/item_images --limit 200
+
+Mevcut ilanlar için küçültülmüş kopyaları üretmek (CLIP_INPUT_DERIVATIVES):
+    python manage.py benchmark_image_decode --images media/item_images --write-derivatives
+"""
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from image_matching.management.commands.benchmark_clip_backends import collect_images
+from image_matching.utils import (
+    CLIP_INPUT_SIZE,
+    clip_input_path,
+    make_clip_input_derivative,
+)
+
+
+def _decode(path: str, draft: bool) -> Image.Image:
+    img = Image.open(path)
+    if draft:
+        img.draft("RGB", (CLIP_INPUT_SIZE, CLIP_INPUT_SIZE))
+    return img.convert("RGB")
+
+
+def _resize_for_clip(img: Image.Image) -> Image.Image:
+    """CLIP preprocess'inin ilk adımı: kısa kenarı 224px yap."""
+    width, height = img.size
+    scale = CLIP_INPUT_SIZE / min(width, height)
+    return img.resize((round(width * scale), round(height * scale)), Image.BICUBIC)
+
+
+class Command(BaseCommand):
+    help = "CLIP giriş decode yollarını (tam / draft / küçültülmüş kopya) karşılaştırır."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--images", nargs="+", required=True, help="Görüntü dosyaları veya klasörleri")
+        parser.add_argument("--limit", type=int, default=100, help="Kullanılacak maksimum görüntü sayısı")
+        parser.add_argument("--repeat", type=int, default=3, help="Tekrar sayısı (en iyi süre raporlanır)")
+        parser.add_argument("--write-derivatives", action="store_true",
+                            help="Ölçüm yerine tüm görüntüler için küçültülmüş kopyaları yerinde üret")
+
+    def handle(self, *args, **options):
+        paths = collect_images(options["images"])
+        if not options["write_derivatives"]:
+            paths = paths[: options["limit"]]
+        if not paths:
+            raise CommandError("Görüntü bulunamadı.")
+
+        if options["write_derivatives"]:
+            self._write_derivatives(paths)
+            return
+
+        megapixels = []
+        for path in paths:
+            with Image.open(path) as img:
+                megapixels.append(img.size[0] * img.size[1] / 1e6)
+        self.stdout.write(self.style.NOTICE(
+            f"{len(paths)} görüntü, ortalama {sum(megapixels) / len(megapixels):.1f} MP, "
+            f"en büyük {max(megapixels):.1f} MP"
+        ))
+
+        tmp_dir = tempfile.mkdtemp(prefix="clip_derivatives_")
+        try:
+            started = time.perf_counter()
+            derivatives = [
+                make_clip_input_derivative(path, os.path.join(tmp_dir, f"{index}.jpg"))
+                for index, path in enumerate(paths)
+            ]
+            derivative_ms = (time.perf_counter() - started) * 1000 / len(paths)
+
+            variants = [
+                ("tam", paths, False),
+                ("draft", paths, True),
+                ("küçük kopya", derivatives, False),
+            ]
+            self.stdout.write("")
+            self.stdout.write(f"{'yol':<12} {'ms/görüntü':>11} {'hızlanma':>9} {'decode tamponu MB':>18}")
+            baseline = None
+            for name, variant_paths, draft in variants:
+                best, buffer_mb = self._measure(variant_paths, draft, options["repeat"])
+                baseline = baseline or best
+                self.stdout.write(
+                    f"{name:<12} {best * 1000 / len(variant_paths):>11.2f} "
+                    f"{baseline / best:>8.1f}x {buffer_mb:>18.2f}"
+                )
+            self.stdout.write(self.style.NOTICE(
+                f"\nKüçültülmüş kopya üretim maliyeti (yükleme anında bir kez): {derivative_ms:.1f} ms/görüntü"
+            ))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _measure(self, paths, draft: bool, repeat: int):
+        timings = []
+        buffer_bytes = []
+        for run in range(max(1, repeat)):
+            started = time.perf_counter()
+            for path in paths:
+                img = _decode(path, draft)
+                if run == 0:
+                    buffer_bytes.append(img.size[0] * img.size[1] * 3)
+                _resize_for_clip(img)
+            timings.append(time.perf_counter() - started)
+        return min(timings), sum(buffer_bytes) / len(buffer_bytes) / 1e6
+
+    def _write_derivatives(self, paths) -> None:
+        written = failed = 0
+        for path in paths:
+            try:
+                derivative = clip_input_path(path)
+                if os.path.exists(derivative) and os.path.getmtime(derivative) >= os.path.getmtime(path):
+                    continue
+                make_clip_input_derivative(path)
+                written += 1
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.WARNING(f"{path}: {e}"))
+        self.stdout.write(self.style.SUCCESS(
+            f"Küçültülmüş kopyalar: {written} üretildi, {failed} başarısız"
+        ))
@@ -0,0 +1,84 @@
+"""
+Gömülü (VECTOR_BACKEND=local) vektör deposunun arama gecikmesini ölçer.
+
+Geçici bir dizinde `--rows` adet rastgele (normalize) vektörlü bir depo
+oluşturulur ve filtresiz / şehir filtreli aramaların p50 / p99 gecikmesi
+yazdırılır. Arama kesin olduğu için recall her zaman 1'dir.
+
+Örnek:
+    python manage.py benchmark_local_vectors --rows 300000 --cities 81
+"""
+import shutil
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from image_matching.local_vectors import LocalVectorService
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Gömülü memmap vektör deposunda kesin IP aramasının gecikmesini ölçer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=300_000, help="Depodaki vektör sayısı")
+        parser.add_argument("--dim", type=int, default=512, help="Vektör boyutu")
+        parser.add_argument("--cities", type=int, default=81, help="Vektörlerin dağıtılacağı şehir sayısı")
+        parser.add_argument("--queries", type=int, default=200, help="Ölçülecek sorgu sayısı")
+        parser.add_argument("--top-k", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        import numpy as np
+
+        rng = np.random.default_rng(options["seed"])
+        rows, dim = max(1, options["rows"]), options["dim"]
+        cities = [f"Sehir {index}" for index in range(max(1, options["cities"]))]
+        directory = tempfile.mkdtemp(prefix="benchmark_local_vectors_")
+        try:
+            store = LocalVectorService("benchmark", dimension=dim, directory=directory)
+            store.create_collection()
+            started = time.perf_counter()
+            # Depo dosyalarını doğrudan toplu yaz (tek tek insert_vector çok yavaş olurdu)
+            with store._file_lock():
+                store._sync()
+                for start in range(0, rows, 10_000):
+                    count = min(10_000, rows - start)
+                    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+                    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                    store._append([
+                        {"op": "add", "record": {
+                            "id": f"v{start + i}", "user_id": str(i % 1000), "image_path": "",
+                            "description": "", "post_id": start + i, "post_type": "found",
+                            "city": cities[(start + i) % len(cities)], "category": "", "status": "active",
+                            "is_missing_child": False,
+                        }}
+                        for i in range(count)
+                    ], vectors)
+            store.drain()
+            self.stdout.write(f"{rows} vektör yazıldı ({time.perf_counter() - started:.1f}s), dim={dim}")
+
+            queries = rng.standard_normal((max(1, options["queries"]), dim)).astype(np.float32)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+            top_k = options["top_k"]
+            for label, filters in (
+                ("filtresiz", None),
+                ("şehir", {"city": cities[0], "post_type": "found", "status": "active"}),
+            ):
+                store.search_similar(queries[0], top_k, filters=filters)
+                timings = []
+                for query in queries:
+                    started = time.perf_counter()
+                    store.search_similar(query, top_k, filters=filters)
+                    timings.append((time.perf_counter() - started) * 1000)
+                self.stdout.write(
+                    f"{label:<10} p50={_percentile(timings, 0.5):.2f}ms p99={_percentile(timings, 0.99):.2f}ms"
+                )
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
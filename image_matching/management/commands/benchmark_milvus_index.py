@@ -0,0 +1,172 @@
+"""
+Milvus indeks tiplerini recall@k ve gecikme açısından karşılaştırır.
+
+Vektörler mevcut bir koleksiyondan (`--collection`, en fazla `--max-rows`
+satır) veya rastgele (normalize) olarak üretilir. Sorgular veri kümesinden
+ayrılan vektörlerdir; doğru top-k sonuçları numpy ile kaba kuvvet (tam
+tarama) hesaplanır. Geçici bir koleksiyonda her indeks tipi
+(`index_tuning.recommend_index` parametreleriyle) sırayla oluşturulur ve her
+hedef recall için `search_params_for_index` ile arama yapılır:
+
+    tip       recall hedefi  arama     recall@k   p50      p99
+
+Örnek:
+    python manage.py benchmark_milvus_index --rows 200000 --queries 200
+    python manage.py benchmark_milvus_index --collection image_vectors_clip_default --max-rows 100000
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, utility
+
+from image_matching import index_tuning
+from image_matching.milvus_connection import get_milvus_manager
+
+
+BENCHMARK_COLLECTION = "benchmark_milvus_index"
+
+
+def _normalize(vectors):
+    import numpy as np
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "İndeks tiplerinin recall@k ve p50/p99 gecikmesini tam taramaya göre ölçer."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--collection", default=None,
+                            help="Vektörlerin okunacağı koleksiyon (verilmezse rastgele vektör üretilir)")
+        parser.add_argument("--max-rows", type=int, default=100_000, help="Koleksiyondan okunacak en fazla satır")
+        parser.add_argument("--rows", type=int, default=100_000, help="Rastgele vektör sayısı")
+        parser.add_argument("--dim", type=int, default=512, help="Rastgele vektör boyutu")
+        parser.add_argument("--queries", type=int, default=200, help="Sorgu sayısı")
+        parser.add_argument("--top-k", type=int, default=10)
+        parser.add_argument("--index-types", default=",".join(index_tuning.INDEX_TYPES),
+                            help="Virgülle ayrılmış indeks tipleri")
+        parser.add_argument("--recalls", default="0.9,0.95,0.99",
+                            help="Arama parametrelerinin türetileceği hedef recall değerleri")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        import numpy as np
+
+        manager = get_milvus_manager()
+        if not manager.ensure_connected():
+            raise CommandError("Milvus'a bağlanılamadı")
+        try:
+            recalls = [float(value) for value in options["recalls"].split(",") if value.strip()]
+        except ValueError:
+            raise CommandError("--recalls virgülle ayrılmış sayılar olmalı")
+        index_types = [value.strip().upper() for value in options["index_types"].split(",") if value.strip()]
+        unknown = [value for value in index_types if value not in index_tuning.INDEX_TYPES]
+        if unknown:
+            raise CommandError(f"Desteklenmeyen indeks tipi: {', '.join(unknown)}")
+
+        rng = np.random.default_rng(options["seed"])
+        vectors = self._load_vectors(manager, options, rng)
+        query_count = min(max(1, options["queries"]), len(vectors) // 10 or 1)
+        order = rng.permutation(len(vectors))
+        queries, data = vectors[order[:query_count]], vectors[order[query_count:]]
+        top_k = options["top_k"]
+        if len(data) < top_k:
+            raise CommandError("Kıyaslama için yeterli vektör yok")
+
+        self.stdout.write(f"{len(data)} vektör, {query_count} sorgu, dim={data.shape[1]}, top_k={top_k}")
+        self.stdout.write("Tam tarama (kaba kuvvet) hesaplanıyor...")
+        started = time.perf_counter()
+        truth = np.argsort(-(queries @ data.T), axis=1, kind="stable")[:, :top_k]
+        exact_ms = (time.perf_counter() - started) * 1000 / query_count
+        self.stdout.write(f"  numpy tam tarama: {exact_ms:.2f}ms / sorgu")
+
+        collection = self._build_collection(manager, data)
+        try:
+            self.stdout.write(
+                f"{'tip':<9} {'hedef':>6} {'arama':<16} {f'recall@{top_k}':>10} {'p50':>9} {'p99':>9}"
+            )
+            for index_type in index_types:
+                config = index_tuning.recommend_index(len(data), data.shape[1], metric="IP", index_type=index_type)
+                collection.release()
+                collection.drop_index()
+                started = time.perf_counter()
+                collection.create_index("vector", config)
+                utility.wait_for_index_building_complete(BENCHMARK_COLLECTION, using=manager.alias)
+                collection.load()
+                self.stdout.write(self.style.NOTICE(
+                    f"{index_type} {config['params']} ({time.perf_counter() - started:.1f}s'de oluşturuldu)"
+                ))
+                for target in recalls:
+                    params = index_tuning.search_params_for_index(config, top_k=top_k, target_recall=target)
+                    recall, timings = self._measure(collection, queries, truth, params, top_k)
+                    self.stdout.write(
+                        f"{index_type:<9} {target:>6.2f} {str(params['params']):<16} {recall:>10.4f} "
+                        f"{_percentile(timings, 0.5):>7.2f}ms {_percentile(timings, 0.99):>7.2f}ms"
+                    )
+        finally:
+            utility.drop_collection(BENCHMARK_COLLECTION, using=manager.alias)
+            manager.invalidate(BENCHMARK_COLLECTION)
+
+    def _load_vectors(self, manager, options, rng):
+        import numpy as np
+
+        name = options["collection"]
+        if not name:
+            vectors = rng.standard_normal((max(1, options["rows"]), options["dim"])).astype(np.float32)
+            return _normalize(vectors)
+
+        if not manager.has_collection(name):
+            raise CommandError(f"Koleksiyon bulunamadı: {name}")
+        source = manager.collection(name)
+        limit = max(1, options["max_rows"])
+        rows = []
+        iterator = source.query_iterator(batch_size=min(limit, 5000), limit=limit, output_fields=["vector"])
+        try:
+            while True:
+                batch = iterator.next()
+                if not batch:
+                    break
+                rows.extend(row["vector"] for row in batch)
+        finally:
+            iterator.close()
+        if not rows:
+            raise CommandError(f"{name} boş")
+        return _normalize(np.asarray(rows, dtype=np.float32))
+
+    def _build_collection(self, manager, data) -> Collection:
+        if utility.has_collection(BENCHMARK_COLLECTION, using=manager.alias):
+            utility.drop_collection(BENCHMARK_COLLECTION, using=manager.alias)
+        manager.invalidate(BENCHMARK_COLLECTION)
+
+        schema = CollectionSchema([
+            FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=False),
+            FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=int(data.shape[1])),
+        ], "Index benchmark")
+        collection = Collection(BENCHMARK_COLLECTION, schema, using=manager.alias)
+        for start in range(0, len(data), 5000):
+            chunk = data[start:start + 5000]
+            collection.insert([list(range(start, start + len(chunk))), chunk.tolist()])
+        collection.flush()
+        # Döngüdeki ilk drop_index için yer tutucu indeks
+        collection.create_index("vector", {"metric_type": "IP", "index_type": "FLAT", "params": {}})
+        return collection
+
+    def _measure(self, collection, queries, truth, params, top_k: int):
+        # Isınma: ilk sorgu ölçüme dahil edilmez
+        collection.search(data=[queries[0].tolist()], anns_field="vector", param=params, limit=top_k)
+        hits_found = 0
+        timings = []
+        for query, expected in zip(queries, truth):
+            started = time.perf_counter()
+            results = collection.search(data=[query.tolist()], anns_field="vector", param=params, limit=top_k)
+            timings.append((time.perf_counter() - started) * 1000)
+            found = {hit.id for hit in results[0]}
+            hits_found += len(found.intersection(int(i) for i in expected))
+        return hits_found / (len(queries) * top_k), timings
@@ -0,0 +1,139 @@
+"""
+Şehir bölümlü (partition) arama ile tüm koleksiyonda filtreli aramayı karşılaştırır.
+
+Her şehir sayısı için geçici bir koleksiyon oluşturulur; her şehre aynı
+sayıda rastgele (normalize) vektör yazılır ve tek bir şehirle sınırlı
+aramaların gecikmesi iki şekilde ölçülür:
+
+    - filtre : tüm koleksiyon yüklü, `city == "..."` ifadesiyle arama
+    - bölüm  : sadece o şehrin bölümü yüklü, `partition_names` ile arama
+
+Şehir sayısı arttıkça "bölüm" gecikmesinin sabit kalması, "filtre"
+gecikmesinin ise koleksiyon büyüdükçe artması beklenir.
+
+Örnek:
+    python manage.py benchmark_partitioned_search --cities 1,5,20,80 --per-city 2000
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from pymilvus import Collection, CollectionSchema, DataType, FieldSchema, utility
+
+from image_matching.milvus_connection import get_milvus_manager
+from image_matching.services import partition_for_city
+
+
+BENCHMARK_COLLECTION = "benchmark_partitioned_search"
+
+
+def _random_vectors(rng, count: int, dim: int):
+    import numpy as np
+
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class Command(BaseCommand):
+    help = "Şehir bölümlü arama ile filtreli tam koleksiyon aramasının gecikmesini karşılaştırır."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--cities", default="1,5,20,80",
+                            help="Virgülle ayrılmış şehir sayıları (varsayılan: 1,5,20,80)")
+        parser.add_argument("--per-city", type=int, default=2000, help="Şehir başına vektör sayısı")
+        parser.add_argument("--dim", type=int, default=512, help="Vektör boyutu")
+        parser.add_argument("--queries", type=int, default=100, help="Ölçülecek sorgu sayısı")
+        parser.add_argument("--top-k", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        import numpy as np
+
+        try:
+            city_counts = [int(value) for value in options["cities"].split(",") if value.strip()]
+        except ValueError:
+            raise CommandError("--cities virgülle ayrılmış tam sayılar olmalı")
+        manager = get_milvus_manager()
+        if not manager.ensure_connected():
+            raise CommandError("Milvus'a bağlanılamadı")
+
+        rng = np.random.default_rng(options["seed"])
+        dim = options["dim"]
+        per_city = max(1, options["per_city"])
+        top_k = options["top_k"]
+        queries = _random_vectors(rng, max(1, options["queries"]), dim)
+
+        self.stdout.write(
+            f"{'şehir':>6} {'vektör':>9} {'filtre p50':>11} {'filtre p95':>11} {'bölüm p50':>10} {'bölüm p95':>10}"
+        )
+        for city_count in city_counts:
+            cities = [f"Sehir {index}" for index in range(city_count)]
+            collection = self._build_collection(manager, rng, cities, per_city, dim)
+            try:
+                target_city = cities[0]
+                target_partition = partition_for_city(target_city)
+                search_params = {"metric_type": "IP", "params": {"nprobe": 16}}
+
+                collection.load()
+                filtered = self._measure(lambda query: collection.search(
+                    data=[query.tolist()], anns_field="vector", param=search_params, limit=top_k,
+                    expr=f'city == "{target_city}"',
+                ), queries)
+                collection.release()
+
+                collection.load(partition_names=[target_partition])
+                partitioned = self._measure(lambda query: collection.search(
+                    data=[query.tolist()], anns_field="vector", param=search_params, limit=top_k,
+                    partition_names=[target_partition],
+                ), queries)
+            finally:
+                utility.drop_collection(BENCHMARK_COLLECTION, using=manager.alias)
+                manager.invalidate(BENCHMARK_COLLECTION)
+
+            self.stdout.write(
+                f"{city_count:>6} {city_count * per_city:>9} "
+                f"{_percentile(filtered, 0.5):>9.2f}ms {_percentile(filtered, 0.95):>9.2f}ms "
+                f"{_percentile(partitioned, 0.5):>8.2f}ms {_percentile(partitioned, 0.95):>8.2f}ms"
+            )
+
+    def _build_collection(self, manager, rng, cities, per_city: int, dim: int) -> Collection:
+        if utility.has_collection(BENCHMARK_COLLECTION, using=manager.alias):
+            utility.drop_collection(BENCHMARK_COLLECTION, using=manager.alias)
+        manager.invalidate(BENCHMARK_COLLECTION)
+
+        schema = CollectionSchema([
+            FieldSchema(name="id", dtype=DataType.INT64, is_primary=True, auto_id=True),
+            FieldSchema(name="city", dtype=DataType.VARCHAR, max_length=100),
+            FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=dim),
+        ], "Partition benchmark")
+        collection = Collection(BENCHMARK_COLLECTION, schema, using=manager.alias)
+        for city in cities:
+            partition = partition_for_city(city)
+            collection.create_partition(partition)
+            vectors = _random_vectors(rng, per_city, dim)
+            for start in range(0, per_city, 5000):
+                chunk = vectors[start:start + 5000]
+                collection.insert([[city] * len(chunk), chunk.tolist()], partition_name=partition)
+        collection.flush()
+        collection.create_index("vector", {
+            "metric_type": "IP",
+            "index_type": "IVF_FLAT",
+            "params": {"nlist": 128},
+        })
+        return collection
+
+    def _measure(self, search, queries) -> list:
+        # Isınma: ilk sorgu ölçüme dahil edilmez
+        search(queries[0])
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        return timings
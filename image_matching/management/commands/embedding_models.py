@@ -0,0 +1,55 @@
+"""
+Kayıtlı embedding modellerini ve her modelle üretilmiş vektör sayılarını listeler.
+
+Örnek:
+    python manage.py embedding_models
+    python manage.py embedding_models --warm clip-default,clip-l14
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from image_matching.model_registry import get_model_registry
+from image_matching.models import ImageVector
+
+
+class Command(BaseCommand):
+    help = "Kayıtlı embedding modellerini ve ürettikleri vektör sayılarını listeler."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--warm", default=None,
+                            help="Virgülle ayrılmış model anahtarlarını yükleyip süresini ölç")
+
+    def handle(self, *args, **options):
+        registry = get_model_registry()
+
+        if options["warm"]:
+            keys = [key.strip() for key in options["warm"].split(",") if key.strip()]
+            for key, result in registry.warm(keys).items():
+                if result["success"]:
+                    self.stdout.write(self.style.SUCCESS(f"{key}: {result['seconds']:.1f} sn'de yüklendi"))
+                else:
+                    self.stdout.write(self.style.ERROR(f"{key}: {result['error']}"))
+            self.stdout.write("")
+
+        counts = {
+            (row["model_name"], row["model_version"]): row["total"]
+            for row in ImageVector.objects.values("model_name", "model_version").annotate(total=Count("id"))
+        }
+
+        self.stdout.write(
+            f"{'model':<20} {'mimari':<24} {'backend':<10} {'boyut':>5} {'koleksiyon':<28} {'vektör':>8}"
+        )
+        for key in registry.keys():
+            model = registry.get(key)
+            marker = "*" if key == registry.default else " "
+            self.stdout.write(
+                f"{marker}{key:<19} {model.model_name + '/' + model.pretrained:<24} "
+                f"{model.backend or '-':<10} {model.dim:>5} {model.collection:<28} "
+                f"{counts.pop((key, model.version), 0):>8}"
+            )
+
+        # Artık kayıtlı olmayan model / sürümlerle üretilmiş vektörler
+        for (model_name, model_version), total in sorted(counts.items()):
+            self.stdout.write(self.style.WARNING(
+                f"Eski / kayıtsız model: {model_name or '?'}@{model_version or '?'} -> {total} vektör"
+            ))
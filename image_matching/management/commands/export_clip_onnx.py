@@ -0,0 +1,78 @@
+"""
+CLIP görsel kulesini ONNX formatına aktarır ve dinamik int8 kuantize sürümünü üretir.
+
+Üretilen dosyalar `CLIP_BACKEND=onnx` ve `CLIP_BACKEND=onnx-int8` ayarları ile kullanılır.
+"""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = "CLIP görsel kulesini ONNX'e aktarır ve int8 kuantize sürümünü üretir."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--model-name", default="ViT-B-32", help="open_clip model adı")
+        parser.add_argument("--pretrained", default="openai", help="open_clip ön-eğitim seti")
+        parser.add_argument("--output", default=None, help="fp32 ONNX çıktı yolu (varsayılan: CLIP_ONNX_MODEL_PATH)")
+        parser.add_argument("--int8-output", default=None, help="int8 ONNX çıktı yolu (varsayılan: CLIP_ONNX_INT8_MODEL_PATH)")
+        parser.add_argument("--opset", type=int, default=17, help="ONNX opset sürümü")
+        parser.add_argument("--skip-quantize", action="store_true", help="int8 kuantizasyonu atla")
+
+    def handle(self, *args, **options):
+        output = options["output"] or str(settings.CLIP_ONNX_MODEL_PATH)
+        int8_output = options["int8_output"] or str(settings.CLIP_ONNX_INT8_MODEL_PATH)
+
+        try:
+            import torch
+            from image_matching.utils import _load_clip_model
+        except ImportError as exc:
+            raise CommandError(f"Dışa aktarma için PyTorch ve open_clip gerekli: {exc}")
+
+        self.stdout.write(self.style.NOTICE(
+            f"1) Model yükleniyor: {options['model_name']} ({options['pretrained']})"
+        ))
+        model, _, _ = _load_clip_model(
+            model_name=options["model_name"], pretrained=options["pretrained"], device="cpu"
+        )
+        visual = model.visual.eval()
+        image_size = visual.image_size
+        if isinstance(image_size, (tuple, list)):
+            image_size = image_size[0]
+
+        self.stdout.write(self.style.NOTICE(f"2) ONNX'e aktarılıyor: {output}"))
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        dummy = torch.randn(1, 3, image_size, image_size)
+        with torch.no_grad():
+            torch.onnx.export(
+                visual,
+                dummy,
+                output,
+                input_names=["pixel_values"],
+                output_names=["image_embeds"],
+                dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+                opset_version=options["opset"],
+                do_constant_folding=True,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"fp32 model yazıldı ({os.path.getsize(output) / 1e6:.1f} MB)"
+        ))
+
+        if options["skip_quantize"]:
+            return
+
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError as exc:
+            raise CommandError(f"Kuantizasyon için onnxruntime gerekli: {exc}")
+
+        self.stdout.write(self.style.NOTICE(f"3) Dinamik int8 kuantizasyon: {int8_output}"))
+        os.makedirs(os.path.dirname(os.path.abspath(int8_output)), exist_ok=True)
+        quantize_dynamic(output, int8_output, weight_type=QuantType.QInt8)
+        self.stdout.write(self.style.SUCCESS(
+            f"int8 model yazıldı ({os.path.getsize(int8_output) / 1e6:.1f} MB)"
+        ))
+        self.stdout.write(self.style.NOTICE(
+            "Doğruluk kaybını görmek için: python manage.py benchmark_clip_backends --images <klasör>"
+        ))
@@ -1,6 +1,7 @@
 from django.core.management.base import BaseCommand
 from django.conf import settings
 from pymilvus import connections, utility
+from image_matching.model_registry import get_model_registry
 from image_matching.services import MilvusService
 
 
@@ -9,9 +10,11 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--recreate', action='store_true', help='Drop and recreate collection')
+        parser.add_argument('--model', default=None, help='Embedding model key (settings.EMBEDDING_MODELS)')
 
     def handle(self, *args, **options):
-        service = MilvusService()
+        model = get_model_registry().get(options['model'])
+        service = MilvusService(collection_name=model.collection, dimension=model.dim)
 
         self.stdout.write(self.style.NOTICE(
             f"Connecting to Milvus at {settings.MILVUS_HOST}:{settings.MILVUS_PORT}"
@@ -27,6 +30,7 @@ class Command(BaseCommand):
             if options['recreate'] and utility.has_collection(collection_name):
                 self.stdout.write(self.style.WARNING(f'Dropping existing collection: {collection_name}'))
                 utility.drop_collection(collection_name)
+                service.manager.invalidate(collection_name)
 
             if not utility.has_collection(collection_name):
                 self.stdout.write(self.style.NOTICE(f'Creating collection: {collection_name}'))
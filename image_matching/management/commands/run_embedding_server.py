@@ -0,0 +1,56 @@
+"""
+Yerel CLIP embedding sunucusunu başlatır.
+
+Web süreçleri `EMBEDDING_SERVER_ENABLED=True` olduğunda modeli kendileri
+yüklemez, vektörleme isteklerini bu sunucuya gönderir.
+"""
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from image_matching.embedding_backends import backend_options, configured_backend_name
+from image_matching.model_registry import get_model_registry
+from image_matching.embedding_server import EmbeddingServer, embedding_server_authkey
+
+
+class Command(BaseCommand):
+    help = "CLIP modelini tutan işçi süreçleriyle yerel embedding sunucusunu başlatır."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--address", default=None, help="Örn: unix:/tmp/embedding.sock veya 127.0.0.1:8765")
+        parser.add_argument("--workers", type=int, default=None, help="Modeli tutan işçi süreç sayısı")
+        parser.add_argument("--max-batch", type=int, default=None, help="Tek batch'teki maksimum görüntü sayısı")
+        parser.add_argument("--max-wait-ms", type=int, default=None, help="Batch biriktirme penceresi (ms)")
+        parser.add_argument("--backend", default=None, help="torch | onnx | onnx-int8")
+
+    def handle(self, *args, **options):
+        # Web süreçleri sunucuya sadece varsayılan modelin isteklerini gönderir
+        model = get_model_registry().get()
+        backend_name = options["backend"] or model.backend or configured_backend_name()
+        server = EmbeddingServer(
+            address=options["address"] or settings.EMBEDDING_SERVER_ADDRESS,
+            backend_name=backend_name,
+            backend_options=backend_options(backend_name, model.model_name, model.pretrained, model.device),
+            workers=options["workers"] or settings.EMBEDDING_SERVER_WORKERS,
+            max_batch=options["max_batch"] or settings.EMBEDDING_SERVER_MAX_BATCH,
+            max_wait_ms=(
+                options["max_wait_ms"] if options["max_wait_ms"] is not None
+                else settings.EMBEDDING_SERVER_MAX_WAIT_MS
+            ),
+            authkey=embedding_server_authkey(),
+            task_timeout=getattr(settings, "EMBEDDING_SERVER_TASK_TIMEOUT", 25.0),
+            # ONNX dışa aktarımı sadece görsel kuleyi içerir; metin kulesi open_clip ile çalışır
+            text_options={"model_name": model.model_name, "pretrained": model.pretrained, "device": model.device},
+            log=lambda message: self.stdout.write(self.style.NOTICE(message)),
+        )
+
+        def _shutdown(signum, frame):
+            self.stdout.write(self.style.WARNING("Embedding sunucusu durduruluyor..."))
+            server.stop()
+
+        signal.signal(signal.SIGINT, _shutdown)
+        signal.signal(signal.SIGTERM, _shutdown)
+
+        server.serve_forever()
+        self.stdout.write(self.style.SUCCESS(f"Durduruldu. İstatistikler: {server.stats}"))
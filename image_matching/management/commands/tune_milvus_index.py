@@ -0,0 +1,85 @@
+"""
+Milvus koleksiyonunun vektör indeksini satır sayısı ve hedef recall'a göre ayarlar.
+
+Komut mevcut indeksi, satır sayısını ve önerilen yapılandırmayı (bkz.
+`image_matching.index_tuning.recommend_index`) yazdırır. `--apply` verilirse
+ve öneri mevcut indeksten farklıysa koleksiyon çevrimiçi olarak yeniden
+oluşturulur: veri yeni indeksli gölge koleksiyona kopyalanır, kopyalama
+sırasında eklenen satırlar yakalanır ve koleksiyonlar değiştirilir.
+
+Örnek:
+    python manage.py tune_milvus_index
+    python manage.py tune_milvus_index --collection object_vectors --metric L2 --apply
+    python manage.py tune_milvus_index --index-type HNSW --target-recall 0.98 --apply
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from image_matching import index_tuning
+from image_matching.milvus_connection import get_milvus_manager
+from image_matching.model_registry import get_model_registry
+
+
+class Command(BaseCommand):
+    help = "Vektör indeksini koleksiyon boyutu ve hedef recall'a göre öner / yeniden oluştur."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default=None,
+                            help='Embedding modeli (settings.EMBEDDING_MODELS anahtarı; varsayılan: DEFAULT_EMBEDDING_MODEL)')
+        parser.add_argument('--collection', default=None,
+                            help='Model koleksiyonu yerine doğrudan koleksiyon adı (örn. object_vectors)')
+        parser.add_argument('--metric', default='IP', help='Koleksiyonda indeks yoksa kullanılacak metrik')
+        parser.add_argument('--target-recall', type=float, default=None,
+                            help='Hedef recall (varsayılan: MILVUS_INDEX_TARGET_RECALL)')
+        parser.add_argument('--index-type', default=None, choices=index_tuning.INDEX_TYPES,
+                            help='İndeks tipini zorla (varsayılan: MILVUS_INDEX_TYPE / otomatik)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Yeniden oluşturmada tek seferde kopyalanacak satır sayısı')
+        parser.add_argument('--apply', action='store_true',
+                            help='Öneri mevcut indeksten farklıysa koleksiyonu yeniden oluştur')
+        parser.add_argument('--force', action='store_true',
+                            help='İndeks öneriyle aynı olsa bile yeniden oluştur (--apply ile)')
+
+    def handle(self, *args, **options):
+        name = options['collection'] or get_model_registry().get(options['model']).collection
+        manager = get_milvus_manager()
+        if not manager.ensure_connected():
+            raise CommandError("Milvus'a bağlanılamadı")
+        if not manager.has_collection(name):
+            raise CommandError(f"Koleksiyon bulunamadı: {name}")
+
+        report = index_tuning.tuning_report(name, metric=options['metric'], target_recall=options['target_recall'])
+        recommended = report['recommended']
+        if options['index_type'] and options['index_type'] != recommended['index_type']:
+            recommended = index_tuning.recommend_index(
+                report['rows'], report['dim'], metric=recommended['metric_type'],
+                target_recall=options['target_recall'], index_type=options['index_type'],
+            )
+            report['needs_rebuild'] = True
+
+        current = report['current']
+        self.stdout.write(f"Koleksiyon : {name} ({report['rows']} satır, dim={report['dim']})")
+        self.stdout.write(
+            f"Mevcut     : {current['index_type']} {current['params']}" if current else "Mevcut     : (indeks yok)"
+        )
+        self.stdout.write(f"Önerilen   : {recommended['index_type']} {recommended['params']}")
+        search = index_tuning.search_params_for_index(recommended, target_recall=options['target_recall'])
+        self.stdout.write(f"Arama      : {search['params']}")
+
+        if not report['needs_rebuild'] and not options['force']:
+            self.stdout.write(self.style.SUCCESS("İndeks zaten önerilen yapılandırmada."))
+            return
+        if not options['apply']:
+            self.stdout.write(self.style.NOTICE("Uygulamak için --apply ile çalıştırın."))
+            return
+
+        # Tampondaki eklemeler kopyaya dahil olsun
+        from image_matching.milvus_buffer import drain_all
+
+        drain_all(seal=True)
+        copied = index_tuning.rebuild_index(
+            name, recommended, batch_size=max(1, options['batch_size']),
+            log=lambda message: self.stdout.write(self.style.NOTICE(message)),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{name} {recommended['index_type']} indeksiyle yeniden oluşturuldu ({copied} satır)."
+        ))
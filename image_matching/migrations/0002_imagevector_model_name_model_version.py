@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_model(apps, schema_editor):
+    """Mevcut vektörler varsayılan modelle üretildi."""
+    ImageVector = apps.get_model('image_matching', 'ImageVector')
+    ImageVector.objects.filter(model_name='').update(
+        model_name=getattr(settings, 'DEFAULT_EMBEDDING_MODEL', 'clip-default'),
+        model_version=getattr(settings, 'EMBEDDING_MODEL_VERSION', '1'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_matching', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagevector',
+            name='model_name',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='imagevector',
+            name='model_version',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.RunPython(backfill_model, migrations.RunPython.noop),
+    ]
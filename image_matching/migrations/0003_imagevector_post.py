@@ -0,0 +1,53 @@
+import os
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_posts(apps, schema_editor):
+    """
+    Mevcut vektörleri görsel dosya adıyla ilanlarına bağla.
+
+    Mantık bu migration'a sabitlenmiştir (sadece geçmiş modeller kullanılır);
+    sonradan eklenen vektörler için `vector_lifecycle.link_unlinked_vectors`.
+    """
+    ImageVector = apps.get_model('image_matching', 'ImageVector')
+    ItemPost = apps.get_model('accounts', 'ItemPost')
+
+    posts_by_filename = {}
+    for post_id, image in ItemPost.objects.exclude(image__isnull=True).exclude(image='').values_list('id', 'image'):
+        posts_by_filename.setdefault(os.path.basename(str(image)), post_id)
+
+    pending = {}
+    for pk, image_path in ImageVector.objects.filter(post__isnull=True).values_list('pk', 'image_path').iterator():
+        post_id = posts_by_filename.get(os.path.basename((image_path or '').replace('\\', '/')))
+        if post_id is not None:
+            pending.setdefault(post_id, []).append(pk)
+
+    for post_id, pks in pending.items():
+        for start in range(0, len(pks), 1000):
+            ImageVector.objects.filter(pk__in=pks[start:start + 1000]).update(post_id=post_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_itempost_child_age_itempost_child_eye_color_and_more'),
+        ('image_matching', '0002_imagevector_model_name_model_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagevector',
+            name='post',
+            field=models.ForeignKey(
+                blank=True, null=True, on_delete=django.db.models.deletion.CASCADE,
+                related_name='image_vectors', to='accounts.itempost',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='imagevector',
+            index=models.Index(fields=['post', 'model_name'], name='image_vecto_post_model_idx'),
+        ),
+        migrations.RunPython(link_posts, migrations.RunPython.noop),
+    ]
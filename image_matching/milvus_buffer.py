@@ -0,0 +1,279 @@
+"""
+Milvus için tamponlu toplu ekleme (insert buffer).
+
+Eskiden her tek satırlık insert'ten sonra `collection.flush()` çağrılıyordu;
+bu her yüklemede bir segmentin mühürlenmesine yol açıyor ve toplu yeniden
+indekslemede yazma hızını düşürüyordu. Bu modülde satırlar koleksiyon başına
+bir tamponda birikir ve tek bir insert RPC'si ile yazılır:
+
+    - tampon `MILVUS_INSERT_BUFFER_ROWS` satıra ulaşınca hemen,
+    - aksi halde ilk satırdan en geç `MILVUS_INSERT_BUFFER_SECONDS` sonra
+      (arka plandaki zamanlayıcı ile).
+
+`flush()` mühürleme yapılmaz; Milvus eklenen veriyi büyüyen segmentlerden de
+arar. Aramalar `consistency_level="Session"` ile yapılır, böylece bu süreçten
+yazılmış satırlar hemen görünür. Henüz yazılmamış (tampondaki) satırlar için
+`search_pending` yerel olarak skor hesaplar; arama fonksiyonları bu sonuçları
+Milvus sonuçlarıyla birleştirir (read-your-writes).
+
+Yönetim komutları işin sonunda `drain_all()` çağırmalıdır; süreç kapanırken
+de `atexit` ile boşaltılır.
+
+Kullanım örneği:
+
+    from image_matching.milvus_buffer import drain_all, get_insert_buffer
+
+    buffer = get_insert_buffer("object_vectors", metric="L2")
+    buffer.add({"ilan_id": 42, "vector": [...]})
+    ...
+    drain_all(seal=True)
+"""
+
+import atexit
+import os
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from .milvus_connection import get_milvus_manager
+
+# Oturum içi tutarlılık: bu istemcinin yazdıkları sonraki aramalarda görünür
+SEARCH_CONSISTENCY_LEVEL = "Session"
+
+RowPredicate = Callable[[dict], bool]
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+class MilvusInsertBuffer:
+    """Tek bir koleksiyona yazılacak satırları biriktirip toplu insert yapan tampon."""
+
+    def __init__(self, collection_name: str, vector_field: str = "vector",
+                 metric: str = "IP", max_rows: int = 256, max_delay: float = 1.0,
+                 ensure_collection: Optional[Callable[[], object]] = None,
+                 partition_for: Optional[Callable[[dict], Optional[str]]] = None):
+        """
+        ensure_collection: yazmadan önce çağrılır ve koleksiyon tanıtıcısını
+            döndürür (varsayılan: bağlantı yöneticisinin önbellekteki tanıtıcısı).
+        partition_for: satırın yazılacağı bölümü döndürür (None = varsayılan
+            bölüm); bölüm yoksa ilk yazmada oluşturulur.
+
+        Yazılacak alanlar koleksiyonun şemasından (auto_id hariç, şema
+        sırasıyla) okunur; satırlardaki şemada olmayan anahtarlar yok sayılır.
+        Böylece şema genişletilmeden önce ve sonra aynı satırlar yazılabilir.
+        """
+        self.collection_name = collection_name
+        self.vector_field = vector_field
+        self.metric = metric.upper()
+        self.max_rows = max(1, int(max_rows))
+        self.max_delay = float(max_delay)
+        self.ensure_collection = ensure_collection
+        self.partition_for = partition_for
+
+        self._lock = threading.RLock()
+        self._rows: List[dict] = []
+        self._timer: Optional[threading.Timer] = None
+        self._pid = os.getpid()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _reset_after_fork(self) -> None:
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._rows = []
+            self._timer = None
+
+    def _collection(self):
+        if self.ensure_collection is not None:
+            return self.ensure_collection()
+        # Yazmak için koleksiyonun belleğe yüklenmesi gerekmez
+        return get_milvus_manager().collection(self.collection_name, load=False)
+
+    # --- Yazma -----------------------------------------------------------
+
+    def add(self, row: dict) -> bool:
+        """Tek satır ekle; bkz. `add_many`."""
+        return self.add_many([row])
+
+    def add_many(self, rows: Sequence[dict]) -> bool:
+        """
+        Satırları tampona ekle. Tampon dolduysa hemen yazılır.
+
+        Dönen değer sadece hemen yapılan yazmanın sonucunu yansıtır; zamanlayıcı
+        ile yapılan yazmalarda hata olursa satırlar tampona geri konur.
+        """
+        if not rows:
+            return True
+        self._reset_after_fork()
+        with self._lock:
+            self._rows.extend(rows)
+            if len(self._rows) >= self.max_rows or self.max_delay <= 0:
+                return self.flush()
+            self._schedule()
+        return True
+
+    def _schedule(self) -> None:
+        if self._timer is not None or self.max_delay <= 0:
+            return
+        self._timer = threading.Timer(self.max_delay, self._on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def flush(self) -> bool:
+        """Tampondaki tüm satırları tek insert RPC'si ile yaz (segment mühürlemeden)."""
+        self._reset_after_fork()
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            rows, self._rows = self._rows, []
+            if not rows:
+                return True
+            manager = get_milvus_manager()
+            groups: Dict[Optional[str], List[dict]] = {}
+            for row in rows:
+                partition = self.partition_for(row) if self.partition_for else None
+                groups.setdefault(partition, []).append(row)
+
+            def _insert():
+                collection = self._collection()
+                fields = [field.name for field in collection.schema.fields if not field.auto_id]
+                for partition in list(groups):
+                    if partition is not None:
+                        manager.ensure_partition(self.collection_name, partition)
+                    collection.insert(
+                        [[row[field] for row in groups[partition]] for field in fields],
+                        partition_name=partition,
+                    )
+                    # Yazılan grup tekrar denemede yeniden yazılmasın
+                    del groups[partition]
+
+            try:
+                manager.call(_insert)
+                return True
+            except Exception as e:
+                unwritten = [row for group in groups.values() for row in group]
+                print(f"Milvus toplu insert hatası ({self.collection_name}, {len(unwritten)} satır): {e}")
+                # Koleksiyon başka bir süreçte yeniden oluşturulmuş olabilir (şema
+                # değişikliği): bir sonraki denemede tanıtıcı yeniden okunsun
+                manager.invalidate(self.collection_name)
+                # Sonraki denemede tekrar yazılsın diye tampona geri koy
+                self._rows = unwritten + self._rows
+                self._schedule()
+                return False
+
+    def drain(self, seal: bool = False) -> bool:
+        """
+        Tamponu boşalt. `seal=True` ise ardından `collection.flush()` ile
+        segmentler mühürlenir (toplu işlerin sonunda bir kez).
+        """
+        ok = self.flush()
+        if seal and ok:
+            try:
+                get_milvus_manager().call(lambda: self._collection().flush())
+            except Exception as e:
+                print(f"Milvus flush hatası ({self.collection_name}): {e}")
+                return False
+        return ok
+
+    def discard(self, predicate: RowPredicate) -> int:
+        """Henüz yazılmamış satırlardan koşula uyanları at (silme işlemleri için)."""
+        self._reset_after_fork()
+        with self._lock:
+            kept = [row for row in self._rows if not predicate(row)]
+            removed = len(self._rows) - len(kept)
+            self._rows = kept
+            return removed
+
+    # --- Okuma -----------------------------------------------------------
+
+    def get_rows(self, key_field: str, keys: Sequence) -> Dict:
+        """Tampondaki satırlardan anahtarı verilenler: {anahtar: satır}."""
+        self._reset_after_fork()
+        wanted = set(keys)
+        with self._lock:
+            return {row[key_field]: row for row in self._rows if row[key_field] in wanted}
+
+    def search_pending(self, vector, top_k: int,
+                       predicate: Optional[RowPredicate] = None,
+                       metric: Optional[str] = None) -> List[Tuple[dict, float]]:
+        """
+        Tampondaki (henüz Milvus'ta olmayan) satırlar arasında yerel arama.
+
+        Dönen liste Milvus ile aynı ham skoru taşır: IP için büyük, L2 için
+        küçük değer daha benzerdir; en benzerden başlayarak sıralıdır.
+        metric verilirse tamponun metriği yerine kullanılır (koleksiyonun
+        indeksi farklı metrikle oluşturulmuşsa).
+        """
+        metric = (metric or self.metric).upper()
+        self._reset_after_fork()
+        with self._lock:
+            rows = [row for row in self._rows if predicate is None or predicate(row)]
+        if not rows or top_k <= 0:
+            return []
+
+        import numpy as np
+
+        query = np.asarray(vector, dtype=np.float32).reshape(-1)
+        matrix = np.asarray([row[self.vector_field] for row in rows], dtype=np.float32)
+        if metric == "L2":
+            scores = ((matrix - query) ** 2).sum(axis=1)
+            order = np.argsort(scores, kind="stable")
+        else:
+            scores = matrix @ query
+            order = np.argsort(-scores, kind="stable")
+        return [(rows[i], float(scores[i])) for i in order[:top_k]]
+
+
+_buffers: Dict[str, MilvusInsertBuffer] = {}
+_buffers_lock = threading.Lock()
+
+
+def get_insert_buffer(collection_name: str, vector_field: str = "vector", metric: str = "IP",
+                      ensure_collection: Optional[Callable[[], object]] = None,
+                      partition_for: Optional[Callable[[dict], Optional[str]]] = None) -> MilvusInsertBuffer:
+    """Koleksiyon başına süreç genelinde tek tampon (boyut/süre ayarlardan okunur)."""
+    buffer = _buffers.get(collection_name)
+    if buffer is None:
+        with _buffers_lock:
+            buffer = _buffers.get(collection_name)
+            if buffer is None:
+                buffer = MilvusInsertBuffer(
+                    collection_name,
+                    vector_field=vector_field,
+                    metric=metric,
+                    max_rows=_setting("MILVUS_INSERT_BUFFER_ROWS", 256),
+                    max_delay=_setting("MILVUS_INSERT_BUFFER_SECONDS", 1.0),
+                    ensure_collection=ensure_collection,
+                    partition_for=partition_for,
+                )
+                _buffers[collection_name] = buffer
+    return buffer
+
+
+def drain_all(seal: bool = False) -> bool:
+    """Tüm tamponları boşalt; yönetim komutları işin sonunda çağırır."""
+    ok = True
+    for buffer in list(_buffers.values()):
+        ok = buffer.drain(seal=seal) and ok
+    return ok
+
+
+def _drain_at_exit() -> None:
+    if any(len(buffer) for buffer in _buffers.values()):
+        drain_all()
+
+
+atexit.register(_drain_at_exit)
@@ -0,0 +1,339 @@
+"""
+Süreç genelinde tek Milvus bağlantısı ve yüklenmiş koleksiyon tanıtıcıları.
+
+Her `insert_vector` / `search_similar` çağrısında yeniden bağlanmak,
+`get_server_version` ile sunucuyu yoklamak ve `Collection(...).load()`
+çağırmak yerine:
+
+    - bağlantı süreç başına bir kez kurulur,
+    - arka plandaki bir iş parçacığı bağlantıyı periyodik olarak yoklar
+      (`MILVUS_HEALTH_CHECK_INTERVAL`), koparsa yeniden bağlanır,
+    - yüklenmiş `Collection` nesneleri önbellekte tutulur,
+    - bölüm (partition) bazlı koleksiyonlarda sadece kullanılan bölümler
+      yüklenir; `MILVUS_MAX_LOADED_PARTITIONS` aşılırsa en uzun süredir
+      kullanılmayan bölüm bırakılır (release),
+    - bir RPC bağlantı hatasıyla düşerse bağlantı yenilenip çağrı bir kez
+      tekrarlanır.
+
+Böylece istek yolundaki Milvus maliyeti sadece asıl RPC'den (search/insert)
+ibaret kalır.
+
+Kullanım örneği:
+
+    from image_matching.milvus_connection import get_milvus_manager
+
+    manager = get_milvus_manager()
+    results = manager.call(lambda: manager.collection("image_vectors").search(...))
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Set, TypeVar
+
+from pymilvus import Collection, connections, utility
+
+T = TypeVar("T")
+
+
+class MilvusConnectionManager:
+    """Milvus bağlantısını ve koleksiyon tanıtıcılarını süreç boyunca yöneten sınıf."""
+
+    def __init__(self, host: str, port, user: str = "", password: str = "",
+                 alias: str = "default", health_check_interval: float = 30.0,
+                 connect_attempts: int = 10, max_loaded_partitions: int = 0,
+                 partition_refresh_interval: float = 60.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.alias = alias
+        self.health_check_interval = health_check_interval
+        self.connect_attempts = max(1, connect_attempts)
+        # Koleksiyon başına bellekte tutulacak en fazla bölüm sayısı (0 = sınırsız)
+        self.max_loaded_partitions = max(0, int(max_loaded_partitions))
+        # Filtresiz aramada bölüm listesinin (başka süreçte oluşturulan şehirler için)
+        # en fazla bu aralıkla yenilenmesi (saniye, 0 = önbellek hiç eskimez)
+        self.partition_refresh_interval = max(0.0, float(partition_refresh_interval))
+
+        self._lock = threading.RLock()
+        self._connected = False
+        self._collections: Dict[str, Collection] = {}
+        # Varlığı doğrulanmış koleksiyon adları (has_collection RPC'sini tekrarlamamak için)
+        self._known: Set[str] = set()
+        # Tamamen yüklenmiş koleksiyonlar; bölümleri bilinen / yüklü olan koleksiyonlar
+        self._loaded: Set[str] = set()
+        self._partitions: Dict[str, Set[str]] = {}
+        self._partitions_at: Dict[str, float] = {}
+        self._loaded_partitions: Dict[str, "OrderedDict[str, None]"] = {}
+        self._health_thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._pid = os.getpid()
+
+    # --- Bağlantı --------------------------------------------------------
+
+    def _reset_after_fork(self) -> None:
+        # gRPC kanalları fork sonrasında kullanılamaz (örn. gunicorn --preload):
+        # alt süreç kendi bağlantısını kurar
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._connected = False
+            self._collections = {}
+            self._known = set()
+            self._loaded = set()
+            self._partitions = {}
+            self._partitions_at = {}
+            self._loaded_partitions = {}
+            self._health_thread = None
+
+    def _connect_once(self, host: str) -> None:
+        connections.connect(
+            alias=self.alias,
+            host=host,
+            port=self.port,
+            user=self.user or None,
+            password=self.password or None,
+        )
+        # Sunucu hazır mı diye kontrol et
+        utility.get_server_version(using=self.alias)
+
+    def ensure_connected(self) -> bool:
+        """Bağlı değilse bağlan (retry ve host fallback ile); bağlıysa hiçbir RPC yapmaz."""
+        self._reset_after_fork()
+        if self._connected:
+            return True
+        with self._lock:
+            if self._connected:
+                return True
+
+            hosts_to_try = [self.host]
+            if self.host == 'localhost':
+                hosts_to_try.append('127.0.0.1')
+
+            last_error = None
+            for host_candidate in hosts_to_try:
+                for _ in range(self.connect_attempts):
+                    try:
+                        self._connect_once(host_candidate)
+                        self._connected = True
+                        self._start_health_check()
+                        return True
+                    except Exception as e:
+                        last_error = e
+                        self._disconnect_quietly()
+                        time.sleep(1)
+            print(f"Milvus connection error: {last_error}")
+            return False
+
+    def _disconnect_quietly(self) -> None:
+        try:
+            connections.disconnect(self.alias)
+        except Exception:
+            pass
+
+    def mark_disconnected(self) -> None:
+        """Bağlantıyı geçersiz say: sonraki çağrı yeniden bağlanır ve koleksiyonları yeniden yükler."""
+        with self._lock:
+            self._connected = False
+            self._collections.clear()
+            self._loaded.clear()
+            self._loaded_partitions.clear()
+            self._disconnect_quietly()
+
+    def is_healthy(self) -> bool:
+        try:
+            utility.get_server_version(using=self.alias)
+            return True
+        except Exception:
+            return False
+
+    def _start_health_check(self) -> None:
+        if not self.health_check_interval or self._health_thread is not None:
+            return
+        self._health_thread = threading.Thread(
+            target=self._health_loop, name="milvus-health-check", daemon=True
+        )
+        self._health_thread.start()
+
+    def _health_loop(self) -> None:
+        while not self._stopped.wait(self.health_check_interval):
+            if self._pid != os.getpid():
+                return
+            if self._connected and not self.is_healthy():
+                print("Milvus bağlantısı koptu, yeniden bağlanılıyor...")
+                self.mark_disconnected()
+                self.ensure_connected()
+
+    def close(self) -> None:
+        self._stopped.set()
+        self.mark_disconnected()
+
+    # --- Koleksiyonlar ---------------------------------------------------
+
+    def has_collection(self, name: str) -> bool:
+        if name in self._known:
+            return True
+        if not self.ensure_connected():
+            raise ConnectionError("Milvus'a bağlanılamadı")
+        exists = utility.has_collection(name, using=self.alias)
+        if exists:
+            self._known.add(name)
+        return exists
+
+    def collection(self, name: str, load: bool = True) -> Collection:
+        """
+        Koleksiyon tanıtıcısını döndür; `load=True` ise ilk kullanımda bir kez
+        tamamı `load()` edilir. Sadece yazma veya bölüm bazlı arama yapan
+        çağrılar `load=False` kullanır. Bölümleri `load_partitions` ile izlenen
+        koleksiyonda (bölüm bırakıldıktan sonra) sadece eksik bölümler yüklenir.
+        """
+        if not self.ensure_connected():
+            raise ConnectionError("Milvus'a bağlanılamadı")
+        handle = self._collections.get(name)
+        if handle is None or (load and name not in self._loaded):
+            with self._lock:
+                handle = self._collections.get(name)
+                if handle is None:
+                    handle = Collection(name, using=self.alias)
+                    self._collections[name] = handle
+                    self._known.add(name)
+                if load and name not in self._loaded:
+                    if name in self._loaded_partitions:
+                        return self.load_partitions(name, None)
+                    handle.load()
+                    self._loaded.add(name)
+        return handle
+
+    # --- Bölümler (partition) --------------------------------------------
+
+    def partitions(self, name: str, refresh: bool = False, max_age: Optional[float] = None) -> Set[str]:
+        """
+        Koleksiyonun bölüm adları (ilk çağrıdan sonra önbellekten).
+
+        refresh: listeyi hemen yenile; max_age: önbellek bu kadar saniyeden
+        eskiyse yenile (başka süreçte oluşturulan bölümler için).
+        """
+        known = self._partitions.get(name)
+        if not refresh and known is not None and max_age:
+            refresh = time.monotonic() - self._partitions_at.get(name, 0.0) > max_age
+        if known is None or refresh:
+            collection = self.collection(name, load=False)
+            known = {partition.name for partition in collection.partitions}
+            self._partitions[name] = known
+            self._partitions_at[name] = time.monotonic()
+        return known
+
+    def ensure_partition(self, name: str, partition: str) -> None:
+        """Bölüm yoksa oluştur (bilinen bölümler için RPC yapılmaz)."""
+        if partition in self.partitions(name):
+            return
+        with self._lock:
+            collection = self.collection(name, load=False)
+            if not collection.has_partition(partition):
+                collection.create_partition(partition)
+            self._partitions[name].add(partition)
+
+    def existing_partitions(self, name: str, partitions: Sequence[str]) -> List[str]:
+        """Verilen bölümlerden var olanlar (başka süreçte oluşturulanlar için bir kez yenilenir)."""
+        known = self.partitions(name)
+        if any(partition not in known for partition in partitions):
+            known = self.partitions(name, refresh=True)
+        return [partition for partition in partitions if partition in known]
+
+    def load_partitions(self, name: str, partitions: Optional[Sequence[str]] = None) -> Collection:
+        """
+        Aranacak bölümleri yükle (None = koleksiyonun tamamı) ve tanıtıcıyı döndür.
+
+        `max_loaded_partitions` aşılırsa bu çağrıda istenmeyen, en uzun süredir
+        kullanılmayan bölümler bırakılır; böylece bellek aktif şehirleri izler.
+        Koleksiyonun tamamı istendiğinde de sadece eksik (bırakılmış) bölümler
+        yüklenir; koleksiyon bir daha bütün olarak `load()` edilmez.
+        """
+        collection = self.collection(name, load=False)
+        full = partitions is None
+        if full:
+            # Önbellekteki liste; istek yolunda her aramada list-partitions RPC'si yapılmaz
+            partitions = sorted(self.partitions(name, max_age=self.partition_refresh_interval))
+        loaded = self._loaded_partitions.setdefault(name, OrderedDict())
+        if name in self._loaded:
+            # Tamamı yüklenmiş koleksiyon: tüm bölümler bellekte
+            for partition in self.partitions(name):
+                loaded.setdefault(partition, None)
+
+        missing = [partition for partition in partitions if partition not in loaded]
+        if missing:
+            with self._lock:
+                missing = [partition for partition in partitions if partition not in loaded]
+                if missing:
+                    collection.load(partition_names=missing)
+                    for partition in missing:
+                        loaded[partition] = None
+        for partition in partitions:
+            loaded.move_to_end(partition)
+        if full:
+            self._loaded.add(name)
+
+        if self.max_loaded_partitions:
+            with self._lock:
+                requested = set(partitions)
+                while len(loaded) > self.max_loaded_partitions:
+                    victim = next(iter(loaded))
+                    if victim in requested:
+                        break
+                    collection.partition(victim).release()
+                    loaded.pop(victim)
+                    self._loaded.discard(name)
+        return collection
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Koleksiyon silindiğinde / yeniden adlandırıldığında önbellekteki tanıtıcıyı at."""
+        with self._lock:
+            if name is None:
+                self._collections.clear()
+                self._known.clear()
+                self._loaded.clear()
+                self._partitions.clear()
+                self._partitions_at.clear()
+                self._loaded_partitions.clear()
+            else:
+                self._collections.pop(name, None)
+                self._known.discard(name)
+                self._loaded.discard(name)
+                self._partitions.pop(name, None)
+                self._partitions_at.pop(name, None)
+                self._loaded_partitions.pop(name, None)
+
+    def call(self, operation: Callable[[], T]) -> T:
+        """
+        Milvus işlemini çalıştır; bağlantı kopmuşsa yeniden bağlanıp bir kez tekrarla.
+
+        Bağlantı sağlıklıyken oluşan hatalar (şema, ifade hatası vb.) tekrar
+        denenmeden yükseltilir.
+        """
+        try:
+            return operation()
+        except Exception:
+            if self.is_healthy():
+                raise
+            self.mark_disconnected()
+            if not self.ensure_connected():
+                raise
+            return operation()
+
+
+@lru_cache(maxsize=None)
+def get_milvus_manager() -> MilvusConnectionManager:
+    """Ayarlardan süreç genelinde tek bağlantı yöneticisi oluştur."""
+    from django.conf import settings
+
+    return MilvusConnectionManager(
+        host=settings.MILVUS_HOST,
+        port=settings.MILVUS_PORT,
+        user=getattr(settings, "MILVUS_USER", ""),
+        password=getattr(settings, "MILVUS_PASSWORD", ""),
+        health_check_interval=getattr(settings, "MILVUS_HEALTH_CHECK_INTERVAL", 30.0),
+        max_loaded_partitions=getattr(settings, "MILVUS_MAX_LOADED_PARTITIONS", 0),
+        partition_refresh_interval=getattr(settings, "MILVUS_PARTITION_REFRESH_SECONDS", 60.0),
+    )
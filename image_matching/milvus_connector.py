@@ -8,35 +8,88 @@ Gerçek projede burada daha gelişmiş bir yapı (örneğin ayrı indexler,
 alanlar vb.) kurulabilir.
 """
 
-from typing import List
+from typing import List, Optional
 
-from django.conf import settings
 from pymilvus import (
     Collection,
     CollectionSchema,
     DataType,
     FieldSchema,
-    connections,
-    utility,
 )
 
+from . import index_tuning
+from .milvus_buffer import SEARCH_CONSISTENCY_LEVEL, get_insert_buffer
+from .milvus_connection import get_milvus_manager
+from .vectors import to_milvus, to_milvus_batch
+
 
 OBJECT_COLLECTION = "object_vectors"
 PERSON_COLLECTION = "person_vectors"
 
+# Yüz embedding'leri L2 normu 1 olacak şekilde üretilir: IP = kosinüs benzerliği.
+# Metrik sadece koleksiyon oluşturulurken uygulanır; eski (L2) kişi koleksiyonu
+# `python manage.py index_faces --recreate` ile IP'ye taşınır. O zamana kadar
+# aramalar koleksiyonun gerçek metriğini kullanır (bkz. `score_to_similarity`).
+COLLECTION_METRICS = {PERSON_COLLECTION: "IP"}
+
 
 def _connect():
-    """Varsayılan Milvus bağlantısını kur."""
-    host = getattr(settings, "MILVUS_HOST", "localhost")
-    port = getattr(settings, "MILVUS_PORT", 19530)
-    connections.connect("default", host=host, port=port)
+    """Süreç genelindeki Milvus bağlantısını kullan (bağlıysa RPC yapılmaz)."""
+    if not get_milvus_manager().ensure_connected():
+        raise ConnectionError("Milvus'a bağlanılamadı")
+
+
+def _metric_for(name: str) -> str:
+    return COLLECTION_METRICS.get(name, "L2")
+
+
+def collection_metric(name: str) -> str:
+    """Koleksiyonun indeksindeki gerçek metrik (koleksiyon yoksa yapılandırılan metrik)."""
+    _connect()
+    manager = get_milvus_manager()
+    if not manager.has_collection(name):
+        return _metric_for(name)
+    params = index_tuning.search_params(manager.collection(name), default_metric=_metric_for(name))
+    return params["metric_type"].upper()
+
+
+def score_to_similarity(score: float, metric: str) -> float:
+    """
+    Birim normlu vektörlerin ham Milvus skorunu 0-1 benzerliğe çevir.
+
+    IP skoru kosinüs benzerliğidir: (cos + 1) / 2. L2 skoru kare mesafedir
+    (d² = 2 - 2·cos): 1 - d² / 4. İkisi de aynı vektör için 1.0 verir.
+    """
+    if metric.upper() == "L2":
+        similarity = 1.0 - score / 4.0
+    else:
+        similarity = (score + 1.0) / 2.0
+    return max(0.0, min(1.0, similarity))
+
+
+def drop_collection(name: str) -> bool:
+    """Koleksiyonu ve tampondaki yazılmamış satırlarını sil (yeniden oluşturmak için)."""
+    from pymilvus import utility
+
+    try:
+        _buffer(name).discard(lambda row: True)
+        _connect()
+        manager = get_milvus_manager()
+        if manager.has_collection(name):
+            utility.drop_collection(name, using=manager.alias)
+        manager.invalidate(name)
+        return True
+    except Exception as exc:  # pragma: no cover - runtime
+        print(f"Milvus drop_collection hatası: {exc}")
+        return False
 
 
 def _ensure_collection(name: str, dim: int = 512) -> Collection:
     """Basit bir [id:int64, ilan_id:int64, vector:FLOAT_VECTOR] koleksiyonu hazırla."""
     _connect()
+    manager = get_milvus_manager()
 
-    if not utility.has_collection(name):
+    if not manager.has_collection(name):
         fields = [
             FieldSchema(
                 name="id", dtype=DataType.INT64, is_primary=True, auto_id=True
@@ -45,35 +98,132 @@ def _ensure_collection(name: str, dim: int = 512) -> Collection:
             FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=dim),
         ]
         schema = CollectionSchema(fields, description="FindUs image vectors")
-        col = Collection(name=name, schema=schema)
-        index_params = {
-            "metric_type": "L2",
-            "index_type": "IVF_FLAT",
-            "params": {"nlist": 128},
-        }
-        col.create_index("vector", index_params)
-        return col
+        col = Collection(name=name, schema=schema, using=manager.alias)
+        # İndeks tipi / parametreleri satır sayısına göre (bkz. index_tuning.py)
+        index_tuning.create_tuned_index(col, metric=_metric_for(name))
+
+    return manager.collection(name)
+
+
+# Koleksiyon adı -> vektör boyutu (tampon yazılırken koleksiyon yoksa oluşturmak için)
+_collection_dims = {}
+
+
+def _buffer(name: str):
+    """Koleksiyonun insert tamponu (ilk yazmada koleksiyon gerekirse oluşturulur)."""
+    return get_insert_buffer(
+        name,
+        metric=_metric_for(name),
+        ensure_collection=lambda: _ensure_collection(name, dim=_collection_dims.get(name, 512)),
+    )
 
-    return Collection(name=name)
 
+def drain(seal: bool = False) -> bool:
+    """Tampondaki eklemeleri hemen yaz; bkz. `milvus_buffer.drain_all`."""
+    from .milvus_buffer import drain_all
 
-def insert_vector(collection_name: str, vector: List[float], ilan_id: int) -> bool:
+    return drain_all(seal=seal)
+
+
+def insert_vector(collection_name: str, vector, ilan_id: int) -> bool:
     """
     Verilen vektörü belirtilen koleksiyona (Milvus) ekle.
 
     Not: Hata durumunda False döner; gerçek projede logging / retry eklenebilir.
     """
+    return insert_vectors(collection_name, [vector], [ilan_id])
+
+
+def insert_vectors(collection_name: str, vectors: List, ilan_ids: List[int]) -> bool:
+    """
+    Vektörleri koleksiyonun insert tamponuna ekle; tampon dolunca veya kısa
+    bir süre sonra tek insert çağrısıyla yazılır (bkz. milvus_buffer.py).
+    """
+    if not vectors:
+        return True
     try:
-        col = _ensure_collection(collection_name, dim=len(vector))
-        col.load()
-        # Milvus insert() metodu field sırasına göre liste bekler
         # Schema: id (auto), ilan_id, vector
-        # Her field için bir liste, her liste aynı uzunlukta (1 kayıt için)
-        col.insert([[ilan_id], [vector]])
-        col.flush()
-        return True
+        rows = [
+            {"ilan_id": int(ilan_id), "vector": vector}
+            for ilan_id, vector in zip(ilan_ids, to_milvus_batch(vectors))
+        ]
+        _collection_dims[collection_name] = len(vectors[0])
+        return _buffer(collection_name).add_many(rows)
     except Exception as exc:  # pragma: no cover - runtime
         print(f"Milvus insert_vector hatası: {exc}")
         return False
 
 
+def delete_vectors(collection_name: str, ilan_id: int) -> bool:
+    """İlana ait tüm vektörleri sil (yeniden indekslemeden önce)."""
+    try:
+        _buffer(collection_name).discard(lambda row: row["ilan_id"] == int(ilan_id))
+        _connect()
+        manager = get_milvus_manager()
+        if not manager.has_collection(collection_name):
+            return True
+        manager.call(lambda: manager.collection(collection_name).delete(f"ilan_id == {int(ilan_id)}"))
+        return True
+    except Exception as exc:  # pragma: no cover - runtime
+        print(f"Milvus delete_vectors hatası: {exc}")
+        return False
+
+
+def search_vectors(collection_name: str, vector, top_k: int = 10,
+                   expr: Optional[str] = None) -> List[dict]:
+    """
+    Koleksiyonda benzer vektörleri ara.
+
+    Dönen değer: [{'ilan_id': int, 'score': float, 'metric': str}, ...] (ham
+    metrik skoru; IP koleksiyonlarında büyük olan, L2 koleksiyonlarında küçük
+    olan daha benzer). `metric` koleksiyon indeksinin gerçek metriğidir;
+    0-1 benzerlik için `score_to_similarity(score, metric)`.
+
+    Tampondaki satırlar da sonuçlara katılır: filtresiz aramada yerel olarak
+    skorlanır, `expr` verilirse tampon önce Milvus'a yazılır.
+    """
+    try:
+        buffer = _buffer(collection_name)
+        if expr:
+            buffer.flush()
+        _connect()
+        manager = get_milvus_manager()
+        matches = []
+        metric = _metric_for(collection_name)
+        if manager.has_collection(collection_name):
+            # Metrik koleksiyonun indeksinden okunur (eski koleksiyon L2 olabilir)
+            param = index_tuning.search_params(
+                manager.collection(collection_name), top_k, default_metric=metric
+            )
+            metric = param["metric_type"].upper()
+
+            def _search():
+                return manager.collection(collection_name).search(
+                    data=[to_milvus(vector)],
+                    anns_field="vector",
+                    param=param,
+                    limit=top_k,
+                    expr=expr,
+                    output_fields=["ilan_id"],
+                    consistency_level=SEARCH_CONSISTENCY_LEVEL,
+                )
+
+            results = manager.call(_search)
+            matches = [
+                {'ilan_id': hit.entity.get('ilan_id'), 'score': float(hit.score), 'metric': metric}
+                for hits in results
+                for hit in hits
+            ]
+        pending = buffer.search_pending(vector, top_k, metric=metric)
+        if pending:
+            matches.extend(
+                {'ilan_id': row['ilan_id'], 'score': score, 'metric': metric} for row, score in pending
+            )
+            matches.sort(key=lambda m: m['score'], reverse=metric != "L2")
+            matches = matches[:top_k]
+        return matches
+    except Exception as exc:  # pragma: no cover - runtime
+        print(f"Milvus search_vectors hatası: {exc}")
+        return []
+
+
@@ -0,0 +1,193 @@
+"""
+Adlandırılmış embedding modelleri için kayıt defteri.
+
+`settings.EMBEDDING_MODELS` içindeki her model bir anahtarla tanımlanır
+(örn. "clip-default"). Kayıt defteri:
+    - yüklenen modelleri süreç boyunca bellekte tutar (farklı modeller
+      dönüşümlü çağrıldığında yeniden yükleme yapılmaz),
+    - işçi başlangıcında seçili modelleri ısıtır (`warm_configured_models`),
+    - her model için ayrı Milvus koleksiyonu ve önbellek ad alanı sağlar.
+
+Böylece deneysel bir model üretim modelinin yanında çalıştırılabilir; hangi
+vektörün hangi model ve sürümle üretildiği ImageVector.model_name /
+model_version alanlarında tutulur.
+
+Kullanım örneği:
+
+    from image_matching.model_registry import get_model_registry
+
+    model = get_model_registry().get("clip-default")
+    results = model.embed(["a.jpg", "b.jpg"])
+"""
+
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+
+DEFAULT_COLLECTION = "image_vectors"
+
+
+class EmbeddingModel:
+    """Kayıt defterindeki tek bir embedding modelinin tanımı."""
+
+    def __init__(self, key: str, model_name: str = "ViT-B-32", pretrained: str = "openai",
+                 backend: Optional[str] = None, version: str = "1", dim: int = 512,
+                 device: Optional[str] = None, collection: Optional[str] = None):
+        self.key = key
+        self.model_name = model_name
+        self.pretrained = pretrained
+        self.backend = backend
+        self.version = str(version)
+        self.dim = int(dim)
+        self.device = device
+        self.collection = collection or f"{DEFAULT_COLLECTION}_{key.replace('-', '_')}"
+
+    def __repr__(self) -> str:
+        return f"<EmbeddingModel {self.identity}>"
+
+    @property
+    def identity(self) -> str:
+        """Vektörü üreten modelin kimliği (örn. "clip-default@1")."""
+        return f"{self.key}@{self.version}"
+
+    def load(self):
+        """Backend'i yükle (süreç boyunca bellekte kalır) ve döndür."""
+        from .embedding_backends import get_clip_backend
+
+        return get_clip_backend(self.backend, self.model_name, self.pretrained, self.device)
+
+    def embed(self, image_paths: Sequence[str], batch_size: int = 32) -> List[Dict]:
+        """`image_to_clip_vectors` ile aynı sözleşme; bu modelle vektörler."""
+        from .utils import image_to_clip_vectors
+
+        return image_to_clip_vectors(
+            image_paths,
+            batch_size=batch_size,
+            model_name=self.model_name,
+            pretrained=self.pretrained,
+            device=self.device,
+            backend=self.backend,
+        )
+
+    def embed_text(self, text: str):
+        """Metni bu modelin vektör uzayına taşı (sık sorgular önbellekten gelir)."""
+        from .embedding_cache import get_query_vector_cache
+
+        return get_query_vector_cache(self.identity).get_or_compute(text, self._encode_text)
+
+    def _encode_text(self, query: str):
+        """
+        EMBEDDING_SERVER_ENABLED açıksa (varsayılan model için) metin embedding
+        sunucusunda vektörlenir; web süreci PyTorch / CLIP yüklemez. Sunucuya
+        ulaşılamazsa EMBEDDING_SERVER_FALLBACK_LOCAL açıksa bu süreçte hesaplanır.
+        """
+        from django.conf import settings
+
+        from .utils import text_to_clip_vector
+
+        if getattr(settings, "EMBEDDING_SERVER_ENABLED", False) and self.key == get_model_registry().default:
+            from .embedding_server import get_embedding_client
+
+            try:
+                result = get_embedding_client().embed_texts([query])[0]
+            except (ConnectionError, TimeoutError) as e:
+                print(f"Embedding sunucusu hatası: {e}")
+                if not getattr(settings, "EMBEDDING_SERVER_FALLBACK_LOCAL", True):
+                    raise
+            else:
+                if result["vector"] is None:
+                    raise RuntimeError(result["error"] or "Metin vektörlenemedi")
+                return result["vector"]
+
+        return text_to_clip_vector(
+            query, model_name=self.model_name, pretrained=self.pretrained, device=self.device
+        )
+
+    def embedding_cache(self):
+        """Bu modele ait embedding önbelleği."""
+        from .embedding_cache import get_embedding_cache
+
+        return get_embedding_cache(self.model_name, self.pretrained, self.backend, self.version)
+
+
+class ModelRegistry:
+    """Yapılandırılmış embedding modellerini tutan ve yükleyen kayıt defteri."""
+
+    def __init__(self, specs: Dict[str, dict], default: str):
+        if default not in specs:
+            raise ValueError(f"Varsayılan embedding modeli tanımlı değil: {default}")
+        self.default = default
+        self._models = {}
+        for key, spec in specs.items():
+            options = dict(spec)
+            if key == default:
+                # Varsayılan model mevcut koleksiyonu kullanmaya devam eder
+                options.setdefault("collection", DEFAULT_COLLECTION)
+            self._models[key] = EmbeddingModel(key, **options)
+        self._loaded: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def keys(self) -> List[str]:
+        return list(self._models)
+
+    def get(self, key: Optional[str] = None) -> EmbeddingModel:
+        """Anahtarla modeli döndür (None ise varsayılan model)."""
+        key = key or self.default
+        try:
+            return self._models[key]
+        except KeyError:
+            raise KeyError(
+                f"Bilinmeyen embedding modeli: {key} (seçenekler: {', '.join(self._models)})"
+            ) from None
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self._loaded
+
+    def warm(self, keys: Optional[Sequence[str]] = None) -> Dict[str, dict]:
+        """
+        Modelleri belleğe yükle.
+
+        Dönen değer: {anahtar: {'success': bool, 'seconds': float, 'error': str | None}}
+        Bir modelin yüklenememesi diğerlerini engellemez.
+        """
+        report = {}
+        for key in keys or [self.default]:
+            started = time.perf_counter()
+            try:
+                self.get(key).load()
+            except Exception as e:
+                report[key] = {'success': False, 'seconds': 0.0, 'error': str(e)}
+                continue
+            seconds = time.perf_counter() - started
+            with self._lock:
+                self._loaded.setdefault(key, seconds)
+            report[key] = {'success': True, 'seconds': seconds, 'error': None}
+        return report
+
+
+@lru_cache(maxsize=None)
+def get_model_registry() -> ModelRegistry:
+    """Ayarlardan süreç genelinde tek kayıt defteri örneği oluştur."""
+    from django.conf import settings
+
+    specs = getattr(settings, "EMBEDDING_MODELS", None) or {
+        "clip-default": {"model_name": "ViT-B-32", "pretrained": "openai"},
+    }
+    default = getattr(settings, "DEFAULT_EMBEDDING_MODEL", None) or next(iter(specs))
+    return ModelRegistry(specs, default)
+
+
+def warm_configured_models(log=print) -> Dict[str, dict]:
+    """`EMBEDDING_WARM_MODELS` (boşsa varsayılan model) modellerini ısıt."""
+    from django.conf import settings
+
+    registry = get_model_registry()
+    report = registry.warm(list(getattr(settings, "EMBEDDING_WARM_MODELS", None) or []) or None)
+    for key, result in report.items():
+        if result['success']:
+            log(f"Embedding modeli yüklendi: {registry.get(key).identity} ({result['seconds']:.1f} sn)")
+        else:
+            log(f"Embedding modeli yüklenemedi: {key}: {result['error']}")
+    return report
@@ -16,10 +16,20 @@ class ImageVector(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_found = models.BooleanField(default=False)
+    # Vektörü üreten embedding modeli (settings.EMBEDDING_MODELS anahtarı) ve sürümü
+    model_name = models.CharField(max_length=100, blank=True, default='', db_index=True)
+    model_version = models.CharField(max_length=50, blank=True, default='')
+    # Vektörün ait olduğu ilan (API yüklemelerinde boş); ilan silinince kayıt da silinir
+    post = models.ForeignKey(
+        'accounts.ItemPost', on_delete=models.CASCADE, null=True, blank=True, related_name='image_vectors'
+    )
     
     class Meta:
         db_table = 'image_vectors'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['post', 'model_name'], name='image_vecto_post_model_idx'),
+        ]
     
     def __str__(self):
         return f"Image Vector {self.vector_id}"
@@ -4,6 +4,9 @@ Görüntü eşleştirme servisleri
 Not: Bu sürümde Google Cloud Vision kaldırıldı ve yerine
 CLIP tabanlı vektörleme kullanılmaktadır (bkz. image_matching.utils).
 """
+import hashlib
+import re
+import unicodedata
 from typing import List, Optional
 
 from django.conf import settings
@@ -13,288 +16,747 @@ from pymilvus import (
     CollectionSchema,
     DataType,
     FieldSchema,
-    connections,
     utility,
 )
 
 from kayip_esya.mongodb import get_collection
+from . import index_tuning
+from .milvus_buffer import SEARCH_CONSISTENCY_LEVEL, get_insert_buffer
+from .milvus_connection import get_milvus_manager
+from .model_registry import get_model_registry
 from .models import ImageMatch, ImageVector
-from .utils import image_to_clip_vector
+from .vectors import as_vector, to_milvus
+
+
+def compute_image_vectors(image_paths: List[str], batch_size: int = 32,
+                          model: Optional[str] = None) -> List[dict]:
+    """
+    Önbellekte olmayan görüntüler için CLIP vektörlerini hesapla.
+
+    EMBEDDING_SERVER_ENABLED açıksa istek yerel embedding sunucusuna gider ve
+    bu süreç modeli hiç yüklemez. Sunucuya ulaşılamazsa (ve
+    EMBEDDING_SERVER_FALLBACK_LOCAL açıksa) model bu süreçte yüklenir.
+    Sunucu sadece varsayılan modeli tutar; diğer modeller her zaman yerelde çalışır.
+    """
+    registry = get_model_registry()
+    embedding_model = registry.get(model)
+    if getattr(settings, 'EMBEDDING_SERVER_ENABLED', False) and embedding_model.key == registry.default:
+        from .embedding_server import get_embedding_client
+
+        try:
+            return get_embedding_client().embed(image_paths)
+        except (ConnectionError, TimeoutError) as e:
+            print(f"Embedding sunucusu hatası: {e}")
+            if not getattr(settings, 'EMBEDDING_SERVER_FALLBACK_LOCAL', True):
+                return [
+                    {'image_path': path, 'vector': None, 'error': str(e)}
+                    for path in image_paths
+                ]
+    return embedding_model.embed(image_paths, batch_size=batch_size)
+
+
+# İlan meta verisi: Milvus'ta skaler alan olarak tutulur, aramada filtre olarak kullanılır
+VECTOR_METADATA_DEFAULTS = {
+    'post_id': 0,
+    'post_type': '',
+    'city': '',
+    'category': '',
+    'status': '',
+    'is_missing_child': False,
+}
+
+
+def city_key(city: Optional[str]) -> str:
+    """Şehir filtresi anahtarı: "Adıyaman, Kahta" -> "Adıyaman" (eşleştirmedeki şehir kuralı)."""
+    return (city or '').split(',')[0].strip()
+
+
+# Tek `query` çağrısında id ile getirilecek en fazla vektör
+VECTOR_QUERY_BATCH = 1000
+
+# Şehri olmayan vektörler (ve bölümlemeden önce eklenmiş olanlar) bu bölümde durur
+DEFAULT_PARTITION = "_default"
+
+_TURKISH_ASCII = str.maketrans("çğıİöşüÇĞÖŞÜ", "cgiIosuCGOSU")
+
+
+def partition_for_city(city: Optional[str]) -> str:
+    """
+    Şehrin Milvus bölüm (partition) adı: "Adıyaman, Kahta" -> "city_adiyaman_<hash>".
+    
+    Bölüm adları sadece harf, rakam ve alt çizgi içerebilir; Türkçe karakterler
+    ASCII'ye indirgenir, çakışmaması için şehir anahtarının kısa özeti eklenir.
+    """
+    key = city_key(city)
+    if not key:
+        return DEFAULT_PARTITION
+    ascii_key = unicodedata.normalize("NFKD", key.translate(_TURKISH_ASCII))
+    slug = re.sub(r"[^a-z0-9]+", "_", ascii_key.encode("ascii", "ignore").decode().lower()).strip("_")
+    digest = hashlib.md5(key.encode("utf-8")).hexdigest()[:8]
+    return f"city_{slug[:40]}_{digest}"
+
+
+def vector_metadata(metadata: Optional[dict]) -> dict:
+    """Skaler alanları şemaya uygun tip ve uzunlukta, eksikleri varsayılanla doldur."""
+    metadata = {**VECTOR_METADATA_DEFAULTS, **{k: v for k, v in (metadata or {}).items() if v is not None}}
+    return {
+        'post_id': int(metadata['post_id']),
+        'post_type': str(metadata['post_type'])[:10],
+        'city': city_key(metadata['city'])[:100],
+        'category': str(metadata['category'])[:50],
+        'status': str(metadata['status'])[:10],
+        'is_missing_child': bool(metadata['is_missing_child']),
+    }
+
+
+def _quote(value: str) -> str:
+    escaped = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def build_filter_expr(filters: Optional[dict]) -> Optional[str]:
+    """
+    Filtre sözlüğünden Milvus boolean ifadesi üret.
+    
+    Desteklenen anahtarlar: VECTOR_METADATA_DEFAULTS alanları (eşitlik),
+    `exclude_post_id`, `exclude_user_id` ve `vector_ids` (id listesi).
+    Değeri None olan anahtarlar yok sayılır.
+    """
+    clauses = []
+    for key, value in (filters or {}).items():
+        if value is None:
+            continue
+        if key == 'exclude_post_id':
+            clauses.append(f"post_id != {int(value)}")
+        elif key == 'exclude_user_id':
+            clauses.append(f"user_id != {_quote(value)}")
+        elif key == 'vector_ids':
+            clauses.append(f"id in [{', '.join(_quote(v) for v in value)}]")
+        elif key == 'post_id':
+            clauses.append(f"post_id == {int(value)}")
+        elif key == 'city':
+            clauses.append(f"city == {_quote(city_key(value))}")
+        elif key == 'is_missing_child':
+            clauses.append(f"is_missing_child == {'true' if value else 'false'}")
+        elif key in VECTOR_METADATA_DEFAULTS:
+            clauses.append(f"{key} == {_quote(value)}")
+        else:
+            raise ValueError(f"Bilinmeyen filtre: {key}")
+    return " and ".join(clauses) or None
+
+
+def _filter_predicate(filters: Optional[dict]):
+    """`build_filter_expr` ile aynı filtreyi tampondaki satırlara uygulayan koşul."""
+    active = {key: value for key, value in (filters or {}).items() if value is not None}
+    if not active:
+        return None
+    
+    def _matches(row: dict) -> bool:
+        for key, value in active.items():
+            if key == 'exclude_post_id':
+                if row['post_id'] == int(value):
+                    return False
+            elif key == 'exclude_user_id':
+                if row['user_id'] == str(value):
+                    return False
+            elif key == 'vector_ids':
+                if row['id'] not in value:
+                    return False
+            elif key == 'city':
+                if row['city'] != city_key(value):
+                    return False
+            elif key == 'is_missing_child':
+                if bool(row['is_missing_child']) != bool(value):
+                    return False
+            elif row[key] != value:
+                return False
+        return True
+    
+    return _matches
 
 
 class MilvusService:
     """Milvus vektör veritabanı servisi"""
     
-    def __init__(self):
+    def __init__(self, collection_name: str = "image_vectors", dimension: int = 512):
         self.host = settings.MILVUS_HOST
         self.port = settings.MILVUS_PORT
         self.user = settings.MILVUS_USER
         self.password = settings.MILVUS_PASSWORD
-        self.collection_name = "image_vectors"
+        # Her embedding modeli kendi koleksiyonunu kullanır (bkz. model_registry.py)
+        self.collection_name = collection_name
         # CLIP ViT-B/32 embedding boyutu (open-clip default: 512)
-        self.dimension = 512
+        self.dimension = dimension
+        # Süreç genelinde paylaşılan bağlantı ve yüklenmiş koleksiyon tanıtıcıları
+        self.manager = get_milvus_manager()
+        # Eklemeler koleksiyon başına tamponda birikip toplu yazılır (bkz. milvus_buffer.py)
+        # Her şehrin vektörleri ayrı bölümde: şehir filtreli arama sadece o bölümü tarar
+        self.insert_buffer = get_insert_buffer(
+            self.collection_name,
+            metric="IP",
+            partition_for=lambda row: partition_for_city(row.get('city')),
+        )
         
     def connect(self):
-        """Milvus'a bağlan (retry ve host fallback ile)"""
-        import time
-
-        hosts_to_try = [self.host]
-        if self.host == 'localhost':
-            hosts_to_try.append('127.0.0.1')
-
-        last_error = None
-        for host_candidate in hosts_to_try:
-            for _ in range(10):  # ~10 deneme, toplam ~10-15 sn bekleme
-                try:
-                    connections.connect(
-                        alias="default",
-                        host=host_candidate,
-                        port=self.port,
-                        user=self.user if self.user else None,
-                        password=self.password if self.password else None
-                    )
-                    # Sunucu hazır mı diye kontrol et
-                    try:
-                        _ = utility.get_server_version()
-                    except Exception:
-                        time.sleep(1)
-                        continue
-                    return True
-                except Exception as e:
-                    last_error = e
-                    time.sleep(1)
-        print(f"Milvus connection error: {last_error}")
-        return False
+        """Milvus'a bağlan (retry ve host fallback ile); bağlantı süreç boyunca korunur"""
+        return self.manager.ensure_connected()
+    
+    def collection_schema(self) -> CollectionSchema:
+        """Vektör + ilan meta verisi (skaler filtre alanları) şeması"""
+        fields = [
+            FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, max_length=100),
+            FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=self.dimension),
+            FieldSchema(name="user_id", dtype=DataType.VARCHAR, max_length=100),
+            FieldSchema(name="image_path", dtype=DataType.VARCHAR, max_length=500),
+            FieldSchema(name="description", dtype=DataType.VARCHAR, max_length=1000),
+            # Skaler alanlar: aramada karşıt tür / aynı şehir / aktif ilan filtresi
+            FieldSchema(name="post_id", dtype=DataType.INT64),
+            FieldSchema(name="post_type", dtype=DataType.VARCHAR, max_length=10),
+            FieldSchema(name="city", dtype=DataType.VARCHAR, max_length=100),
+            FieldSchema(name="category", dtype=DataType.VARCHAR, max_length=50),
+            FieldSchema(name="status", dtype=DataType.VARCHAR, max_length=10),
+            FieldSchema(name="is_missing_child", dtype=DataType.BOOL),
+        ]
+        return CollectionSchema(fields, "Image vectors collection")
+    
+    def has_collection(self) -> bool:
+        return self.manager.has_collection(self.collection_name)
+    
+    def drop_collection(self) -> bool:
+        """Koleksiyonu sil (tampondaki yazılmamış satırlar da atılır)"""
+        self.insert_buffer.discard(lambda row: True)
+        utility.drop_collection(self.collection_name, using=self.manager.alias)
+        self.manager.invalidate(self.collection_name)
+        return True
+    
+    def supports_filters(self) -> bool:
+        """Koleksiyon skaler filtre alanlarını içeriyor mu (eski şemada False)"""
+        collection = self.manager.collection(self.collection_name, load=False)
+        return any(field.name == 'post_id' for field in collection.schema.fields)
     
-    def create_collection(self):
-        """Koleksiyon oluştur"""
+    def create_collection(self, collection_name: Optional[str] = None):
+        """Koleksiyon oluştur (varsayılan: bu servisin koleksiyonu)"""
         if not self.connect():
             return False
+        collection_name = collection_name or self.collection_name
             
         try:
-            # Field tanımları
-            fields = [
-                FieldSchema(name="id", dtype=DataType.VARCHAR, is_primary=True, max_length=100),
-                FieldSchema(name="vector", dtype=DataType.FLOAT_VECTOR, dim=self.dimension),
-                FieldSchema(name="user_id", dtype=DataType.VARCHAR, max_length=100),
-                FieldSchema(name="image_path", dtype=DataType.VARCHAR, max_length=500),
-                FieldSchema(name="description", dtype=DataType.VARCHAR, max_length=1000),
-            ]
-            
-            schema = CollectionSchema(fields, "Image vectors collection")
-            
-            # Koleksiyon var mı kontrol et
-            if utility.has_collection(self.collection_name):
+            # Koleksiyon var mı kontrol et (yüklenmiş tanıtıcı varsa RPC yapılmaz)
+            if self.manager.has_collection(collection_name):
                 return True
-
+            
             # Koleksiyon oluştur
-            collection = Collection(self.collection_name, schema)
+            collection = Collection(collection_name, self.collection_schema(), using=self.manager.alias)
             
-            # Index oluştur (IP metric'i normalize edilmiş vektörler için cosine similarity sağlar)
-            index_params = {
-                "metric_type": "IP",  # Inner Product (cosine similarity için)
-                "index_type": "IVF_FLAT",
-                "params": {"nlist": 1024}
-            }
-            collection.create_index("vector", index_params)
+            # Index oluştur (IP metric'i normalize edilmiş vektörler için cosine similarity sağlar).
+            # Tip ve parametreler satır sayısına göre seçilir; koleksiyon büyüdükçe
+            # `python manage.py tune_milvus_index --apply` ile yeniden ayarlanır.
+            index_tuning.create_tuned_index(collection, metric="IP")
             
             return True
         except Exception as e:
             print(f"Collection creation error: {e}")
             return False
     
-    def insert_vector(self, vector_id: str, vector: List[float], user_id: str, 
-                     image_path: str, description: str = ""):
-        """Vektör ekle"""
+    def insert_vector(self, vector_id: str, vector, user_id: str, 
+                     image_path: str, description: str = "", metadata: Optional[dict] = None):
+        """
+        Vektör ekle (float16 / float32 dizi veya liste; Milvus'a float32 gider).
+        
+        metadata: ilan meta verisi (bkz. VECTOR_METADATA_DEFAULTS); eksik
+        alanlar varsayılan değerle yazılır.
+        
+        Satır tampona yazılır ve toplu olarak Milvus'a gönderilir; aynı süreçteki
+        `search_similar` çağrıları tampondaki satırları da görür.
+        """
         if not self.connect():
             return False
             
         try:
-            collection = Collection(self.collection_name)
-            collection.load()
-            
-            data = [
-                [vector_id],
-                [vector],
-                [user_id],
-                [image_path],
-                [description]
-            ]
-            
-            collection.insert(data)
-            collection.flush()
-            return True
+            return self.insert_buffer.add({
+                'id': vector_id,
+                'vector': to_milvus(vector),
+                'user_id': user_id,
+                'image_path': image_path,
+                'description': description,
+                **vector_metadata(metadata),
+            })
         except Exception as e:
             print(f"Vector insertion error: {e}")
             return False
     
-    def search_similar(self, query_vector: List[float], top_k: int = 10) -> List[dict]:
-        """Benzer vektörleri ara"""
+    def drain(self, seal: bool = False) -> bool:
+        """Tampondaki eklemeleri hemen yaz (toplu işlerin sonunda `seal=True`)."""
+        return self.insert_buffer.drain(seal=seal)
+    
+    def delete_vectors(self, vector_ids: List[str]) -> bool:
+        """Vektörleri id ile sil (henüz tamponda olanlar yazılmadan atılır)."""
+        ids = [vector_id for vector_id in dict.fromkeys(vector_ids) if vector_id]
+        if not ids:
+            return True
+        wanted = set(ids)
+        self.insert_buffer.discard(lambda row: row['id'] in wanted)
         if not self.connect():
-            return []
+            return False
+        
+        try:
+            for start in range(0, len(ids), VECTOR_QUERY_BATCH):
+                expr = build_filter_expr({'vector_ids': ids[start:start + VECTOR_QUERY_BATCH]})
+                self.manager.call(lambda: self.manager.collection(self.collection_name, load=False).delete(expr))
+            return True
+        except Exception as e:
+            print(f"Vector delete error: {e}")
+            return False
+    
+    def vector_ids(self, batch_size: int = 5000) -> set:
+        """Koleksiyondaki tüm vektör id'leri (uzlaştırma için; tampon önce yazılır)."""
+        self.insert_buffer.flush()
+        ids = set()
+        if not self.connect() or not self.has_collection():
+            return ids
+        iterator = self.manager.collection(self.collection_name).query_iterator(
+            batch_size=batch_size, output_fields=["id"]
+        )
+        try:
+            while True:
+                rows = iterator.next()
+                if not rows:
+                    break
+                ids.update(row['id'] for row in rows)
+        finally:
+            iterator.close()
+        return ids
+    
+    def compact(self) -> bool:
+        """Silinmiş satırların segmentlerden atılmasını başlat (Milvus compaction)."""
+        if not self.connect():
+            return False
+        try:
+            self.manager.call(lambda: self.manager.collection(self.collection_name, load=False).compact())
+            return True
+        except Exception as e:
+            print(f"Compaction error: {e}")
+            return False
+    
+    @staticmethod
+    def _match(ip_score: float, **fields) -> dict:
+        """Ham IP skorundan arama sonucu sözlüğü oluştur."""
+        # IP metric: normalize edilmiş vektörler için IP = cosine similarity
+        # Milvus IP score'u -1 ile 1 arasında değerler döner
+        # Cosine similarity'yi 0-1 aralığına normalize et
+        cosine_similarity = max(0.0, min(1.0, (ip_score + 1) / 2))
+        return {
+            **fields,
+            'distance': 1 - cosine_similarity,
+            'similarity': cosine_similarity,  # Cosine similarity (0-1 arası)
+            'raw_ip_score': ip_score  # Debug için ham IP score
+        }
+    
+    def search_similar(self, query_vector, top_k: int = 10,
+                       filters: Optional[dict] = None) -> List[dict]:
+        """
+        Benzer vektörleri ara.
+        
+        filters: skaler filtre sözlüğü (bkz. `build_filter_expr`), örn.
+            {'post_type': 'found', 'city': 'Ankara', 'status': 'active'}
+        Filtre indeks aramasının içinde uygulanır; top_k sadece uygun adaylardan
+        seçilir. Şehir filtresi varsa sadece o şehrin bölümü (ve varsayılan
+        bölüm) yüklenir ve taranır. Koleksiyon henüz eski şemadaysa (bkz.
+        migrate_milvus_schema) sadece id / user_id filtreleri uygulanır.
+        """
+        return self._search([query_vector], top_k, filters)[0]
+    
+    def search_similar_batch(self, query_vectors, top_k: int = 10, filters=None,
+                             batch_size: Optional[int] = None) -> List[List[dict]]:
+        """
+        Birden fazla sorgu vektörünü toplu ara; bkz. `search_in_batches`.
+        
+        Dönen liste giriş sırasıyla aynıdır; her öğe `search_similar` sonucudur.
+        """
+        return search_in_batches(self, query_vectors, top_k, filters, batch_size)
+    
+    def _search(self, query_vectors, top_k: int, filters: Optional[dict] = None) -> List[List[dict]]:
+        """Aynı filtreyle birden fazla sorgu: tek search RPC'si (nq = sorgu sayısı)."""
+        empty = [[] for _ in query_vectors]
+        if not query_vectors or not self.connect():
+            return empty
             
         try:
-            collection = Collection(self.collection_name)
-            collection.load()
+            output_fields = ["id", "user_id", "image_path", "description"]
+            partitions = None
+            if self.supports_filters():
+                output_fields += list(VECTOR_METADATA_DEFAULTS)
+                if filters and filters.get('city') is not None:
+                    partitions = self.manager.existing_partitions(
+                        self.collection_name,
+                        [DEFAULT_PARTITION, partition_for_city(filters['city'])],
+                    )
+            elif filters:
+                filters = {k: v for k, v in filters.items() if k in ('vector_ids', 'exclude_user_id')}
+                print(f"Uyarı: {self.collection_name} skaler alanları içermiyor, filtre kısmen uygulanıyor "
+                      "(python manage.py migrate_milvus_schema)")
+            expr = build_filter_expr(filters)
             
-            # Normalize edilmiş vektörler için IP (Inner Product) kullan
-            # IP = cosine similarity (normalize edilmiş vektörler için)
-            search_params = {
-                "metric_type": "IP",  # Inner Product (cosine similarity için)
-                "params": {"nprobe": 10}
-            }
+            queries = [to_milvus(query_vector) for query_vector in query_vectors]
+            def _search():
+                collection = self.manager.load_partitions(self.collection_name, partitions)
+                # Normalize edilmiş vektörler için IP (Inner Product) = cosine similarity;
+                # nprobe / ef mevcut indeks ve hedef recall'a göre (bkz. index_tuning.py)
+                return collection.search(
+                    data=queries,
+                    anns_field="vector",
+                    param=index_tuning.search_params(collection, top_k, default_metric="IP"),
+                    limit=top_k,
+                    expr=expr,
+                    partition_names=partitions,
+                    output_fields=output_fields,
+                    consistency_level=SEARCH_CONSISTENCY_LEVEL,
+                )
             
-            results = collection.search(
-                data=[query_vector],
-                anns_field="vector",
-                param=search_params,
-                limit=top_k,
-                output_fields=["id", "user_id", "image_path", "description"]
-            )
+            results = self.manager.call(_search)
             
-            matches = []
-            for hits in results:
-                for hit in hits:
-                    # IP metric: normalize edilmiş vektörler için IP = cosine similarity
-                    # Milvus IP score'u -1 ile 1 arasında değerler döner
-                    # En yüksek benzerlik için en yüksek IP değeri aranır
-                    ip_score = hit.score  # IP score (-1 ile 1 arası)
-                    
-                    # Cosine similarity'yi 0-1 aralığına normalize et
-                    # IP score zaten cosine similarity (normalize edilmiş vektörler için)
-                    cosine_similarity = max(0.0, min(1.0, (ip_score + 1) / 2))
-                    
-                    matches.append({
-                        'id': hit.entity.get('id'),
-                        'user_id': hit.entity.get('user_id'),
-                        'image_path': hit.entity.get('image_path'),
-                        'description': hit.entity.get('description'),
-                        'distance': 1 - cosine_similarity,
-                        'similarity': cosine_similarity,  # Cosine similarity (0-1 arası)
-                        'raw_ip_score': ip_score  # Debug için ham IP score
-                    })
+            predicate = _filter_predicate(filters)
+            all_matches = []
+            for query, hits in zip(queries, results):
+                matches = [
+                    self._match(hit.score, **{field: hit.entity.get(field) for field in output_fields})
+                    for hit in hits
+                ]
+                
+                # Henüz Milvus'a yazılmamış (tampondaki) satırlar: read-your-writes
+                pending = self.insert_buffer.search_pending(query, top_k, predicate=predicate)
+                if pending:
+                    seen = {m['id'] for m in matches}
+                    for row, ip_score in pending:
+                        if row['id'] not in seen:
+                            matches.append(self._match(
+                                ip_score,
+                                **{field: row[field] for field in output_fields},
+                            ))
+                    matches.sort(key=lambda m: m['similarity'], reverse=True)
+                    matches = matches[:top_k]
+                all_matches.append(matches)
             
-            return matches
+            return all_matches
         except Exception as e:
             print(f"Search error: {e}")
-            return []
+            return empty
+
+    def get_vectors(self, vector_ids: List[str], cities: Optional[List[str]] = None) -> dict:
+        """
+        Kayıtlı vektörleri id ile getir (ANN araması yapmadan): {vector_id: np.ndarray}.
+        
+        Tampondaki satırlar yerelden okunur; geri kalanlar `query` ile toplu
+        olarak çekilir. `cities` verilirse sadece o şehirlerin bölümleri (ve
+        varsayılan bölüm) yüklenip sorgulanır. Bulunamayan id'ler sonuçta yer almaz.
+        """
+        ids = list(dict.fromkeys(vector_id for vector_id in vector_ids if vector_id))
+        if not ids:
+            return {}
+        vectors = {
+            vector_id: as_vector(row['vector'])
+            for vector_id, row in self.insert_buffer.get_rows('id', ids).items()
+        }
+        missing = [vector_id for vector_id in ids if vector_id not in vectors]
+        if not missing or not self.connect():
+            return vectors
+        
+        try:
+            partitions = None
+            if cities is not None and self.supports_filters():
+                partitions = self.manager.existing_partitions(
+                    self.collection_name,
+                    [DEFAULT_PARTITION] + sorted({partition_for_city(city) for city in cities}),
+                )
+            for start in range(0, len(missing), VECTOR_QUERY_BATCH):
+                expr = build_filter_expr({'vector_ids': missing[start:start + VECTOR_QUERY_BATCH]})
+                rows = self.manager.call(lambda: self.manager.load_partitions(self.collection_name, partitions).query(
+                    expr=expr,
+                    output_fields=["id", "vector"],
+                    partition_names=partitions,
+                    consistency_level=SEARCH_CONSISTENCY_LEVEL,
+                ))
+                for row in rows:
+                    vectors[row['id']] = as_vector(row['vector'])
+        except Exception as e:
+            print(f"Vector fetch error: {e}")
+        return vectors
+    
+    def similarities(self, source_vector_id: str, target_vector_ids: List[str],
+                     cities: Optional[List[str]] = None) -> dict:
+        """
+        Kaynak vektör ile hedef vektörler arasındaki kesin benzerlik: {target_id: 0-1}.
+        
+        Vektörler tek seferde id ile getirilir ve iç çarpım doğrudan hesaplanır;
+        sonuç koleksiyon boyutundan ve top_k sınırından bağımsızdır. Ölçek
+        `search_similar` ile aynıdır ((IP + 1) / 2). Vektörü olmayan hedefler
+        sonuçta yer almaz.
+        """
+        import numpy as np
+        
+        vectors = self.get_vectors([source_vector_id] + list(target_vector_ids), cities=cities)
+        source = vectors.get(source_vector_id)
+        targets = [vector_id for vector_id in dict.fromkeys(target_vector_ids) if vector_id in vectors]
+        if source is None or not targets:
+            return {}
+        matrix = np.stack([vectors[vector_id] for vector_id in targets]).astype(np.float32)
+        scores = matrix @ np.asarray(source, dtype=np.float32)
+        return {
+            vector_id: self._match(float(score))['similarity']
+            for vector_id, score in zip(targets, scores)
+        }
+
+
+# Toplu aramada sorguya özel olan, ortak ifadeye konmayıp sonuçlara uygulanan filtreler
+PER_QUERY_FILTERS = ('exclude_user_id', 'exclude_post_id')
+
+
+def _search_batch_size(batch_size: Optional[int]) -> int:
+    return max(1, int(batch_size or getattr(settings, 'VECTOR_SEARCH_BATCH_SIZE', 256)))
+
+
+def search_in_batches(service, query_vectors, top_k: int = 10, filters=None,
+                      batch_size: Optional[int] = None) -> List[List[dict]]:
+    """
+    Çok sorgulu arama: sorguları ortak filtreye göre gruplar ve her grubu
+    `batch_size`lık parçalar halinde tek çağrıda (`service._search`) arar.
+    
+    filters: tüm sorgular için tek sözlük veya sorgu başına sözlük listesi.
+    Sorguya özel `exclude_user_id` / `exclude_post_id` ortak ifadeye konmaz;
+    grup `top_k` fazlasıyla aranır ve sonuçlara sorgu başına uygulanır. Eleme
+    sonrası top_k'dan az sonuç kalan ve aday listesi dolu gelen sorgular (tam
+    sonuç için) tek tek yeniden aranır. Sonuçlar `search_similar` ile aynıdır.
+    """
+    query_vectors = list(query_vectors)
+    if isinstance(filters, (list, tuple)):
+        filters_list = [dict(f or {}) for f in filters]
+    else:
+        filters_list = [dict(filters or {}) for _ in query_vectors]
+    batch_size = _search_batch_size(batch_size)
+    
+    groups = {}
+    for index, query_filters in enumerate(filters_list):
+        shared = {k: v for k, v in query_filters.items() if k not in PER_QUERY_FILTERS and v is not None}
+        key = repr(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in shared.items()))
+        groups.setdefault(key, (shared, []))[1].append(index)
+    
+    results: List[List[dict]] = [[] for _ in query_vectors]
+    for shared, indices in groups.values():
+        exclusive = any(
+            filters_list[index].get(key) is not None for index in indices for key in PER_QUERY_FILTERS
+        )
+        # Sorguya özel eleme yapılacaksa fazladan aday iste
+        limit = top_k * 2 if exclusive else top_k
+        for start in range(0, len(indices), batch_size):
+            chunk = indices[start:start + batch_size]
+            hits = service._search([query_vectors[index] for index in chunk], limit, shared)
+            for index, matches in zip(chunk, hits):
+                query_filters = filters_list[index]
+                kept = [m for m in matches if not _excluded_by(m, query_filters)][:top_k]
+                if len(kept) < top_k and len(matches) == limit:
+                    kept = service.search_similar(query_vectors[index], top_k, filters=query_filters)
+                results[index] = kept
+    return results
+
+
+def _excluded_by(match: dict, query_filters: dict) -> bool:
+    user_id = query_filters.get('exclude_user_id')
+    if user_id is not None and match.get('user_id') == str(user_id):
+        return True
+    post_id = query_filters.get('exclude_post_id')
+    return post_id is not None and match.get('post_id') == int(post_id)
+
+
+# Koleksiyon adı -> LocalVectorService (bellekteki durum süreç başına bir kez yüklenir)
+_local_services = {}
+
+
+def get_vector_service(collection_name: str = "image_vectors", dimension: int = 512):
+    """
+    Ayarlı vektör deposu (`VECTOR_BACKEND`): "milvus" (varsayılan) veya "local".
+    
+    İkisi de aynı arayüzü sağlar (insert_vector, search_similar,
+    search_similar_batch, get_vectors, similarities, delete_vectors, drain). "local" Milvus sunucusu olmadan
+    `LOCAL_VECTOR_DIR` altında memmap dosyalarıyla çalışır (bkz. local_vectors.py).
+    """
+    backend = getattr(settings, 'VECTOR_BACKEND', 'milvus').lower()
+    if backend == 'milvus':
+        return MilvusService(collection_name=collection_name, dimension=dimension)
+    if backend != 'local':
+        raise ValueError(f"Bilinmeyen VECTOR_BACKEND: {backend} (seçenekler: milvus, local)")
+    
+    from .local_vectors import LocalVectorService
+    
+    service = _local_services.get(collection_name)
+    if service is None:
+        service = _local_services[collection_name] = LocalVectorService(collection_name, dimension)
+    return service
 
 
 class ImageMatchingService:
     """Görüntü eşleştirme ana servisi"""
     
-    def __init__(self):
-        self.milvus = MilvusService()
+    def __init__(self, model: Optional[str] = None):
+        # model: settings.EMBEDDING_MODELS anahtarı (None ise varsayılan model)
+        self.model = get_model_registry().get(model)
+        # Vektör deposu: MilvusService veya LocalVectorService (VECTOR_BACKEND)
+        self.milvus = get_vector_service(self.model.collection, self.model.dim)
+        self.embedding_cache = self.model.embedding_cache()
     
-    def process_image(self, image_path: str, user_id: str, description: str = "") -> dict:
-        """Görüntüyü işle ve vektör veritabanına ekle"""
+    def _embed_images(self, image_paths: List[str], batch_size: int = 32) -> List[dict]:
+        """Görüntüleri önce önbellekten oku, eksik olanları toplu olarak vektörle."""
+        return self.embedding_cache.get_or_compute(
+            image_paths,
+            lambda paths: compute_image_vectors(paths, batch_size=batch_size, model=self.model.key),
+        )
+    
+    def _embed_image(self, image_path: str):
+        """Tek görüntü için (önbellekli) CLIP vektörü; hata durumunda istisna fırlatır."""
+        result = self._embed_images([image_path])[0]
+        if result['error']:
+            raise RuntimeError(result['error'])
+        return result['vector']
+    
+    def process_image(self, image_path: str, user_id: str, description: str = "",
+                      metadata: Optional[dict] = None) -> dict:
+        """
+        Görüntüyü işle ve vektör veritabanına ekle.
+        
+        metadata: aramada filtre olarak kullanılan ilan meta verisi
+            (post_id, post_type, city, category, status, is_missing_child)
+        """
         try:
-            # CLIP ile özellik vektörünü çıkar
-            features = image_to_clip_vector(image_path)
-            if not features:
+            # CLIP ile özellik vektörünü çıkar (önbellekte varsa yeniden hesaplanmaz)
+            features = self._embed_image(image_path)
+            if features is None:
                 return {'success': False, 'error': 'Feature extraction failed'}
             
             # Milvus koleksiyonunu oluştur (yoksa)
             self.milvus.create_collection()
             
-            # Benzersiz ID oluştur
-            import uuid
-            vector_id = str(uuid.uuid4())
-            
-            # Vektörü ekle
-            success = self.milvus.insert_vector(
-                vector_id=vector_id,
-                vector=features,
-                user_id=user_id,
-                image_path=image_path,
-                description=description
-            )
-            
-            if success:
-                # Django DB: ImageVector kaydet
-                from django.contrib.auth import get_user_model
-                User = get_user_model()
-                try:
-                    user = User.objects.get(id=int(user_id))
-                except (User.DoesNotExist, ValueError):
-                    return {'success': False, 'error': f'User with id {user_id} not found'}
-                
-                image_vector = ImageVector.objects.create(
-                    user=user,
-                    image_path=image_path,
-                    vector_id=vector_id,
-                    description=description
-                )
-                # MongoDB log
-                try:
-                    logs = get_collection('image_processing_logs')
-                    logs.insert_one({
-                        'event': 'process_image',
-                        'user_id': user_id,
-                        'vector_id': vector_id,
-                        'image_path': image_path,
-                        'description': description,
-                        'features_count': len(features),
-                        'created_at': timezone.now().isoformat()
-                    })
-                except Exception:
-                    pass
-                return {
-                    'success': True,
-                    'vector_id': vector_id,
-                    'image_vector_id': str(image_vector.id),
-                    'features_count': len(features)
-                }
-            else:
-                return {'success': False, 'error': 'Vector insertion failed'}
+            return self._store_features(features, image_path, user_id, description, metadata)
                 
         except Exception as e:
             return {'success': False, 'error': str(e)}
     
-    def find_similar_images(self, image_path: str, top_k: int = 10, source_vector_id: Optional[str] = None) -> List[dict]:
-        """Benzer görüntüleri bul"""
+    def process_images(self, items: List[dict], batch_size: int = 32) -> List[dict]:
+        """
+        Birden fazla görüntüyü toplu olarak işle ve vektör veritabanına ekle.
+        
+        items: [{'image_path': ..., 'user_id': ..., 'description': ..., 'metadata': {...}}, ...]
+        
+        CLIP vektörleri önbellekten okunur; eksik olanlar `compute_image_vectors`
+        ile (embedding sunucusu veya yerel model) batch halinde çıkarılır.
+        Dönen liste giriş sırasıyla aynıdır; her öğe `process_image` ile aynı
+        biçimdedir.
+        """
+        if not items:
+            return []
+        
+        embeddings = self._embed_images(
+            [item['image_path'] for item in items], batch_size=batch_size
+        )
+        
+        # Milvus koleksiyonunu oluştur (yoksa)
+        self.milvus.create_collection()
+        
+        results = []
+        for item, embedding in zip(items, embeddings):
+            if embedding['error'] or embedding['vector'] is None:
+                results.append({
+                    'success': False,
+                    'error': embedding['error'] or 'Feature extraction failed',
+                })
+                continue
+            try:
+                results.append(self._store_features(
+                    embedding['vector'],
+                    image_path=item['image_path'],
+                    user_id=item['user_id'],
+                    description=item.get('description', ''),
+                    metadata=item.get('metadata'),
+                ))
+            except Exception as e:
+                results.append({'success': False, 'error': str(e)})
+        return results
+    
+    def _store_features(self, features, image_path: str, user_id: str,
+                        description: str = "", metadata: Optional[dict] = None) -> dict:
+        """Çıkarılmış vektörü Milvus'a ve ImageVector tablosuna kaydet"""
+        # Benzersiz ID oluştur
+        import uuid
+        vector_id = str(uuid.uuid4())
+        
+        # Vektörü ekle
+        success = self.milvus.insert_vector(
+            vector_id=vector_id,
+            vector=features,
+            user_id=user_id,
+            image_path=image_path,
+            description=description,
+            metadata=metadata,
+        )
+        
+        if not success:
+            return {'success': False, 'error': 'Vector insertion failed'}
+        
+        # Django DB: ImageVector kaydet
+        from django.contrib.auth import get_user_model
+        User = get_user_model()
+        try:
+            user = User.objects.get(id=int(user_id))
+        except (User.DoesNotExist, ValueError):
+            return {'success': False, 'error': f'User with id {user_id} not found'}
+        
+        image_vector = ImageVector.objects.create(
+            user=user,
+            image_path=image_path,
+            vector_id=vector_id,
+            description=description,
+            model_name=self.model.key,
+            model_version=self.model.version,
+            # İlan görseliyse kayıt ilana bağlanır (metadata['post_id'], bkz. post_vector_metadata)
+            post_id=(metadata or {}).get('post_id'),
+        )
+        # MongoDB log
+        try:
+            logs = get_collection('image_processing_logs')
+            logs.insert_one({
+                'event': 'process_image',
+                'user_id': user_id,
+                'vector_id': vector_id,
+                'image_path': image_path,
+                'description': description,
+                'features_count': len(features),
+                'model': self.model.identity,
+                'created_at': timezone.now().isoformat()
+            })
+        except Exception:
+            pass
+        return {
+            'success': True,
+            'vector_id': vector_id,
+            'image_vector_id': str(image_vector.id),
+            'features_count': len(features),
+            'model': self.model.identity,
+        }
+    
+    def find_similar_images(self, image_path: str, top_k: int = 10, source_vector_id: Optional[str] = None,
+                            filters: Optional[dict] = None) -> List[dict]:
+        """Benzer görüntüleri bul (filters: bkz. `MilvusService.search_similar`)"""
         try:
-            # CLIP ile özellik vektörünü çıkar
-            features = image_to_clip_vector(image_path)
-            if not features:
+            # CLIP ile özellik vektörünü çıkar (önbellekte varsa yeniden hesaplanmaz)
+            features = self._embed_image(image_path)
+            if features is None:
                 return []
             
             # Benzer vektörleri ara
-            matches = self.milvus.search_similar(features, top_k)
-            # MongoDB log (search)
-            try:
-                logs = get_collection('image_processing_logs')
-                logs.insert_one({
-                    'event': 'find_similar_images',
-                    'image_path': image_path,
-                    'top_k': top_k,
-                    'results': len(matches),
-                    'created_at': timezone.now().isoformat()
-                })
-            except Exception:
-                pass
+            matches = self.milvus.search_similar(features, top_k, filters=filters)
+            self._log_search('find_similar_images', top_k, matches, image_path=image_path)
 
             # Eşleşmeleri veritabanına yaz (varsa kaynak vector)
             if source_vector_id:
-                try:
-                    source_vector = ImageVector.objects.get(vector_id=source_vector_id)
-                    for m in matches:
-                        try:
-                            target_vector = ImageVector.objects.filter(vector_id=m.get('id')).first()
-                            if not target_vector:
-                                continue
-                            ImageMatch.objects.get_or_create(
-                                source_vector=source_vector,
-                                target_vector=target_vector,
-                                defaults={
-                                    'similarity_score': float(m.get('similarity', 0.0)),
-                                    'match_confidence': max(0.0, min(1.0, float(m.get('similarity', 0.0))))
-                                }
-                            )
-                        except Exception:
-                            continue
-                except ImageVector.DoesNotExist:
-                    pass
+                self._record_matches(source_vector_id, matches)
 
             return matches
             
@@ -302,6 +764,256 @@ class ImageMatchingService:
             print(f"Similar image search error: {e}")
             return []
     
+    def find_similar_by_vector_id(self, vector_id: str, top_k: int = 10, filters: Optional[dict] = None,
+                                  record_matches: bool = False) -> List[dict]:
+        """
+        Kayıtlı vektörle benzer görüntüleri bul (görüntü dosyası okunmaz, CLIP çalışmaz).
+        
+        Sonuçlar `find_similar_images` ile aynı biçimdedir ve kaynak vektörün
+        kendisini de içerebilir. record_matches=True ise sonuçlar ImageMatch
+        olarak kaydedilir. Vektör bulunamazsa boş liste döner.
+        """
+        try:
+            # Kaynak vektör önce filtrelenen şehrin bölümünde aranır, yoksa tüm koleksiyonda
+            city = (filters or {}).get('city')
+            features = None
+            if city is not None:
+                features = self.milvus.get_vectors([vector_id], cities=[city]).get(vector_id)
+            if features is None:
+                features = self.milvus.get_vectors([vector_id]).get(vector_id)
+            if features is None:
+                print(f"Vektör bulunamadı: {vector_id}")
+                return []
+            
+            matches = self.milvus.search_similar(features, top_k, filters=filters)
+            self._log_search('find_similar_by_vector_id', top_k, matches, vector_id=vector_id)
+            
+            if record_matches:
+                self._record_matches(vector_id, matches)
+            
+            return matches
+            
+        except Exception as e:
+            print(f"Similar image search error: {e}")
+            return []
+    
+    def find_similar_by_vector_ids(self, vector_ids: List[str], top_k: int = 10, filters=None,
+                                   batch_size: Optional[int] = None) -> dict:
+        """
+        `find_similar_by_vector_id`in toplu hali: {vector_id: [eşleşmeler]}.
+        
+        filters: tüm sorgular için tek sözlük veya vector_ids sırasıyla sorgu
+        başına sözlük listesi. Kaynak vektörler tek seferde getirilir, aramalar
+        `batch_size`lık parçalar halinde çok sorgulu RPC ile yapılır
+        (varsayılan: VECTOR_SEARCH_BATCH_SIZE). Vektörü bulunamayan id'ler
+        sonuçta yer almaz.
+        """
+        if isinstance(filters, (list, tuple)):
+            filters_by_id = dict(zip(vector_ids, filters))
+        else:
+            filters_by_id = {vector_id: filters for vector_id in vector_ids}
+        try:
+            cities = {(f or {}).get('city') for f in filters_by_id.values()}
+            features = self.milvus.get_vectors(
+                list(filters_by_id), cities=None if None in cities else sorted(cities)
+            )
+            missing = [vector_id for vector_id in filters_by_id if vector_id not in features]
+            if missing:
+                # Filtrelenen şehrin bölümünde olmayanlar tüm koleksiyonda aranır
+                features.update(self.milvus.get_vectors(missing))
+            found = [vector_id for vector_id in filters_by_id if vector_id in features]
+            results = self.milvus.search_similar_batch(
+                [features[vector_id] for vector_id in found],
+                top_k,
+                filters=[filters_by_id[vector_id] for vector_id in found],
+                batch_size=batch_size,
+            )
+            self._log_search('find_similar_by_vector_ids', top_k, [m for matches in results for m in matches],
+                             queries=len(found))
+            return dict(zip(found, results))
+        except Exception as e:
+            print(f"Similar image search error: {e}")
+            return {}
+    
+    def _log_search(self, event: str, top_k: int, matches: List[dict], **fields) -> None:
+        """MongoDB log (search)"""
+        try:
+            logs = get_collection('image_processing_logs')
+            logs.insert_one({
+                'event': event,
+                **fields,
+                'top_k': top_k,
+                'results': len(matches),
+                'created_at': timezone.now().isoformat()
+            })
+        except Exception:
+            pass
+    
+    def _record_matches(self, source_vector_id: str, matches: List[dict]) -> None:
+        """Arama sonuçlarını kaynak vektör için ImageMatch olarak kaydet"""
+        try:
+            source_vector = ImageVector.objects.get(vector_id=source_vector_id)
+        except ImageVector.DoesNotExist:
+            return
+        for m in matches:
+            try:
+                target_vector = ImageVector.objects.filter(vector_id=m.get('id')).first()
+                if not target_vector:
+                    continue
+                ImageMatch.objects.get_or_create(
+                    source_vector=source_vector,
+                    target_vector=target_vector,
+                    defaults={
+                        'similarity_score': float(m.get('similarity', 0.0)),
+                        'match_confidence': max(0.0, min(1.0, float(m.get('similarity', 0.0))))
+                    }
+                )
+            except Exception:
+                continue
+    
+    def restore_vector(self, image_vector: ImageVector, metadata: Optional[dict] = None) -> bool:
+        """
+        Daha önce indeksten kaldırılmış vektörü aynı vector_id ile geri ekle
+        (ilan yeniden aktif olduğunda). Vektör önbellekten okunur, yoksa
+        görüntü yeniden vektörlenir.
+        """
+        try:
+            features = self._embed_image(image_vector.image_path)
+            self.milvus.create_collection()
+            return self.milvus.insert_vector(
+                vector_id=image_vector.vector_id,
+                vector=features,
+                user_id=str(image_vector.user_id),
+                image_path=image_vector.image_path,
+                description=image_vector.description or "",
+                metadata=metadata,
+            )
+        except Exception as e:
+            print(f"Vector restore error ({image_vector.vector_id}): {e}")
+            return False
+    
+    def refresh_vectors(self, image_vectors: List[ImageVector], metadata: Optional[dict] = None) -> int:
+        """
+        İlan düzenlendi: vektörleri aynı vector_id ile yeni meta veriyle yeniden yaz.
+
+        Vektör depodan okunur (bulunamazsa görüntü önbellekten / yeniden
+        vektörlenir); satır silinip tekrar eklendiği için şehir değiştiyse
+        yeni şehrin bölümüne taşınır. Dönen değer yeniden yazılan vektör sayısı.
+        """
+        if not image_vectors:
+            return 0
+        stored = self.milvus.get_vectors([image_vector.vector_id for image_vector in image_vectors])
+        rows = []
+        for image_vector in image_vectors:
+            features = stored.get(image_vector.vector_id)
+            if features is None:
+                try:
+                    features = self._embed_image(image_vector.image_path)
+                except Exception as e:
+                    print(f"Vector refresh error ({image_vector.vector_id}): {e}")
+                    continue
+            rows.append((image_vector, features))
+        if not rows or not self.milvus.delete_vectors([image_vector.vector_id for image_vector, _ in rows]):
+            return 0
+        
+        refreshed = 0
+        for image_vector, features in rows:
+            if self.milvus.insert_vector(
+                vector_id=image_vector.vector_id,
+                vector=features,
+                user_id=str(image_vector.user_id),
+                image_path=image_vector.image_path,
+                description=image_vector.description or "",
+                metadata=metadata,
+            ):
+                refreshed += 1
+            else:
+                print(f"Vector refresh error ({image_vector.vector_id}): yeniden eklenemedi")
+        return refreshed
+    
+    def search_by_text(self, query: str, top_k: int = 100,
+                       filters: Optional[dict] = None) -> List[dict]:
+        """
+        Metin sorgusuna en yakın görüntüleri bul (CLIP metin -> görüntü araması).
+
+        filters: `search_similar` skaler filtreleri, örn. {'status': 'active'};
+            top_k sadece filtreye uyan vektörlerden seçilir.
+        Sonuçlar `search_similar` biçimindedir ve benzerliğe göre azalan sıradadır.
+        """
+        try:
+            features = self.model.embed_text(query)
+            return self.milvus.search_similar(features, top_k, filters=filters)
+        except Exception as e:
+            print(f"Semantic text search error: {e}")
+            return []
+    
     def get_image_objects(self, image_path: str) -> List[dict]:
         """Nesne tespiti şu an devre dışı (Cloud Vision kaldırıldı)."""
         return []
+
+
+class FaceMatchingService:
+    """
+    Yüz embedding'leri ile kişi (kayıp çocuk) eşleştirme servisi.
+
+    Vektörler `PERSON_COLLECTION` koleksiyonunda ilan ID'si ile tutulur;
+    benzerlik doğrudan bu koleksiyonda, hedef ilanla sınırlı arama ile bulunur.
+    """
+    
+    def index_faces(self, items: List[dict]) -> List[dict]:
+        """
+        İlan görsellerindeki yüzleri toplu olarak çıkar ve kişi koleksiyonuna yaz.
+        
+        items: [{'ilan_id': int, 'image_path': str}, ...]
+        Dönen liste giriş sırasındadır: {'success': bool, 'has_face': bool, 'error': str | None}
+        """
+        from .face_utils import get_face_embeddings
+        from .milvus_connector import PERSON_COLLECTION, delete_vectors, insert_vectors
+        
+        if not items:
+            return []
+        
+        embeddings = get_face_embeddings([item['image_path'] for item in items])
+        results = []
+        vectors, ilan_ids = [], []
+        for item, embedding in zip(items, embeddings):
+            if embedding['error']:
+                results.append({'success': False, 'has_face': False, 'error': embedding['error']})
+                continue
+            if not embedding['has_face']:
+                results.append({'success': False, 'has_face': False, 'error': 'No face detected'})
+                continue
+            # Aynı ilan tekrar indekslenirse eski yüz vektörü kalmasın
+            delete_vectors(PERSON_COLLECTION, item['ilan_id'])
+            vectors.append(embedding['vector'])
+            ilan_ids.append(item['ilan_id'])
+            results.append({'success': True, 'has_face': True, 'error': None})
+        
+        if vectors and not insert_vectors(PERSON_COLLECTION, vectors, ilan_ids):
+            for result in results:
+                if result['success']:
+                    result.update({'success': False, 'error': 'Vector insertion failed'})
+        return results
+    
+    def index_face(self, ilan_id: int, image_path: str) -> dict:
+        """Tek ilan için `index_faces`."""
+        return self.index_faces([{'ilan_id': ilan_id, 'image_path': image_path}])[0]
+    
+    def face_similarity(self, image_path: str, target_ilan_id: int) -> Optional[float]:
+        """
+        Görseldeki yüz ile hedef ilanın kayıtlı yüzü arasındaki benzerlik (0-1).
+        
+        Görselde yüz yoksa veya hedef ilanın yüz vektörü yoksa None döner;
+        çağıran taraf genel görüntü benzerliğine (CLIP) geri düşebilir.
+        """
+        from .face_utils import get_face_embedding
+        from .milvus_connector import PERSON_COLLECTION, score_to_similarity, search_vectors
+        
+        has_face, vector = get_face_embedding(image_path)
+        if not has_face:
+            return None
+        hits = search_vectors(PERSON_COLLECTION, vector, top_k=1, expr=f"ilan_id == {int(target_ilan_id)}")
+        if not hits:
+            return None
+        # Ham skor koleksiyonun gerçek metriğine göre (IP veya eski L2) CLIP ile aynı 0-1 ölçeğine taşınır
+        return score_to_similarity(hits[0]['score'], hits[0]['metric'])
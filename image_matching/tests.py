@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from image_matching import embedding_server
+from image_matching.embedding_server import EmbeddingClient, EmbeddingServer
+from image_matching.model_registry import get_model_registry
+
+
+def _fake_worker_init(backend_name, backend_options):
+    """Test işçisi model yüklemez."""
+
+
+def _fake_worker_task(paths, batch_size):
+    """"crash" yolu işçi süreci öldürür (OOM / native çökme gibi); diğerleri boş vektör döner."""
+    if "crash" in paths:
+        os._exit(1)
+    return [{"image_path": path, "vector": None, "error": None} for path in paths]
+
+
+def _fake_text_task(texts, text_options):
+    """Metin uzunluğu ilk bileşende; sunucudan geldiği test tarafında doğrulanabilir."""
+    from image_matching.vectors import to_bytes
+
+    return [
+        {"text": text, "vector": to_bytes([float(len(text)), 1.0, 0.0, 0.0]), "error": None}
+        for text in texts
+    ]
+
+
+class _FakeEmbeddingServer(EmbeddingServer):
+    worker_initializer = staticmethod(_fake_worker_init)
+    worker_task = staticmethod(_fake_worker_task)
+    text_worker_task = staticmethod(_fake_text_task)
+
+
+class _EmbeddingServerTestCase(SimpleTestCase):
+    """Sahte işçilerle (model yüklemeden) gerçek süreç havuzu kullanan sunucu."""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        address = f"unix:{os.path.join(self.directory, 'embedding.sock')}"
+        self.server = _FakeEmbeddingServer(
+            address, backend_name="fake", backend_options={}, workers=1,
+            max_wait_ms=0, authkey=b"test", task_timeout=2.0, log=lambda message: None,
+        )
+        thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(self.server.stop)
+        self.address = address
+        self.client = EmbeddingClient(address, authkey=b"test", timeout=10.0)
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                self.client.ping()
+                break
+            except ConnectionError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+
+
+class EmbeddingServerWorkerCrashTests(_EmbeddingServerTestCase):
+    """Ölen işçinin batch'i sunucuyu ve bekleyen bağlantıyı kilitlememeli."""
+
+    def test_crashed_worker_fails_batch_and_frees_worker(self):
+        started = time.monotonic()
+        results = self.client.embed(["crash", "a.jpg"])
+        self.assertLess(time.monotonic() - started, 10.0)
+        self.assertEqual([result["image_path"] for result in results], ["crash", "a.jpg"])
+        self.assertTrue(all(result["vector"] is None and result["error"] for result in results))
+        self.assertEqual(self.server.stats["timeouts"], 1)
+
+        # Tek işçi yuvası serbest bırakılmış olmalı: havuzun yeni işçisi sonraki batch'i işler
+        for _ in range(2):
+            results = self.client.embed(["b.jpg"])
+            self.assertEqual(results, [{"image_path": "b.jpg", "vector": None, "error": None}])
+
+
+class EmbeddingServerTextTests(_EmbeddingServerTestCase):
+    """Anlamsal arama sorguları da sunucuda vektörlenmeli; web süreci CLIP yüklememeli."""
+
+    def test_embed_texts_returns_vectors_in_order(self):
+        results = self.client.embed_texts(["siyah cüzdan", "anahtar"])
+        self.assertEqual([result["text"] for result in results], ["siyah cüzdan", "anahtar"])
+        self.assertEqual([float(result["vector"][0]) for result in results], [12.0, 7.0])
+        self.assertEqual(self.server.stats["texts"], 2)
+
+    def test_model_embed_text_uses_server(self):
+        self.addCleanup(setattr, embedding_server, "_client", None)
+        embedding_server._client = None
+        model = get_model_registry().get()
+        with override_settings(
+            EMBEDDING_SERVER_ENABLED=True, EMBEDDING_SERVER_ADDRESS=self.address,
+            EMBEDDING_SERVER_AUTHKEY="test", EMBEDDING_SERVER_FALLBACK_LOCAL=False,
+        ), mock.patch("image_matching.utils.text_to_clip_vector") as local_clip:
+            vector = model.embed_text("kırmızı sırt çantası sunucu testi")
+        local_clip.assert_not_called()
+        self.assertEqual(float(vector[0]), float(len("kırmızı sırt çantası sunucu testi")))
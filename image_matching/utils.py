@@ -10,29 +10,139 @@ Kullanım örneği:
 
     vec = image_to_clip_vector("media/example.jpg")
 
+    # Toplu vektörleme (toplu yeniden indeksleme komutları için)
+    results = image_to_clip_vectors(["a.jpg", "b.jpg"], batch_size=32)
+
+    # Metin sorgusu (anlamsal arama için, görüntülerle aynı vektör uzayı)
+    query = text_to_clip_vector("siyah deri cüzdan")
+
+Büyük telefon fotoğraflarında (12MP+) tam çözünürlükte decode maliyetli
+olduğundan JPEG'ler "draft" modunda (DCT ölçekleme ile 1/2, 1/4, 1/8)
+açılır; model girişi 224px olduğu için doğruluk etkilenmez. İsteğe bağlı
+olarak yükleme sırasında küçültülmüş bir model girişi kopyası
+(`make_clip_input_derivative`) üretilir ve sonraki vektörlemelerde o okunur.
+
+PyTorch ve open_clip bu modül import edilirken değil, model ilk kez
+yüklendiğinde import edilir. Böylece vektörleme yapmayan manage.py komutları,
+Celery ve web işçileri torch'un import maliyetini ödemez.
+
 Gereken paketler:
     pip install open-clip-torch torch torchvision pillow
+    pip install onnxruntime  # sadece CLIP_BACKEND=onnx / onnx-int8 için
 """
 
+import os
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
-from typing import List, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Tuple
 
 from PIL import Image
-import torch
 
+from .embedding_backends import get_clip_backend
+
+if TYPE_CHECKING:  # pragma: no cover - sadece tip kontrolü
+    import numpy as np
+    import torch
+
+
+# CLIP ViT-B-32 giriş çözünürlüğü
+CLIP_INPUT_SIZE = 224
+# Küçültülmüş giriş kopyalarının tutulduğu alt klasör (orijinal görüntünün yanında)
+DERIVATIVE_DIRNAME = "_clip"
+
+
+def _setting(name: str, default):
+    """Django ayarını oku; ayarlar yüklü değilse varsayılanı döndür."""
+    try:
+        from django.conf import settings
+
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+def clip_input_path(image_path: str) -> str:
+    """Görüntünün küçültülmüş model girişi kopyasının yolu."""
+    directory, filename = os.path.split(image_path)
+    return os.path.join(directory, DERIVATIVE_DIRNAME, f"{filename}.jpg")
+
+
+def make_clip_input_derivative(image_path: str, output_path: str | None = None,
+                               size: int = CLIP_INPUT_SIZE) -> str:
+    """
+    Görüntünün kısa kenarı `size` olacak şekilde küçültülmüş JPEG kopyasını üret.
+
+    Yükleme anında bir kez çalıştırılır; sonraki vektörlemeler 12MP yerine
+    ~0.05MP'lik bu dosyayı decode eder.
+    """
+    output_path = output_path or clip_input_path(image_path)
+    img = Image.open(image_path)
+    img.draft("RGB", (size, size))
+    img = img.convert("RGB")
+
+    width, height = img.size
+    scale = size / min(width, height)
+    if scale < 1:
+        img = img.resize(
+            (max(size, round(width * scale)), max(size, round(height * scale))),
+            Image.BICUBIC,
+        )
 
-@lru_cache(maxsize=1)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    img.save(tmp_path, "JPEG", quality=95)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def open_image_for_clip(image_path: str, size: int = CLIP_INPUT_SIZE,
+                        use_derivative: bool | None = None) -> Image.Image:
+    """
+    Görüntüyü CLIP ön işlemesi için RGB olarak aç.
+
+    - Güncel bir küçültülmüş kopya varsa (CLIP_INPUT_DERIVATIVES) o okunur.
+    - JPEG'ler draft modunda, her iki kenarı da `size`'dan küçük olmayacak en
+      düşük ölçekte decode edilir (CLIP_DRAFT_DECODE).
+    """
+    if use_derivative is None:
+        use_derivative = _setting("CLIP_INPUT_DERIVATIVES", False)
+    if use_derivative:
+        derivative = clip_input_path(image_path)
+        try:
+            if os.path.getmtime(derivative) >= os.path.getmtime(image_path):
+                image_path = derivative
+        except OSError:
+            pass
+
+    img = Image.open(image_path)
+    if _setting("CLIP_DRAFT_DECODE", True):
+        # Sadece JPEG decoder'ı destekler; diğer formatlarda etkisizdir
+        img.draft("RGB", (size, size))
+    return img.convert("RGB")
+
+
+def decode_variant() -> str:
+    """Önbellek anahtarı için decode yolunun kısa adı."""
+    if _setting("CLIP_INPUT_DERIVATIVES", False):
+        return "derivative"
+    return "draft" if _setting("CLIP_DRAFT_DECODE", True) else "full"
+
+
+# Her (model, ön-eğitim, cihaz) üçlüsü ayrı tutulur; bkz. model_registry.py
+@lru_cache(maxsize=None)
 def _load_clip_model(
     model_name: str = "ViT-B-32",
     pretrained: str = "openai",
     device: str | None = None,
-) -> Tuple[torch.nn.Module, callable, torch.device]:
+) -> Tuple["torch.nn.Module", callable, "torch.device"]:
     """
     CLIP modelini tek sefer yükle ve cache et.
 
     - model_name: CLIP mimarisi (örn: ViT-B-32, ViT-L-14 vb.)
     - pretrained: open-clip için ön-eğitim seti adı (örn: openai, laion2b_s34b_b79k)
     """
+    import torch
+
     try:
         import open_clip  # type: ignore
     except ImportError as exc:  # pragma: no cover - sadece runtime uyarısı
@@ -58,31 +168,150 @@ def image_to_clip_vector(
     model_name: str = "ViT-B-32",
     pretrained: str = "openai",
     device: str | None = None,
-) -> List[float]:
+    backend: str | None = None,
+) -> "np.ndarray":
     """
     Verilen görüntü dosyasını CLIP embedding vektörüne çevir.
 
+    - backend: "torch" | "onnx" | "onnx-int8" (None ise settings.CLIP_BACKEND)
+
     Dönen değer:
-        - normalize edilmiş (L2 normu 1 olan) vektör (list[float])
+        - normalize edilmiş (L2 normu 1 olan) float16 vektör (bkz. vectors.py)
     """
-    model, preprocess, dev = _load_clip_model(
-        model_name=model_name, pretrained=pretrained, device=device
-    )
+    clip_backend = get_clip_backend(backend, model_name, pretrained, device)
 
     # Görüntüyü yükle ve CLIP preprocess'inden geçir
-    img = Image.open(image_path).convert("RGB")
-    img_tensor = preprocess(img).unsqueeze(0).to(dev)
+    img = open_image_for_clip(image_path)
+    return clip_backend.encode([clip_backend.preprocess(img)])[0]
+
 
+def _load_and_preprocess(image_path: str, preprocess: callable):
+    """Görüntüyü diskten oku ve CLIP girişine çevir (batch boyutu olmadan)."""
+    img = open_image_for_clip(image_path)
+    return preprocess(img)
+
+
+def image_to_clip_vectors(
+    image_paths: Sequence[str],
+    batch_size: int = 32,
+    num_workers: Optional[int] = None,
+    model_name: str = "ViT-B-32",
+    pretrained: str = "openai",
+    device: str | None = None,
+    backend: str | None = None,
+) -> List[Dict]:
+    """
+    Birden fazla görüntüyü toplu (batch) olarak CLIP embedding vektörüne çevir.
+
+    Görüntüler iş parçacıklarında paralel olarak açılıp ön işlenir, model ise
+    `batch_size` boyutunda yığılmış girişler üzerinde çalıştırılır.
+
+    Dönen değer, giriş sırasıyla aynı sırada sözlük listesidir:
+        {'image_path': str, 'vector': np.ndarray | None, 'error': str | None}
+
+    Bir görüntü okunamazsa sadece o görüntü için `error` doldurulur,
+    diğer görüntüler işlenmeye devam eder.
+    """
+    if not image_paths:
+        return []
+    clip_backend = get_clip_backend(backend, model_name, pretrained, device)
+    return embed_images_with_backend(
+        clip_backend, image_paths, batch_size=batch_size, num_workers=num_workers
+    )
+
+
+def embed_images_with_backend(
+    clip_backend,
+    image_paths: Sequence[str],
+    batch_size: int = 32,
+    num_workers: Optional[int] = None,
+) -> List[Dict]:
+    """
+    `image_to_clip_vectors` çekirdeği: verilen backend örneği ile toplu vektörleme.
+
+    Embedding sunucusu işçileri de kendi backend örnekleriyle bunu kullanır.
+    """
+    results: List[Dict] = [
+        {"image_path": path, "vector": None, "error": None} for path in image_paths
+    ]
+    if not results:
+        return results
+
+    if num_workers is None:
+        num_workers = min(8, os.cpu_count() or 1)
+    batch_size = max(1, batch_size)
+
+    def _safe_preprocess(index: int):
+        try:
+            return index, _load_and_preprocess(image_paths[index], clip_backend.preprocess), None
+        except Exception as exc:
+            return index, None, str(exc)
+
+    with ThreadPoolExecutor(max_workers=max(1, num_workers)) as executor:
+        for start in range(0, len(results), batch_size):
+            indices = range(start, min(start + batch_size, len(results)))
+
+            inputs = []
+            input_indices = []
+            for index, item, error in executor.map(_safe_preprocess, indices):
+                if error is not None:
+                    results[index]["error"] = error
+                    continue
+                inputs.append(item)
+                input_indices.append(index)
+
+            if not inputs:
+                continue
+
+            try:
+                vectors = clip_backend.encode(inputs)
+            except Exception as exc:
+                for index in input_indices:
+                    results[index]["error"] = str(exc)
+                continue
+
+            for index, vector in zip(input_indices, vectors):
+                results[index]["vector"] = vector
+
+    return results
+
+
+@lru_cache(maxsize=None)
+def _load_clip_tokenizer(model_name: str = "ViT-B-32"):
+    """Model mimarisine ait CLIP tokenizer'ını tek sefer yükle."""
+    import open_clip  # type: ignore
+
+    return open_clip.get_tokenizer(model_name)
+
+
+def text_to_clip_vector(
+    text: str,
+    model_name: str = "ViT-B-32",
+    pretrained: str = "openai",
+    device: str | None = None,
+) -> "np.ndarray":
+    """
+    Metni CLIP metin kulesi ile görüntü vektörleriyle aynı uzaya taşı.
+
+    ONNX backend'leri sadece görsel kuleyi içerdiğinden metin kodlama her
+    zaman open_clip + PyTorch ile yapılır.
+
+    Dönen değer:
+        - normalize edilmiş (L2 normu 1 olan) float16 vektör
+    """
+    import torch
+
+    from .vectors import as_vector
+
+    model, _, dev = _load_clip_model(model_name=model_name, pretrained=pretrained, device=device)
+    tokens = _load_clip_tokenizer(model_name)([text]).to(dev)
     with torch.no_grad():
-        features = model.encode_image(img_tensor)
-        # Normalize et (Milvus / benzerlik aramalarında genelde iyi pratik)
+        features = model.encode_text(tokens)
         features = features / features.norm(dim=-1, keepdim=True)
-
-    # Tek boyutlu Python listesine çevir
-    return features.squeeze(0).cpu().tolist()
+    return as_vector(features[0].cpu().numpy())
 
 
-def vectorize_object_clip(image_path: str) -> List[float] | None:
+def vectorize_object_clip(image_path: str) -> "np.ndarray | None":
     """
     Dış API'ler tarafından kullanılmak üzere, CLIP tabanlı
     nesne vektörleme için basit bir sarmalayıcı.
@@ -0,0 +1,329 @@
+"""
+İlan yaşam döngüsüne göre görüntü vektörlerinin indeksten kaldırılması.
+
+İlan `active` durumundan çıktığında (çözüldü / kapandı) vektörleri aramalarda
+boşuna aday olmasın diye indeksten silinir; ImageVector kaydı eşleşme
+geçmişi için `is_found=True` ile işaretlenip tutulur. İlan yeniden aktif
+olursa vektör aynı vector_id ile geri eklenir. İlanın şehri, başlığı,
+açıklaması veya çocuk bayrağı değişirse vektörler yeni meta veriyle yeniden
+yazılır (`refresh_vectors`). İlan silindiğinde ImageVector
+kayıtları (ve bağlı ImageMatch'ler) `ImageVector.post` üzerinden CASCADE ile
+silinir; indeks satırları silme öncesi toplanan id'lerle kuyruğa alınır.
+
+Silmeler istek yolunda RPC yapmaz: `VectorDeleter` id'leri model başına
+biriktirir ve arka planda toplu olarak siler
+
+    - kuyruk `VECTOR_DELETE_BATCH_ROWS` id'ye ulaşınca hemen,
+    - aksi halde ilk id'den en geç `VECTOR_DELETE_BATCH_SECONDS` sonra.
+
+Sinyalleri atlayan güncellemeler (örn. `QuerySet.update`) için
+`python manage.py reconcile_vectors --fix` periyodik olarak çalıştırılır.
+
+Kullanım örneği:
+
+    from image_matching.vector_lifecycle import deactivate_vectors
+
+    deactivate_vectors(post.id, include_face=post.is_missing_child)
+"""
+
+import atexit
+import os
+import threading
+from typing import Dict, Iterable, Optional, Set
+
+from .models import ImageVector
+
+
+def _setting(name: str, default):
+    try:
+        from django.conf import settings
+
+        return getattr(settings, name, default)
+    except Exception:
+        return default
+
+
+class VectorDeleter:
+    """İndeksten silinecek vektör id'lerini biriktirip toplu silen kuyruk."""
+
+    def __init__(self, max_rows: int = 256, max_delay: float = 2.0):
+        self.max_rows = max(1, int(max_rows))
+        self.max_delay = float(max_delay)
+        self._lock = threading.RLock()
+        # Embedding modeli anahtarı -> silinecek vector_id'ler
+        self._pending: Dict[str, Set[str]] = {}
+        # Kişi (yüz) koleksiyonundan silinecek ilan id'leri
+        self._faces: Set[int] = set()
+        self._timer: Optional[threading.Timer] = None
+        self._pid = os.getpid()
+
+    def __len__(self) -> int:
+        return sum(len(ids) for ids in self._pending.values()) + len(self._faces)
+
+    def _reset_after_fork(self) -> None:
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._pending = {}
+            self._faces = set()
+            self._timer = None
+
+    def schedule(self, model_key: str, vector_ids: Iterable[str]) -> None:
+        """Vektörleri silme kuyruğuna ekle."""
+        self._reset_after_fork()
+        with self._lock:
+            self._pending.setdefault(model_key, set()).update(vector_id for vector_id in vector_ids if vector_id)
+            self._after_schedule()
+
+    def schedule_faces(self, ilan_ids: Iterable[int]) -> None:
+        """İlanların yüz vektörlerini silme kuyruğuna ekle."""
+        self._reset_after_fork()
+        with self._lock:
+            self._faces.update(int(ilan_id) for ilan_id in ilan_ids)
+            self._after_schedule()
+
+    def cancel(self, model_key: str, vector_ids: Iterable[str]) -> Set[str]:
+        """
+        Henüz silinmemiş vektörleri kuyruktan çıkar (ilan yeniden aktif oldu).
+        Dönen küme: kuyruktan çıkarılan, yani indekste hâlâ duran id'ler.
+        """
+        self._reset_after_fork()
+        with self._lock:
+            pending = self._pending.get(model_key, set())
+            cancelled = pending.intersection(vector_ids)
+            pending.difference_update(cancelled)
+            return cancelled
+
+    def cancel_faces(self, ilan_ids: Iterable[int]) -> Set[int]:
+        """`cancel` ile aynı, yüz vektörleri için."""
+        self._reset_after_fork()
+        with self._lock:
+            cancelled = self._faces.intersection(int(ilan_id) for ilan_id in ilan_ids)
+            self._faces.difference_update(cancelled)
+            return cancelled
+
+    def _after_schedule(self) -> None:
+        if len(self) >= self.max_rows or self.max_delay <= 0:
+            self.flush()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.max_delay, self._on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _on_timer(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Kuyruktaki tüm silmeleri yap; başarısız olanlar kuyrukta kalır. Dönen: silinen sayısı."""
+        from .milvus_connector import PERSON_COLLECTION, delete_vectors
+        from .model_registry import get_model_registry
+        from .services import get_vector_service
+
+        self._reset_after_fork()
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            pending, self._pending = self._pending, {}
+            faces, self._faces = self._faces, set()
+
+            deleted = 0
+            failed = False
+            for model_key, ids in pending.items():
+                if not ids:
+                    continue
+                try:
+                    model = get_model_registry().get(model_key)
+                    ok = get_vector_service(model.collection, model.dim).delete_vectors(sorted(ids))
+                except KeyError as e:
+                    # Artık yapılandırmada olmayan model: koleksiyonu da kullanılmıyor
+                    print(f"Vektör silme atlandı: {e}")
+                    continue
+                if ok:
+                    deleted += len(ids)
+                else:
+                    self._pending.setdefault(model_key, set()).update(ids)
+                    failed = True
+            for ilan_id in faces:
+                if delete_vectors(PERSON_COLLECTION, ilan_id):
+                    deleted += 1
+                else:
+                    self._faces.add(ilan_id)
+                    failed = True
+            if failed and self._timer is None and self.max_delay > 0:
+                # Sonraki denemede tekrar silinsin
+                self._timer = threading.Timer(self.max_delay, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+            return deleted
+
+
+_deleter: Optional[VectorDeleter] = None
+_deleter_lock = threading.Lock()
+
+
+def get_vector_deleter() -> VectorDeleter:
+    """Süreç genelinde tek silme kuyruğu (boyut/süre ayarlardan okunur)."""
+    global _deleter
+    if _deleter is None:
+        with _deleter_lock:
+            if _deleter is None:
+                _deleter = VectorDeleter(
+                    max_rows=_setting("VECTOR_DELETE_BATCH_ROWS", 256),
+                    max_delay=_setting("VECTOR_DELETE_BATCH_SECONDS", 2.0),
+                )
+    return _deleter
+
+
+def _flush_at_exit() -> None:
+    if _deleter is not None and len(_deleter):
+        _deleter.flush()
+
+
+atexit.register(_flush_at_exit)
+
+
+def vectors_for_post(post_id: int):
+    """İlana ait ImageVector kayıtları (tüm modeller; `post` FK indeksiyle)."""
+    return ImageVector.objects.filter(post_id=post_id)
+
+
+def vector_ids_for_post(post_id: int) -> Dict[str, list]:
+    """İlanın vektör id'leri model anahtarına göre; silme öncesi toplanıp `purge_vectors`'a verilir."""
+    return _ids_by_model(vectors_for_post(post_id))
+
+
+def link_unlinked_vectors(vector_model=None, post_model=None, batch_size: int = 1000) -> int:
+    """
+    `post` bağlantısı olmayan ImageVector kayıtlarını görsel dosya adıyla ilanlara bağla.
+
+    Eşleme dosya adının tam eşitliğiyle, bellekte tek sözlükle yapılır (kayıt
+    başına sorgu yok). 0003 migration'ı bu mantığın sabitlenmiş bir kopyasını
+    içerir; burada yapılan değişiklikler geçmiş migration'ı etkilemez.
+    Dönen değer bağlanan kayıt sayısıdır.
+    """
+    if vector_model is None:
+        vector_model = ImageVector
+    if post_model is None:
+        from django.apps import apps
+
+        post_model = apps.get_model('accounts', 'ItemPost')
+
+    posts_by_filename: Dict[str, int] = {}
+    for post_id, image in post_model.objects.exclude(image__isnull=True).exclude(image='').values_list('id', 'image'):
+        posts_by_filename.setdefault(os.path.basename(str(image)), post_id)
+
+    pending: Dict[int, list] = {}
+    unlinked = vector_model.objects.filter(post__isnull=True).values_list('pk', 'image_path')
+    for pk, image_path in unlinked.iterator():
+        post_id = posts_by_filename.get(os.path.basename((image_path or '').replace('\\', '/')))
+        if post_id is not None:
+            pending.setdefault(post_id, []).append(pk)
+
+    linked = 0
+    for post_id, pks in pending.items():
+        for start in range(0, len(pks), batch_size):
+            linked += vector_model.objects.filter(pk__in=pks[start:start + batch_size]).update(post_id=post_id)
+    return linked
+
+
+def _ids_by_model(vectors) -> Dict[str, list]:
+    grouped: Dict[str, list] = {}
+    for model_key, vector_id in vectors.values_list('model_name', 'vector_id'):
+        # Boş model adı: varsayılan model (registry.get('') varsayılanı döndürür)
+        grouped.setdefault(model_key, []).append(vector_id)
+    return grouped
+
+
+def deactivate_vectors(post_id: int, include_face: bool = False) -> int:
+    """
+    İlan aktiflikten çıktı: vektörleri indeksten kaldır, kayıtları `is_found` işaretle.
+
+    include_face ile ilanın yüz vektörü de kişi koleksiyonundan silinir.
+    Dönen değer işaretlenen ImageVector sayısıdır.
+    """
+    vectors = vectors_for_post(post_id).filter(is_found=False)
+    deleter = get_vector_deleter()
+    grouped = _ids_by_model(vectors)
+    count = vectors.update(is_found=True)
+    for model_key, ids in grouped.items():
+        deleter.schedule(model_key, ids)
+    if include_face:
+        deleter.schedule_faces([post_id])
+    return count
+
+
+def restore_vectors(post_id: int, metadata: Optional[dict] = None) -> int:
+    """
+    İlan yeniden aktif oldu: `is_found` vektörleri aynı vector_id ile indekse geri ekle.
+
+    Silme henüz kuyruktaysa sadece iptal edilir (vektör indeksten hiç
+    çıkmamıştır). Dönen değer geri eklenen vektör sayısıdır. Yüz vektörü
+    çağıran tarafça (`FaceMatchingService.index_face`) yeniden üretilir.
+    """
+    from .services import ImageMatchingService
+
+    deleter = get_vector_deleter()
+    restored = 0
+    for image_vector in vectors_for_post(post_id).filter(is_found=True):
+        model_key = image_vector.model_name or None
+        if deleter.cancel(image_vector.model_name, [image_vector.vector_id]):
+            ImageVector.objects.filter(pk=image_vector.pk).update(is_found=False)
+            restored += 1
+            continue
+        try:
+            service = ImageMatchingService(model=model_key)
+        except KeyError as e:
+            print(f"Vektör geri eklenemedi: {e}")
+            continue
+        if service.restore_vector(image_vector, metadata):
+            ImageVector.objects.filter(pk=image_vector.pk).update(is_found=False)
+            restored += 1
+    return restored
+
+
+def refresh_vectors(post_id: int, metadata: Optional[dict] = None, description: Optional[str] = None) -> int:
+    """
+    İlan düzenlendi (şehir / başlık / açıklama / çocuk bayrağı): indeksteki
+    vektörleri yeni meta veriyle yeniden yaz, şehir değiştiyse bölüm taşınır.
+
+    İndeksten kaldırılmış (`is_found`) vektörler atlanır; geri eklenirken
+    `restore_vectors` güncel meta veriyi zaten yazar. description verilirse
+    ImageVector kayıtlarının açıklaması da güncellenir. Dönen değer yeniden
+    yazılan vektör sayısıdır.
+    """
+    from .services import ImageMatchingService
+
+    vectors = vectors_for_post(post_id).filter(is_found=False)
+    if description is not None:
+        vectors.update(description=description)
+    grouped: Dict[str, list] = {}
+    for image_vector in vectors:
+        grouped.setdefault(image_vector.model_name, []).append(image_vector)
+
+    refreshed = 0
+    for model_key, image_vectors in grouped.items():
+        try:
+            service = ImageMatchingService(model=model_key or None)
+        except KeyError as e:
+            print(f"Vektör meta verisi güncellenemedi: {e}")
+            continue
+        refreshed += service.refresh_vectors(image_vectors, metadata)
+    return refreshed
+
+
+def purge_vectors(vector_ids: Dict[str, list], ilan_id: Optional[int] = None) -> int:
+    """
+    İlan silindi: silme öncesi `vector_ids_for_post` ile toplanan vektörleri
+    indeksten kaldır (ImageVector / ImageMatch kayıtları CASCADE ile silinmiştir).
+
+    ilan_id verilirse ilanın yüz vektörü de kişi koleksiyonundan silinir.
+    Dönen değer kuyruğa alınan vektör sayısıdır.
+    """
+    deleter = get_vector_deleter()
+    for model_key, ids in vector_ids.items():
+        deleter.schedule(model_key, ids)
+    if ilan_id is not None:
+        deleter.schedule_faces([ilan_id])
+    return sum(len(ids) for ids in vector_ids.values())
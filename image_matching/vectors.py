@@ -0,0 +1,79 @@
+"""
+Embedding vektörlerinin kompakt gösterimi.
+
+Süreç içinde vektörler `list[float]` yerine float16 NumPy dizisi olarak
+taşınır (512 boyutlu bir vektör ~1KB). Önbellekte ve süreçler arası iletişimde
+(embedding sunucusu) kendini tanımlayan bayt dizisi kullanılır; isteğe bağlı
+olarak int8 skaler kuantizasyon ile (~0.5KB) saklanabilir.
+
+Milvus `FLOAT_VECTOR` alanları float32 liste beklediği için dönüşüm sadece
+Milvus sınırında (`to_milvus`) yapılır.
+
+Bayt biçimi:
+    b"h" + float16 verisi                    (varsayılan)
+    b"q" + float32 ölçek + int8 verisi       (EMBEDDING_CACHE_QUANTIZATION="int8")
+    float32 verisi (etiketsiz)               (eski önbellek kayıtları, sadece okuma)
+"""
+
+from typing import Optional, Sequence
+
+import numpy as np
+
+
+VECTOR_DTYPE = np.float16
+
+QUANTIZATION_FLOAT16 = "float16"
+QUANTIZATION_INT8 = "int8"
+QUANTIZATIONS = (QUANTIZATION_FLOAT16, QUANTIZATION_INT8)
+
+_TAG_FLOAT16 = b"h"
+_TAG_INT8 = b"q"
+_SCALE_BYTES = 4
+
+
+def as_vector(values) -> np.ndarray:
+    """Liste / dizi / tensörden süreç içi kompakt vektör (float16, 1 boyutlu) üret."""
+    return np.asarray(values, dtype=VECTOR_DTYPE).reshape(-1)
+
+
+def as_vectors(values) -> list:
+    """(N, D) matris veya vektör listesini satır başına kompakt vektör listesine çevir."""
+    matrix = np.asarray(values, dtype=VECTOR_DTYPE)
+    return list(matrix.reshape(len(matrix), -1))
+
+
+def to_bytes(vector, quantization: Optional[str] = None) -> bytes:
+    """Vektörü önbellek / IPC için bayt dizisine çevir."""
+    if quantization == QUANTIZATION_INT8:
+        values = np.asarray(vector, dtype=np.float32).reshape(-1)
+        peak = float(np.max(np.abs(values))) if values.size else 0.0
+        scale = peak / 127.0 if peak else 1.0
+        quantized = np.clip(np.rint(values / scale), -127, 127).astype(np.int8)
+        return _TAG_INT8 + np.float32(scale).tobytes() + quantized.tobytes()
+    return _TAG_FLOAT16 + as_vector(vector).tobytes()
+
+
+def from_bytes(payload: bytes) -> np.ndarray:
+    """`to_bytes` çıktısını (veya eski float32 kaydını) float16 vektöre çevir."""
+    # Etiketli biçimlerin uzunluğu tektir (1 + 2D veya 1 + 4 + D, D çift);
+    # 4'ün katı uzunluk eski etiketsiz float32 kaydıdır.
+    if len(payload) % 4 == 0:
+        return np.frombuffer(payload, dtype=np.float32).astype(VECTOR_DTYPE)
+    tag, body = payload[:1], payload[1:]
+    if tag == _TAG_FLOAT16:
+        return np.frombuffer(body, dtype=VECTOR_DTYPE).copy()
+    if tag == _TAG_INT8:
+        scale = np.frombuffer(body[:_SCALE_BYTES], dtype=np.float32)[0]
+        values = np.frombuffer(body[_SCALE_BYTES:], dtype=np.int8)
+        return (values.astype(np.float32) * scale).astype(VECTOR_DTYPE)
+    raise ValueError(f"Bilinmeyen vektör biçimi: {tag!r}")
+
+
+def to_milvus(vector) -> list:
+    """Milvus FLOAT_VECTOR alanı için float32 değer listesi."""
+    return np.asarray(vector, dtype=np.float32).reshape(-1).tolist()
+
+
+def to_milvus_batch(vectors: Sequence) -> list:
+    """Birden fazla vektörü Milvus insert/search biçimine çevir."""
+    return [to_milvus(vector) for vector in vectors]
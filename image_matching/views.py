@@ -94,14 +94,18 @@ class ImageMatchingAPIView(View):
                 return JsonResponse({'error': 'Authentication required'}, status=401)
             
             image_path = request.GET.get('image_path')
+            vector_id = request.GET.get('vector_id')
             top_k = int(request.GET.get('top_k', 10))
             
-            if not image_path:
-                return JsonResponse({'error': 'image_path parameter required'}, status=400)
+            if not image_path and not vector_id:
+                return JsonResponse({'error': 'image_path or vector_id parameter required'}, status=400)
             
-            # Benzer görüntüleri bul
+            # Benzer görüntüleri bul (vector_id verilirse kayıtlı vektör kullanılır)
             matching_service = ImageMatchingService()
-            matches = matching_service.find_similar_images(image_path, top_k)
+            if vector_id:
+                matches = matching_service.find_similar_by_vector_id(vector_id, top_k)
+            else:
+                matches = matching_service.find_similar_images(image_path, top_k)
             
             return JsonResponse({
                 'success': True,
@@ -151,9 +155,9 @@ def upload_and_match_image(request):
                 'error': process_result['error']
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Benzer görüntüleri bul ve eşleşmeleri kaydet
-        matches = matching_service.find_similar_images(
-            temp_path, top_k=10, source_vector_id=process_result.get('vector_id')
+        # Benzer görüntüleri bul ve eşleşmeleri kaydet (yeni kaydedilen vektörle, yeniden CLIP çalıştırmadan)
+        matches = matching_service.find_similar_by_vector_id(
+            process_result['vector_id'], top_k=10, record_matches=True
         )
         
         return Response({
@@ -291,18 +295,18 @@ class ImageUploadAPIView(APIView):
         collection_to_use = None
         processing_model = None
 
-        if is_face and vector_to_save:
+        if is_face and vector_to_save is not None:
             collection_to_use = PERSON_COLLECTION
             processing_model = "FaceNet"
         else:
             # Yüz yoksa, CLIP ile nesne vektörünü üret
             vector_to_save = vectorize_object_clip(file_path)
-            if vector_to_save:
+            if vector_to_save is not None:
                 collection_to_use = OBJECT_COLLECTION
                 processing_model = "CLIP"
 
         # Vektörleme başarısız olduysa
-        if not vector_to_save:
+        if vector_to_save is None:
             default_storage.delete(file_name)
             return Response(
                 {"error": "Görsel işlenemedi: Vektör üretilemedi."},
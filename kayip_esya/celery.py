@@ -1,5 +1,6 @@
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 # Django ayarlarını yükle
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kayip_esya.settings')
@@ -12,6 +13,17 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Tüm uygulamalardan task'ları otomatik keşfet
 app.autodiscover_tasks()
 
+
+@worker_process_init.connect
+def warm_embedding_models(**kwargs):
+    """Her işçi süreç başlarken embedding modellerini belleğe yükle."""
+    from django.conf import settings
+
+    if getattr(settings, 'EMBEDDING_WARM_ON_START', False):
+        from image_matching.model_registry import warm_configured_models
+
+        warm_configured_models()
+
 @app.task(bind=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
@@ -3,8 +3,9 @@ Django settings for kayip_esya project.
 """
 
 from pathlib import Path
+import json
 import os
-from decouple import config
+from decouple import Csv, config
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -110,6 +111,122 @@ MILVUS_HOST = config('MILVUS_HOST', default='localhost')
 MILVUS_PORT = config('MILVUS_PORT', default=19530, cast=int)
 MILVUS_USER = config('MILVUS_USER', default='')
 MILVUS_PASSWORD = config('MILVUS_PASSWORD', default='')
+# Süreç genelindeki Milvus bağlantısının arka planda yoklanma aralığı (saniye, 0 = kapalı)
+MILVUS_HEALTH_CHECK_INTERVAL = config('MILVUS_HEALTH_CHECK_INTERVAL', default=30.0, cast=float)
+# Eklemeler tamponda birikir; bu kadar satır olunca veya ilk satırdan bu kadar saniye sonra toplu yazılır
+MILVUS_INSERT_BUFFER_ROWS = config('MILVUS_INSERT_BUFFER_ROWS', default=256, cast=int)
+MILVUS_INSERT_BUFFER_SECONDS = config('MILVUS_INSERT_BUFFER_SECONDS', default=1.0, cast=float)
+# Görüntü vektörleri şehir bölümlerinde tutulur; bellekte en fazla bu kadar bölüm yüklü kalır (0 = sınırsız)
+MILVUS_MAX_LOADED_PARTITIONS = config('MILVUS_MAX_LOADED_PARTITIONS', default=0, cast=int)
+# Filtresiz aramalarda bölüm listesi önbellekten okunur; başka süreçte oluşturulan
+# şehir bölümleri en geç bu kadar saniye sonra görülür
+MILVUS_PARTITION_REFRESH_SECONDS = config('MILVUS_PARTITION_REFRESH_SECONDS', default=60.0, cast=float)
+# Vektör indeksi satır sayısına göre seçilir (auto | IVF_FLAT | IVF_SQ8 | HNSW);
+# nprobe / ef hedef recall'a göre ayarlanır. Bkz. python manage.py tune_milvus_index
+MILVUS_INDEX_TYPE = config('MILVUS_INDEX_TYPE', default='auto')
+MILVUS_INDEX_TARGET_RECALL = config('MILVUS_INDEX_TARGET_RECALL', default=0.95, cast=float)
+# HNSW bu bütçeyi (MB) aşacaksa IVF_SQ8 seçilir
+MILVUS_INDEX_MEMORY_BUDGET_MB = config('MILVUS_INDEX_MEMORY_BUDGET_MB', default=4096, cast=int)
+
+# Görüntü vektör deposu: milvus | local
+# local: Milvus sunucusu olmadan LOCAL_VECTOR_DIR altında memmap + kesin IP araması
+# (küçük kurulumlar, CI, kiosklar; birkaç yüz bin vektöre kadar)
+VECTOR_BACKEND = config('VECTOR_BACKEND', default='milvus')
+LOCAL_VECTOR_DIR = config('LOCAL_VECTOR_DIR', default=str(BASE_DIR / 'vector_store'))
+# İlan kapandığında / silindiğinde vektörler indeksten toplu silinir: bu kadar id
+# birikince veya ilk id'den bu kadar saniye sonra (bkz. image_matching/vector_lifecycle.py)
+VECTOR_DELETE_BATCH_ROWS = config('VECTOR_DELETE_BATCH_ROWS', default=256, cast=int)
+VECTOR_DELETE_BATCH_SECONDS = config('VECTOR_DELETE_BATCH_SECONDS', default=2.0, cast=float)
+# Toplu yeniden hesaplamada tek arama çağrısında gönderilen sorgu vektörü sayısı
+VECTOR_SEARCH_BATCH_SIZE = config('VECTOR_SEARCH_BATCH_SIZE', default=256, cast=int)
+# Eşleştirme adayları için bloklama indeksi: local | redis | off (bkz. accounts/blocking_index.py)
+# local: süreç başına bellek içi indeks; diğer süreçlerde kaydedilen ilanlar her
+#        aramadan önce tek indeksli `updated_at` sorgusuyla alınır (BLOCKING_INDEX_SYNC)
+# redis: tüm süreçlerde paylaşılan indeks, arama başına veritabanı sorgusu yok;
+#        çalışan bir Redis gerektirir (ulaşılamazsa veritabanı sorgusuna dönülür)
+BLOCKING_INDEX_BACKEND = config('BLOCKING_INDEX_BACKEND', default='local')
+# local: diğer süreçlerde kaydedilen ilanları her aramadan önce al. False ise bu
+# ilanlar en fazla BLOCKING_INDEX_TTL saniye aday olarak görünmez
+BLOCKING_INDEX_SYNC = config('BLOCKING_INDEX_SYNC', default=True, cast=bool)
+# local: tam yeniden yükleme aralığı (saniye); sinyali atlayan QuerySet.update'ler için
+BLOCKING_INDEX_TTL = config('BLOCKING_INDEX_TTL', default=300, cast=int)
+
+# CLIP Embedding Backend
+# torch: open_clip + PyTorch (fp32) | onnx: ONNX Runtime (fp32) | onnx-int8: dinamik int8 kuantize
+# ONNX modelleri: python manage.py export_clip_onnx
+CLIP_BACKEND = config('CLIP_BACKEND', default='torch')
+CLIP_ONNX_MODEL_PATH = config('CLIP_ONNX_MODEL_PATH', default=str(BASE_DIR / 'models' / 'clip-vit-b-32.onnx'))
+CLIP_ONNX_INT8_MODEL_PATH = config('CLIP_ONNX_INT8_MODEL_PATH', default=str(BASE_DIR / 'models' / 'clip-vit-b-32.int8.onnx'))
+# 0: ONNX Runtime varsayılanı (tüm çekirdekler)
+CLIP_ONNX_THREADS = config('CLIP_ONNX_THREADS', default=0, cast=int)
+
+# CLIP görüntü decode ayarları
+# JPEG'leri DCT ölçekleme ile düşük çözünürlükte decode et (model girişi zaten 224px)
+CLIP_DRAFT_DECODE = config('CLIP_DRAFT_DECODE', default=True, cast=bool)
+# Yüklemede kısa kenarı 224px olan model girişi kopyası üret ve vektörlemede onu oku
+CLIP_INPUT_DERIVATIVES = config('CLIP_INPUT_DERIVATIVES', default=False, cast=bool)
+
+# Yerel CLIP Embedding Sunucusu (python manage.py run_embedding_server)
+# Açıkken web süreçleri modeli yüklemez; görsel ve anlamsal arama metni vektörleme
+# isteklerini sunucuya gönderir.
+EMBEDDING_SERVER_ENABLED = config('EMBEDDING_SERVER_ENABLED', default=False, cast=bool)
+# "unix:/yol/soket.sock" veya "127.0.0.1:8765" (Windows'ta TCP kullanın)
+EMBEDDING_SERVER_ADDRESS = config('EMBEDDING_SERVER_ADDRESS', default='unix:/tmp/kayip_esya_embedding.sock')
+EMBEDDING_SERVER_AUTHKEY = config('EMBEDDING_SERVER_AUTHKEY', default='')  # boşsa SECRET_KEY
+EMBEDDING_SERVER_WORKERS = config('EMBEDDING_SERVER_WORKERS', default=2, cast=int)
+EMBEDDING_SERVER_MAX_BATCH = config('EMBEDDING_SERVER_MAX_BATCH', default=32, cast=int)
+EMBEDDING_SERVER_MAX_WAIT_MS = config('EMBEDDING_SERVER_MAX_WAIT_MS', default=10, cast=int)
+EMBEDDING_SERVER_TIMEOUT = config('EMBEDDING_SERVER_TIMEOUT', default=30.0, cast=float)
+# Sunucu tarafında batch başına bekleme; süre dolan (örn. işçisi ölen) batch hata ile döner.
+# EMBEDDING_SERVER_TIMEOUT'tan kısa olmalı
+EMBEDDING_SERVER_TASK_TIMEOUT = config('EMBEDDING_SERVER_TASK_TIMEOUT', default=25.0, cast=float)
+# Sunucuya ulaşılamazsa modeli bu süreçte yükle
+EMBEDDING_SERVER_FALLBACK_LOCAL = config('EMBEDDING_SERVER_FALLBACK_LOCAL', default=True, cast=bool)
+
+# CLIP Embedding Cache (dosya içeriği + model sürümü ile anahtarlanır)
+EMBEDDING_CACHE_DIR = config('EMBEDDING_CACHE_DIR', default=str(BASE_DIR / 'cache' / 'embeddings'))
+EMBEDDING_CACHE_MEMORY_ENTRIES = config('EMBEDDING_CACHE_MEMORY_ENTRIES', default=2048, cast=int)
+# Önbellekte vektör saklama biçimi: float16 (~1KB/vektör) | int8 (~0.5KB/vektör, skaler kuantizasyon)
+EMBEDDING_CACHE_QUANTIZATION = config('EMBEDDING_CACHE_QUANTIZATION', default='float16')
+# Model ağırlıkları veya ön işleme değiştiğinde artırın; eski önbellek kayıtları kullanılmaz
+EMBEDDING_MODEL_VERSION = config('EMBEDDING_MODEL_VERSION', default='1')
+
+# Embedding model kayıt defteri (image_matching.model_registry)
+# Her model kendi Milvus koleksiyonuna ve önbellek ad alanına yazar; ImageVector
+# kayıtlarında vektörü üreten model anahtarı ve sürümü tutulur.
+EMBEDDING_MODELS = {
+    'clip-default': {
+        'model_name': 'ViT-B-32',
+        'pretrained': 'openai',
+        'backend': CLIP_BACKEND,
+        'version': EMBEDDING_MODEL_VERSION,
+        'dim': 512,
+    },
+}
+# Deneysel modeller JSON olarak eklenebilir, örn:
+# {"clip-l14": {"model_name": "ViT-L-14", "pretrained": "openai", "dim": 768}}
+EMBEDDING_MODELS.update(json.loads(config('EMBEDDING_EXTRA_MODELS', default='{}')))
+DEFAULT_EMBEDDING_MODEL = config('DEFAULT_EMBEDDING_MODEL', default='clip-default')
+# Süreç başlangıcında belleğe yüklenecek modeller (boşsa sadece varsayılan model)
+EMBEDDING_WARM_MODELS = config('EMBEDDING_WARM_MODELS', default='', cast=Csv())
+# Web (wsgi) ve Celery işçileri başlarken modelleri ısıt
+EMBEDDING_WARM_ON_START = config('EMBEDDING_WARM_ON_START', default=False, cast=bool)
+
+# Anlamsal (CLIP metin -> görüntü) arama
+# Milvus'tan alınan aday sayısı (aktif olmayan ilanlar sonradan elenir)
+SEMANTIC_SEARCH_CANDIDATES = config('SEMANTIC_SEARCH_CANDIDATES', default=200, cast=int)
+# Sık kullanılan sorguların metin vektörleri için süreç içi LRU boyutu
+TEXT_QUERY_CACHE_ENTRIES = config('TEXT_QUERY_CACHE_ENTRIES', default=1024, cast=int)
+
+# Yüz algılama / embedding (OpenCV YuNet + SFace, CPU) - kayıp çocuk eşleştirmesi
+# Modeller: https://github.com/opencv/opencv_zoo (face_detection_yunet, face_recognition_sface)
+FACE_DETECTOR_MODEL_PATH = config('FACE_DETECTOR_MODEL_PATH', default=str(BASE_DIR / 'models' / 'face_detection_yunet_2023mar.onnx'))
+FACE_RECOGNIZER_MODEL_PATH = config('FACE_RECOGNIZER_MODEL_PATH', default=str(BASE_DIR / 'models' / 'face_recognition_sface_2021dec.onnx'))
+FACE_SCORE_THRESHOLD = config('FACE_SCORE_THRESHOLD', default=0.9, cast=float)
+# Algılamadan önce görüntünün uzun kenarı bu değere küçültülür
+FACE_DETECTION_MAX_SIDE = config('FACE_DETECTION_MAX_SIDE', default=640, cast=int)
+# Hizalanmış yüz kırpıntıları (içerik özetine göre adlandırılır)
+FACE_CROP_DIR = config('FACE_CROP_DIR', default=str(BASE_DIR / 'cache' / 'face_crops'))
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -9,3 +9,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'kayip_esya.settings')
 
 application = get_wsgi_application()
+
+# İlk isteği beklemeden embedding modellerini yükle (EMBEDDING_WARM_ON_START)
+from django.conf import settings  # noqa: E402
+
+if settings.EMBEDDING_WARM_ON_START:
+    from image_matching.model_registry import warm_configured_models
+
+    warm_configured_models()